@@ -1,74 +1,26 @@
+import time
+
+# Thời điểm bắt đầu chạy script (bảng debug: thời gian hiển thị lần đầu và chạy lại)
+script_started_at = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-import unicodedata
-import re
-import datetime
-from io import BytesIO
+
+from createtable_core import normalize_column_name
+from createtable_ui import (
+    render_debug_panel,
+    render_direct_input_tab,
+    render_logo,
+    render_profile_tab,
+    render_upload_tab,
+    render_upsert_tab,
+    start_stage_metrics,
+)
+
+# Bật ghi số đo các giai đoạn xử lý của lần chạy này
+start_stage_metrics()
 
 # Hiển thị logo ở đầu giao diện
-st.image("logo.png", use_container_width=False, width=150)  # width: điều chỉnh kích thước logo
-
-# Hàm chuẩn hóa tên cột
-def normalize_column_name(column_name):
-    column_name = column_name.replace('đ', 'd').replace('Đ', 'd')
-    column_name = unicodedata.normalize('NFKD', column_name)
-    column_name = ''.join(c for c in column_name if not unicodedata.combining(c))
-    column_name = column_name.replace('%', 'pc')
-    column_name = re.sub(r'\W+', '_', column_name.strip().lower())
-    column_name = column_name.rstrip('_')  
-    return column_name
-
-# Hàm kiểm tra định dạng ngày
-def is_date_format(value):
-    if isinstance(value, str):
-        value = value.strip()
-        date_patterns = [
-            r'^\d{2}/\d{2}/\d{4}$',          # dd/mm/yyyy
-            r'^\d{2}-\d{2}-\d{4}$',          # dd-mm-yyyy
-            r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$',  # yyyy-mm-dd hh:mm:ss
-            r'^\d{2}/\d{2}/\d{2}$',          # dd/mm/yy
-            r'^\d{2}-\d{2}-\d{2}$',          # dd-mm-yy
-            r'^\d{4}/\d{2}/\d{2}$',          # yyyy/mm/dd
-            r'^\d{4}-\d{2}-\d{2}$'           # yyyy-mm-dd
-        ]
-        for pattern in date_patterns:
-            if re.match(pattern, value):
-                return True
-    return False
-
-
-# Hàm suy luận kiểu dữ liệu
-def infer_data_type(sample_value, column_name):
-    if "ngay" in column_name.lower():
-        return "DATE"
-    if isinstance(sample_value, str) and sample_value.strip().upper() == "INT":
-        return "INTEGER"
-    if isinstance(sample_value, pd.Timestamp) or isinstance(sample_value, datetime.datetime):
-        return "DATE"
-    try:
-        int(sample_value)
-        return "DOUBLE PRECISION"
-    except (ValueError, TypeError):
-        pass
-    try:
-        float(sample_value)
-        return "DOUBLE PRECISION"
-    except (ValueError, TypeError):
-        pass
-    if isinstance(sample_value, str) and is_date_format(sample_value):
-        return "DATE"
-    return "TEXT"
-
-# Hàm tạo Code CREATE TABLE
-def generate_create_table_sql(data, full_table_name):
-    sql = f"CREATE TABLE {full_table_name} (\n"
-    sql += "    id SERIAL PRIMARY KEY,\n"
-    for row in data:
-        column_name = normalize_column_name(row["Tên cột"])
-        data_type = infer_data_type(row["Giá trị mẫu"], row["Tên cột"])
-        sql += f"    {column_name} {data_type},\n"
-    sql = sql.rstrip(",\n") + "\n);"
-    return sql
+render_logo("logo.png", width=150)  # width: điều chỉnh kích thước logo
 
 # Giao diện Streamlit
 st.title("Tạo Code SQL CREATE TABLE")
@@ -107,47 +59,13 @@ table_name = st.text_input("Nhập tên bảng", placeholder="Ví dụ: my_table
 schema_name = normalize_column_name(schema_name)
 table_name = normalize_column_name(table_name)
 full_table_name = f"{schema_name}.{table_name}"
-tab1, tab2 = st.tabs(["Nhập dữ liệu trực tiếp", "Đính kèm tệp"])
+physical_layout = st.checkbox("Sắp xếp cột theo căn lề vật lý (giảm byte đệm mỗi dòng)")
+tab1, tab2, tab3, tab4 = st.tabs(
+    ["Nhập dữ liệu trực tiếp", "Đính kèm tệp", "Hồ sơ dữ liệu thực", "Cập nhật dữ liệu từ file mẫu"]
+)
 
 with tab1:
-    col1, col2 = st.columns(2)
-    column_names_input = col1.text_area("Tên cột", height=200)
-    sample_values_input = col2.text_area("Giá trị mẫu", height=200)
-
-    column_names = column_names_input.strip().split("\n") if column_names_input.strip() else []
-    sample_values = sample_values_input.strip().split("\n") if sample_values_input.strip() else []
-
-    data_preview = {
-        "Tên cột": column_names + [""] * (max(len(column_names), len(sample_values)) - len(column_names)),
-        "Giá trị mẫu": sample_values + [""] * (max(len(column_names), len(sample_values)) - len(sample_values)),
-    }
-    st.write("### Dữ liệu đã nhập:")
-    st.table(pd.DataFrame(data_preview))
-
-    if len(column_names) == len(sample_values) and column_names:
-        if st.button("Tạo code SQL và xuất Excel"):
-            data = [{"Tên cột": col_name.strip(), "Giá trị mẫu": sample_value.strip()} 
-                    for col_name, sample_value in zip(column_names, sample_values)]
-            
-            sql_output = generate_create_table_sql(data, full_table_name)
-            st.subheader("Câu lệnh CREATE TABLE:")
-            st.code(sql_output, language="sql")
-
-            sql_file_name = f"{table_name}.sql"
-            st.download_button("Tải xuống file SQL", sql_output, sql_file_name, "text/sql", key="download_sql")
-
-            normalized_columns = [normalize_column_name(col) for col in column_names]
-            df_export = pd.DataFrame(columns=["action_type", "id"] + normalized_columns)
-
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df_export.to_excel(writer, index=False, sheet_name="Converted Data")
-            output.seek(0)
-
-            excel_file_name = f"{table_name}_converted.xlsx"
-            st.download_button("Tải xuống file Excel", output.getvalue(), excel_file_name, 
-                               "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", 
-                               key="download_excel")
+    render_direct_input_tab(full_table_name, table_name, physical_layout=physical_layout, export_template=True)
 # Hướng dẫn nhập liệu (chỉ trong tab nhập liệu trực tiếp)
     st.markdown("---")
     st.write("""
@@ -173,33 +91,7 @@ with tab1:
     """)
 
 with tab2:
-    uploaded_file = st.file_uploader("Tải lên tệp Excel hoặc CSV", type=["xlsx", "csv"])
-    if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file) if uploaded_file.name.endswith(".csv") else pd.read_excel(uploaded_file)
-        if df.shape[1] >= 2:
-            df.columns = ["Tên cột", "Giá trị mẫu"]
-            data = df.to_dict(orient="records")
-            sql_output = generate_create_table_sql(data, full_table_name)
-            st.subheader("Code SQL CREATE TABLE:")
-            st.code(sql_output, language="sql")
-
-            sql_file_name = f"{table_name}.sql"
-            st.download_button("Tải xuống file SQL", sql_output, sql_file_name, "text/sql", key="download_sql_file")
-
-            normalized_columns = [normalize_column_name(col) for col in df["Tên cột"]]
-            df_export = pd.DataFrame(columns=["action_type", "id"] + normalized_columns)
-
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df_export.to_excel(writer, index=False, sheet_name="Converted Data")
-            output.seek(0)
-
-            excel_file_name = f"{table_name}_converted.xlsx"
-            st.download_button("Tải xuống file Excel", output.getvalue(), excel_file_name, 
-                               "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", 
-                               key="download_excel_file")
-        else:
-            st.error("Tệp không hợp lệ. Định dạng phải có ít nhất 2 cột: 'Tên cột' và 'Giá trị mẫu'.")
+    render_upload_tab(schema_name, table_name, export_template=True, physical_layout=physical_layout)
 # Hướng dẫn đính kèm tệp (chỉ trong tab đính kèm tệp)
     st.markdown("---")
     st.write("""
@@ -208,6 +100,8 @@ with tab2:
     - **Cột 1**: Tên cột.
     - **Cột 2**: Giá trị mẫu.
     - Định dạng INTEGER giá trị mẫu điền chữ INT, mặc định số ở định dạng DOUBLE PRECISION
+    - Có thể tải lên nhiều tệp cùng lúc: mỗi tệp CSV hoặc mỗi sheet Excel sinh một bảng, tên bảng lấy theo tên tệp.
+    - Tệp Parquet/Feather: Code CREATE TABLE được sinh từ schema của tệp (không đọc dữ liệu).
 
     **Ví dụ:**
     | Tên cột         | Giá trị mẫu   |
@@ -216,3 +110,24 @@ with tab2:
     | Ngày giao dịch       | 01/01/2025    |
     | Số tiền | 1000           |
     """)
+
+with tab3:
+    render_profile_tab(full_table_name, table_name, physical_layout=physical_layout, export_template=True)
+
+with tab4:
+    render_upsert_tab(full_table_name, table_name)
+# Hướng dẫn cập nhật dữ liệu (chỉ trong tab cập nhật dữ liệu)
+    st.markdown("---")
+    st.write("""
+    ### Hướng dẫn cập nhật dữ liệu
+    Điền file Excel mẫu tải xuống ở hai tab đầu, mỗi dòng là một thao tác:
+    - **action_type**: insert (thêm hoặc ghi đè theo id), update (sửa), delete (xóa); chấp nhận cả Thêm, Sửa, Xóa.
+    - **id**: bắt buộc với update và delete; insert không có id thì id được tự sinh.
+    - Với update, ô để trống giữ nguyên giá trị hiện tại.
+    - Các dòng liên tiếp cùng thao tác được gom thành một lệnh; các lệnh chạy theo thứ tự dòng trong file và toàn bộ
+      script chạy trong một giao dịch.
+    - Bảng phân vùng: chọn cột phân vùng để lệnh thêm dữ liệu dùng đúng khóa chính (id, cột phân vùng).
+    """)
+
+# Bảng debug: thời gian chạy và số đo các giai đoạn (thêm ?debug vào URL để xem ở thanh bên)
+render_debug_panel(script_started_at)
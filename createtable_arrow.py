@@ -0,0 +1,96 @@
+# Sinh Code CREATE TABLE từ schema của file Parquet/Feather: chỉ đọc phần metadata (footer), không đọc dữ liệu.
+# pyarrow là thư viện tùy chọn, chỉ cần khi xử lý các file này
+from createtable_core import build_layout_create_table_sql, normalize_column_names
+
+SCHEMA_EXTENSIONS = (".parquet", ".feather", ".arrow")
+
+
+# Hàm kiểm tra file có phải Parquet/Feather (sinh Code CREATE TABLE từ schema) hay không
+def is_schema_file(file_name):
+    return str(file_name).lower().endswith(SCHEMA_EXTENSIONS)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Cần cài đặt pyarrow để đọc file Parquet/Feather (pip install pyarrow).") from None
+    return pyarrow
+
+
+# Hàm đọc schema Arrow của file Parquet (footer) hoặc Feather/Arrow IPC (phần cuối file), không đọc dòng dữ liệu
+def read_arrow_schema(source, file_name=None):
+    _import_pyarrow()
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    file_name = file_name or getattr(source, "name", str(source))
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if file_name.lower().endswith(".parquet"):
+        return pyarrow.parquet.read_schema(source)
+    try:
+        with pyarrow.ipc.open_file(source) as reader:
+            return reader.schema
+    except pyarrow.ArrowInvalid:
+        raise ValueError("Tệp Feather phải ở định dạng Feather V2 (Arrow IPC).") from None
+
+
+# Hàm ánh xạ kiểu dữ liệu Arrow sang kiểu dữ liệu PostgreSQL
+def arrow_type_to_postgres(arrow_type):
+    pyarrow = _import_pyarrow()
+    types = pyarrow.types
+
+    if types.is_dictionary(arrow_type):
+        return arrow_type_to_postgres(arrow_type.value_type)
+    if types.is_boolean(arrow_type):
+        return "BOOLEAN"
+    if types.is_int8(arrow_type) or types.is_int16(arrow_type) or types.is_uint8(arrow_type):
+        return "SMALLINT"
+    if types.is_int32(arrow_type) or types.is_uint16(arrow_type):
+        return "INTEGER"
+    if types.is_int64(arrow_type) or types.is_uint32(arrow_type):
+        return "BIGINT"
+    if types.is_uint64(arrow_type):
+        return "NUMERIC(20, 0)"
+    if types.is_float16(arrow_type) or types.is_float32(arrow_type):
+        return "REAL"
+    if types.is_float64(arrow_type):
+        return "DOUBLE PRECISION"
+    if types.is_decimal(arrow_type):
+        return f"NUMERIC({arrow_type.precision}, {arrow_type.scale})"
+    if types.is_date(arrow_type):
+        return "DATE"
+    if types.is_timestamp(arrow_type):
+        return "TIMESTAMPTZ" if arrow_type.tz else "TIMESTAMP"
+    if types.is_time(arrow_type):
+        return "TIME"
+    if types.is_duration(arrow_type):
+        return "INTERVAL"
+    if types.is_binary(arrow_type) or types.is_large_binary(arrow_type) or types.is_fixed_size_binary(arrow_type):
+        return "BYTEA"
+    if types.is_list(arrow_type) or types.is_large_list(arrow_type) or types.is_fixed_size_list(arrow_type):
+        element_type = arrow_type_to_postgres(arrow_type.value_type)
+        # Mảng lồng nhau hoặc mảng các bản ghi lưu dạng JSONB
+        return "JSONB" if element_type.endswith("[]") or element_type == "JSONB" else f"{element_type}[]"
+    if types.is_struct(arrow_type) or types.is_map(arrow_type):
+        return "JSONB"
+    # Chuỗi (string, large_string, string_view), null và các kiểu khác
+    return "TEXT"
+
+
+# Hàm chuyển schema Arrow thành danh sách (tên cột đã chuẩn hóa, kiểu dữ liệu)
+def infer_arrow_columns(schema):
+    column_names = normalize_column_names(schema.names)
+    return [(column_name, arrow_type_to_postgres(field.type)) for column_name, field in zip(column_names, schema)]
+
+
+# Hàm tạo Code CREATE TABLE từ schema Arrow (physical_layout: sắp xếp cột theo căn lề vật lý)
+def arrow_schema_to_sql(schema, full_table_name, physical_layout=False):
+    return build_layout_create_table_sql(infer_arrow_columns(schema), full_table_name, physical_layout)
+
+
+# Hàm tạo Code CREATE TABLE từ file Parquet/Feather (chỉ đọc schema)
+def generate_schema_create_table_sql(source, full_table_name, file_name=None, physical_layout=False):
+    return arrow_schema_to_sql(read_arrow_schema(source, file_name=file_name), full_table_name, physical_layout)
+
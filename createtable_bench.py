@@ -0,0 +1,378 @@
+# Đo hiệu năng suy luận kiểu và sinh Code SQL trên dữ liệu tổng hợp sinh theo seed (tên cột tiếng Việt, nhiều định
+# dạng ngày, số có dấu phân cách hàng nghìn): ghi thông lượng và bộ nhớ đỉnh ra file JSON làm mốc, so sánh với mốc
+# đã lưu và trả về mã lỗi khi chậm hơn (hoặc tốn bộ nhớ hơn) quá ngưỡng
+#
+# Ví dụ:
+#     python createtable_bench.py --save bench_baseline.json
+#     python createtable_bench.py --baseline bench_baseline.json --threshold 0.2
+#     python createtable_bench.py --suite full --only profile_data_file
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from createtable_core import (
+    COLUMN_NAME_KEY,
+    DATE_FORMATS,
+    SAMPLE_VALUE_KEY,
+    generate_create_table_sql,
+    infer_data_type,
+    infer_data_types,
+    is_date_format,
+    normalize_column_name,
+    normalize_column_names,
+)
+from createtable_metrics import track_peak_memory
+
+DEFAULT_SEED = 2025
+DEFAULT_REPEAT = 3
+# Ngưỡng mặc định: thông lượng giảm quá 20% hoặc bộ nhớ đỉnh tăng quá 20% so với mốc là chậm đi
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_MEMORY_THRESHOLD = 0.2
+# Thời gian tối thiểu của một lần đo: phép đo nhanh được gọi nhiều lần liên tiếp (như timeit) để giảm nhiễu
+MIN_MEASURE_SECONDS = 0.2
+BENCH_SUITES = ("quick", "full")
+
+# Các từ ghép thành tên cột tiếng Việt (có dấu, ký tự đặc biệt, khoảng trắng thừa)
+_HEADER_WORDS = (
+    "Ngày", "giao dịch", "Số tiền", "Mã", "khách hàng", "Tên", "chi nhánh", "Địa chỉ", "Số lượng", "Đơn giá",
+    "Tỷ lệ %", "Ghi chú", "Trạng thái", "Thời gian", "cập nhật", "Người tạo", "Điện thoại", "Tài khoản",
+    "Hạn mức", "Lãi suất", "Kỳ hạn", "Loại tiền tệ", "(VNĐ)", "Đ/c", "Số CMND/CCCD",
+)
+_TEXT_WORDS = ("Hà Nội", "Đà Nẵng", "TP. Hồ Chí Minh", "Cần Thơ", "Hải Phòng", "ACB", "Vietcombank", "đã duyệt",
+               "chờ xử lý", "hủy", "Nguyễn Văn A", "Trần Thị B")
+# Kiểu giá trị của một cột tổng hợp (trọng số: tỷ lệ cột mỗi kiểu)
+_VALUE_KINDS = {"date": 3, "amount": 3, "integer": 2, "decimal": 1, "int_marker": 1, "text": 3, "mixed": 1}
+# Tỷ lệ ô trống trong file dữ liệu tổng hợp
+_BLANK_RATIO = 0.02
+# Các cột mô tả của file đặc tả tổng hợp (không dùng khi sinh Code SQL)
+_SPEC_EXTRA_HEADERS = ["Mô tả", "Nguồn dữ liệu", "Ghi chú", "Người cập nhật"]
+
+
+# Hàm sinh một tên cột tiếng Việt (đôi khi trùng nhau sau chuẩn hóa)
+def _header(rng, index):
+    words = " ".join(rng.sample(_HEADER_WORDS, rng.randint(1, 3)))
+    suffix = "" if rng.random() < 0.1 else f" {index}"
+    return rng.choice(("", " ", "  ")) + words + suffix
+
+
+# Hàm sinh một giá trị dạng chuỗi theo kiểu: ngày ở mọi định dạng hỗ trợ, số tiền có dấu phân cách hàng nghìn
+# ("." hoặc ","), số nguyên, số thập phân, chữ INT, chữ tiếng Việt, hoặc trộn lẫn
+def _value(rng, kind):
+    if kind == "mixed":
+        kind = rng.choice(("date", "amount", "text"))
+    if kind == "date":
+        date_format = DATE_FORMATS[rng.choice(list(DATE_FORMATS))][1]
+        timestamp = time.struct_time((rng.randint(1990, 2030), rng.randint(1, 12), rng.randint(1, 28),
+                                      rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59), 0, 1, -1))
+        return time.strftime(date_format, timestamp)
+    if kind == "amount":
+        separator = rng.choice((".", ","))
+        return f"{rng.randint(1_000, 999_999_999):,}".replace(",", separator)
+    if kind == "integer":
+        return str(rng.randint(-100_000, 100_000))
+    if kind == "decimal":
+        return f"{rng.uniform(-1_000, 1_000):.{rng.randint(1, 4)}f}"
+    if kind == "int_marker":
+        return "INT"
+    return rng.choice(_TEXT_WORDS)
+
+
+# Hàm chọn kiểu giá trị cho mỗi cột theo trọng số
+def _column_kinds(rng, columns):
+    return rng.choices(list(_VALUE_KINDS), weights=list(_VALUE_KINDS.values()), k=columns)
+
+
+# Hàm sinh dữ liệu đặc tả tổng hợp: danh sách (tên cột, giá trị mẫu), cùng seed luôn cho cùng kết quả
+def generate_spec(columns, seed=DEFAULT_SEED):
+    rng = random.Random(seed)
+    return [(_header(rng, index), _value(rng, kind)) for index, kind in enumerate(_column_kinds(rng, columns), 1)]
+
+
+# Hàm ghi file CSV dữ liệu thực tổng hợp (dòng đầu là tiêu đề, mỗi cột một kiểu giá trị, có ô trống)
+def write_data_csv(path, rows, columns, seed=DEFAULT_SEED):
+    rng = random.Random(seed)
+    headers = [_header(rng, index) for index in range(1, columns + 1)]
+    kinds = _column_kinds(rng, columns)
+    with open(path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(headers)
+        for _ in range(rows):
+            writer.writerow(["" if rng.random() < _BLANK_RATIO else _value(rng, kind) for kind in kinds])
+
+
+# Dấu phân cách của file đặc tả CSV tổng hợp
+_SPEC_DELIMITER = ";"
+
+
+# Hàm ghi file đặc tả CSV tổng hợp: hai cột tên cột, giá trị mẫu và các cột mô tả không dùng đến (như file xuất
+# từ hệ thống nguồn), theo bảng mã encoding và dấu phân cách delimiter
+def write_spec_csv(path, rows, seed=DEFAULT_SEED, encoding="utf-8", delimiter=";"):
+    rng = random.Random(seed)
+    with open(path, "w", encoding=encoding, newline="") as csv_file:
+        writer = csv.writer(csv_file, delimiter=delimiter)
+        writer.writerow([COLUMN_NAME_KEY, SAMPLE_VALUE_KEY] + _SPEC_EXTRA_HEADERS)
+        for name, sample in generate_spec(rows, seed):
+            writer.writerow([name, sample] + [_value(rng, "text") for _ in _SPEC_EXTRA_HEADERS])
+
+
+# Hàm tạo danh sách giá trị mẫu để đo các hàm suy luận từng giá trị
+def _sample_values(count, seed):
+    return [sample for _, sample in generate_spec(count, seed)]
+
+
+# Các phép đo: (tên, tham số kích thước, bộ sinh dữ liệu). Bộ sinh nhận (kích thước, seed, thư mục tạm) và trả về
+# (hàm cần đo, số phần tử được xử lý mỗi lần chạy); dữ liệu được sinh trước khi đo
+def _bench_normalize(size, seed, _):
+    names = [name for name, _ in generate_spec(size["columns"], seed)]
+    return lambda: normalize_column_names(names), size["columns"]
+
+
+def _bench_is_date_format(size, seed, _):
+    values = _sample_values(size["values"], seed)
+    return lambda: [is_date_format(value) for value in values], size["values"]
+
+
+def _bench_infer_data_type(size, seed, _):
+    spec = generate_spec(size["values"], seed)
+    return lambda: [infer_data_type(sample, name) for name, sample in spec], size["values"]
+
+
+def _bench_infer_data_types(size, seed, _):
+    spec = generate_spec(size["values"], seed)
+    names, samples = [name for name, _ in spec], [sample for _, sample in spec]
+    return lambda: infer_data_types(samples, names), size["values"]
+
+
+def _bench_generate_sql(size, seed, _):
+    import pandas as pd
+
+    data = pd.DataFrame(generate_spec(size["columns"], seed), columns=[COLUMN_NAME_KEY, SAMPLE_VALUE_KEY])
+    return lambda: generate_create_table_sql(data, "public.bench"), size["columns"]
+
+
+# Hàm ghi file đặc tả CSV của một kích thước (dùng chung cho read_spec_file và mốc pandas.read_csv)
+def _spec_csv_path(size, seed, directory):
+    path = os.path.join(directory, f"spec_{size['rows']}_{size['encoding']}_{seed}.csv")
+    if not os.path.isfile(path):
+        write_spec_csv(path, size["rows"], seed, encoding=size["encoding"], delimiter=_SPEC_DELIMITER)
+    return path
+
+
+def _bench_read_spec(size, seed, directory):
+    from createtable_core import read_spec_file
+
+    path = _spec_csv_path(size, seed, directory)
+    return lambda: read_spec_file(path), size["rows"]
+
+
+# Mốc so sánh cho read_spec_file: cách đọc file đặc tả CSV trước khi có nhận dạng định dạng và engine pyarrow
+# (pandas.read_csv engine C, đọc mọi cột và suy luận kiểu từng cột; bảng mã và dấu phân cách cho trước)
+def _bench_read_spec_pandas(size, seed, directory):
+    import pandas as pd
+
+    path = _spec_csv_path(size, seed, directory)
+    return lambda: pd.read_csv(path, sep=_SPEC_DELIMITER, encoding=size["encoding"]).iloc[:, :2], size["rows"]
+
+
+def _bench_profile(size, seed, directory):
+    from createtable_profile import profile_data_file
+
+    path = os.path.join(directory, f"data_{size['rows']}x{size['columns']}.csv")
+    write_data_csv(path, size["rows"], size["columns"], seed)
+    return lambda: profile_data_file(path), size["rows"] * size["columns"]
+
+
+_QUICK = "quick"
+_FULL = "full"
+# Các phép đo theo bộ: mỗi kích thước thuộc bộ quick (chạy nhanh, dùng khi sửa mã) hoặc chỉ bộ full
+BENCHMARKS = (
+    ("normalize_column_names", _bench_normalize, [
+        ({"columns": 10}, _QUICK), ({"columns": 1_000}, _QUICK), ({"columns": 10_000}, _QUICK),
+    ]),
+    ("is_date_format", _bench_is_date_format, [
+        ({"values": 100}, _QUICK), ({"values": 10_000}, _QUICK), ({"values": 1_000_000}, _FULL),
+    ]),
+    ("infer_data_type", _bench_infer_data_type, [
+        ({"values": 100}, _QUICK), ({"values": 10_000}, _QUICK), ({"values": 1_000_000}, _FULL),
+    ]),
+    ("infer_data_types", _bench_infer_data_types, [
+        ({"values": 100}, _QUICK), ({"values": 10_000}, _QUICK), ({"values": 1_000_000}, _FULL),
+    ]),
+    ("generate_create_table_sql", _bench_generate_sql, [
+        ({"columns": 10}, _QUICK), ({"columns": 1_000}, _QUICK), ({"columns": 10_000}, _QUICK),
+    ]),
+    ("read_spec_file", _bench_read_spec, [
+        ({"rows": 10_000, "encoding": "utf-8"}, _QUICK), ({"rows": 10_000, "encoding": "utf-16"}, _QUICK),
+        ({"rows": 1_000_000, "encoding": "utf-8"}, _FULL), ({"rows": 1_000_000, "encoding": "utf-16"}, _FULL),
+    ]),
+    ("read_spec_file_pandas", _bench_read_spec_pandas, [
+        ({"rows": 10_000, "encoding": "utf-8"}, _QUICK), ({"rows": 10_000, "encoding": "utf-16"}, _QUICK),
+        ({"rows": 1_000_000, "encoding": "utf-8"}, _FULL), ({"rows": 1_000_000, "encoding": "utf-16"}, _FULL),
+    ]),
+    ("profile_data_file", _bench_profile, [
+        ({"rows": 100, "columns": 10}, _QUICK), ({"rows": 10_000, "columns": 10}, _QUICK),
+        ({"rows": 100, "columns": 100}, _QUICK), ({"rows": 100, "columns": 1_000}, _FULL),
+        ({"rows": 100_000, "columns": 10}, _FULL),
+        ({"rows": 1_000_000, "columns": 10}, _FULL), ({"rows": 1_000, "columns": 10_000}, _FULL),
+    ]),
+)
+
+
+# Tên một phép đo: <hàm>/<tham số>=<giá trị>,...
+def _case_name(bench_name, size):
+    return bench_name + "/" + ",".join(f"{key}={value}" for key, value in size.items())
+
+
+# Hàm chạy một phép đo: thời gian mỗi lần gọi nhỏ nhất trong repeat lần đo, mỗi lần đo gọi hàm number lần liên tiếp
+# (number tăng dần tới khi một lần đo kéo dài ít nhất MIN_MEASURE_SECONDS). Bộ nhớ đệm chuẩn hóa tên cột được xóa
+# trước mỗi lần gọi để đo từ trạng thái nguội; bộ nhớ đỉnh đo ở một lần gọi riêng (tracemalloc làm chậm việc
+# cấp phát bộ nhớ)
+def run_case(function, items, repeat=DEFAULT_REPEAT):
+    def measure(number):
+        start = time.perf_counter()
+        for _ in range(number):
+            normalize_column_name.cache_clear()
+            function()
+        return time.perf_counter() - start
+
+    number = 1
+    elapsed = measure(number)
+    while elapsed < MIN_MEASURE_SECONDS:
+        number *= 2 if elapsed * 10 > MIN_MEASURE_SECONDS else 10
+        elapsed = measure(number)
+    timings = [elapsed / number] + [measure(number) / number for _ in range(repeat - 1)]
+    normalize_column_name.cache_clear()
+    with track_peak_memory() as memory:
+        function()
+    seconds = min(timings)
+    return {
+        "items": items,
+        "seconds": seconds,
+        "items_per_second": items / seconds if seconds > 0 else float("inf"),
+        "peak_bytes": memory["peak_bytes"],
+    }
+
+
+# Hàm chạy các phép đo của bộ suite (quick: chỉ các kích thước nhỏ; full: mọi kích thước); only: chỉ chạy các phép
+# đo có tên chứa một trong các chuỗi này. progress: hàm nhận (tên phép đo, kết quả) sau mỗi phép đo
+def run_benchmarks(suite=_QUICK, seed=DEFAULT_SEED, repeat=DEFAULT_REPEAT, only=None, progress=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for bench_name, setup, sizes in BENCHMARKS:
+            for size, size_suite in sizes:
+                name = _case_name(bench_name, size)
+                if suite == _QUICK and size_suite != _QUICK:
+                    continue
+                if only and not any(pattern in name for pattern in only):
+                    continue
+                function, items = setup(size, seed, directory)
+                results[name] = run_case(function, items, repeat)
+                if progress:
+                    progress(name, results[name])
+    return {
+        "meta": {
+            "suite": suite,
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+# Hàm so sánh kết quả với mốc: trả về danh sách (tên phép đo, mô tả) các phép đo chậm hơn mốc quá threshold
+# (tỷ lệ thông lượng giảm) hoặc tốn bộ nhớ đỉnh hơn mốc quá memory_threshold; phép đo không có trong mốc được bỏ qua
+def compare_with_baseline(results, baseline, threshold=DEFAULT_THRESHOLD, memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        change = result["items_per_second"] / base["items_per_second"] - 1
+        if change < -threshold:
+            regressions.append((name, f"thông lượng {change:+.1%} (ngưỡng -{threshold:.0%})"))
+        if memory_threshold is not None and base["peak_bytes"]:
+            memory_change = result["peak_bytes"] / base["peak_bytes"] - 1
+            if memory_change > memory_threshold:
+                regressions.append((name, f"bộ nhớ đỉnh {memory_change:+.1%} (ngưỡng +{memory_threshold:.0%})"))
+    return regressions
+
+
+# Hàm định dạng một dòng kết quả (kèm thay đổi thông lượng so với mốc nếu có)
+def format_result(name, result, base=None):
+    line = (
+        f"{name:<55} {result['items']:>12,} {result['seconds'] * 1000:>10,.1f} ms "
+        f"{result['items_per_second']:>14,.0f}/s {result['peak_bytes'] / (1024 * 1024):>9,.1f} MB"
+    )
+    if base is not None:
+        line += f" {result['items_per_second'] / base['items_per_second'] - 1:+8.1%}"
+    return line
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Đo hiệu năng suy luận kiểu và sinh Code SQL trên dữ liệu tổng hợp (sinh theo seed)."
+    )
+    parser.add_argument("--suite", choices=BENCH_SUITES, default=_QUICK,
+                        help="quick: các kích thước nhỏ (mặc định); full: tới 1 triệu dòng và 10.000 cột")
+    parser.add_argument("--only", action="append", default=None,
+                        help="Chỉ chạy các phép đo có tên chứa chuỗi này (dùng được nhiều lần)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Seed sinh dữ liệu (mặc định: {DEFAULT_SEED})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Số lần chạy mỗi phép đo, lấy thời gian nhỏ nhất (mặc định: {DEFAULT_REPEAT})")
+    parser.add_argument("--save", help="Ghi kết quả ra file JSON (dùng làm mốc cho các lần sau)")
+    parser.add_argument("--baseline", help="File JSON mốc để so sánh; trả về mã lỗi 1 nếu chậm hơn quá ngưỡng")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Tỷ lệ thông lượng giảm tối đa so với mốc (mặc định: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help=f"Tỷ lệ bộ nhớ đỉnh tăng tối đa so với mốc (mặc định: {DEFAULT_MEMORY_THRESHOLD})")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.repeat < 1:
+        print("--repeat phải lớn hơn 0.", file=sys.stderr)
+        return 2
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print(f"{'Phép đo':<55} {'Phần tử':>12} {'Thời gian':>13} {'Thông lượng':>16} {'Bộ nhớ đỉnh':>12}")
+
+    def progress(name, result):
+        base = baseline["results"].get(name) if baseline else None
+        print(format_result(name, result, base), flush=True)
+
+    results = run_benchmarks(args.suite, args.seed, args.repeat, args.only, progress)
+    if not results["results"]:
+        print("Không có phép đo nào khớp.", file=sys.stderr)
+        return 1
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as save_file:
+            json.dump(results, save_file, ensure_ascii=False, indent=2)
+        print(f"Đã ghi kết quả vào {args.save}.")
+
+    if baseline is None:
+        return 0
+    regressions = compare_with_baseline(results, baseline, args.threshold, args.memory_threshold)
+    for name, description in regressions:
+        print(f"Chậm đi: {name}: {description}", file=sys.stderr)
+    if regressions:
+        return 1
+    print(f"Không có phép đo nào chậm hơn mốc quá ngưỡng ({len(results['results'])} phép đo).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# Chế độ danh mục: ghi manifest các file đặc tả đã xử lý (đường dẫn, kích thước, mtime, mã băm nội dung, mã băm
+# Code SQL) để lần chạy sau chỉ xử lý lại các file mới hoặc đã thay đổi; gộp Code SQL của mọi bảng thành một
+# file và liệt kê các bảng có Code SQL thay đổi
+import hashlib
+import json
+import os
+
+from createtable_core import build_sql_bundle, table_name_from_path
+
+MANIFEST_FILE = "createtable_manifest.json"
+BUNDLE_FILE = "createtable_catalog.sql"
+CHANGED_TABLES_FILE = "createtable_changed_tables.txt"
+# Tăng khi cấu trúc manifest thay đổi (manifest cũ bị bỏ qua)
+MANIFEST_VERSION = 1
+# Trạng thái của bảng trong danh sách bảng thay đổi
+ADDED, MODIFIED, REMOVED = "added", "modified", "removed"
+# Các module đọc file đặc tả và sinh Code SQL: mã nguồn thay đổi (nâng cấp) thì mọi file được xử lý lại
+_GENERATOR_MODULES = (
+    "createtable_core.py", "createtable_io.py", "createtable_types.py", "createtable_profile.py",
+    "createtable_arrow.py", "createtable_partition.py", "createtable_copy.py", "createtable_diff.py",
+)
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+# Hàm tính mã băm SHA-256 nội dung một file (đọc theo từng khối)
+def file_content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Hàm tính mã băm SHA-256 của Code SQL
+def sql_hash(sql_output):
+    return hashlib.sha256(sql_output.encode("utf-8")).hexdigest()
+
+
+# Hàm tính mã băm mã nguồn các module sinh Code SQL
+def _generator_hash():
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module_file in _GENERATOR_MODULES:
+        path = os.path.join(directory, module_file)
+        if os.path.isfile(path):
+            digest.update(file_content_hash(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+# Hàm tạo các tùy chọn sinh Code SQL ghi trong manifest: tùy chọn khác lần chạy trước thì mọi file được xử lý lại
+def catalog_options(**options):
+    return dict(options, version=MANIFEST_VERSION, generator=_generator_hash())
+
+
+# Hàm đọc manifest: trả về ({đường dẫn tuyệt đối: bản ghi}, tùy chọn có như lần chạy trước không);
+# rỗng nếu chưa có, không đọc được hoặc khác phiên bản
+def load_manifest(path, options):
+    try:
+        with open(path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}, False
+    if not isinstance(manifest, dict) or manifest.get("options", {}).get("version") != MANIFEST_VERSION:
+        return {}, False
+    entries = {entry["path"]: entry for entry in manifest.get("files", [])}
+    return entries, manifest["options"] == options
+
+
+# Hàm ghi manifest (ghi tệp tạm rồi đổi tên để lần chạy bị ngắt giữa chừng không làm hỏng manifest cũ)
+def save_manifest(path, entries, options):
+    manifest = {"options": options, "files": sorted(entries.values(), key=lambda entry: entry["path"])}
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, ensure_ascii=False, indent=1)
+        manifest_file.write("\n")
+    os.replace(temp_path, path)
+
+
+# Hàm chia các file đặc tả theo manifest: trả về (các file cần xử lý {đường dẫn: thông tin file},
+# bản ghi của các file không đổi {đường dẫn tuyệt đối: bản ghi}, bản ghi của các file không còn trong danh sách).
+# Kích thước và mtime như cũ thì không đọc file; khác thì so mã băm nội dung (file chỉ được chạm vào vẫn không đổi).
+# File .sql đã sinh bị xóa hoặc tùy chọn đã khác lần chạy trước (reuse False) thì file đặc tả được xử lý lại
+def plan_catalog(spec_files, entries, reuse=True):
+    pending, unchanged = {}, {}
+    for path in spec_files:
+        key = os.path.abspath(path)
+        file_stat = os.stat(path)
+        info = {"path": key, "size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns}
+        entry = entries.get(key) if reuse else None
+        if entry is not None and not os.path.isfile(entry["sql_path"]):
+            entry = None
+        if entry is not None and (entry["size"], entry["mtime_ns"]) == (info["size"], info["mtime_ns"]):
+            unchanged[key] = entry
+            continue
+        info["content_hash"] = file_content_hash(path)
+        if entry is not None and entry["content_hash"] == info["content_hash"]:
+            unchanged[key] = dict(entry, **info)
+        else:
+            pending[path] = info
+    spec_keys = {os.path.abspath(path) for path in spec_files}
+    removed = [entry for key, entry in entries.items() if key not in spec_keys]
+    return pending, unchanged, removed
+
+
+# Hàm tạo bản ghi manifest cho file vừa xử lý (info: thông tin file từ plan_catalog); trả về (bản ghi, trạng thái
+# của bảng: ADDED, MODIFIED hoặc None nếu Code SQL không đổi)
+def catalog_entry(info, sql_path, entries):
+    with open(sql_path, encoding="utf-8") as sql_file:
+        ddl_hash = sql_hash(sql_file.read())
+    entry = dict(info, table_name=table_name_from_path(info["path"]), sql_path=os.path.abspath(sql_path),
+                 ddl_hash=ddl_hash)
+    previous = entries.get(info["path"])
+    if previous is None:
+        return entry, ADDED
+    return entry, MODIFIED if previous["ddl_hash"] != ddl_hash else None
+
+
+# Hàm xóa file .sql đã sinh của các file đặc tả không còn trong danh mục (removed: bản ghi từ plan_catalog), trừ
+# file vẫn thuộc về một file đặc tả hiện tại (kept_paths: đường dẫn .sql của các file đặc tả hiện tại, ví dụ file
+# đặc tả đổi tên cùng tên bảng); trả về đường dẫn các file đã xóa
+def remove_stale_outputs(removed, kept_paths):
+    kept_paths = {os.path.abspath(path) for path in kept_paths}
+    deleted = []
+    for entry in removed:
+        sql_path = entry["sql_path"]
+        if sql_path in kept_paths or not os.path.isfile(sql_path):
+            continue
+        os.remove(sql_path)
+        deleted.append(sql_path)
+    return deleted
+
+
+# Hàm ghi file Code SQL gộp của mọi bảng trong manifest (theo thứ tự tên bảng) và danh sách bảng thay đổi
+# (mỗi dòng: trạng thái<TAB>tên bảng) vào output_dir; trả về đường dẫn hai file
+def write_catalog_outputs(entries, changes, output_dir):
+    tables = []
+    for entry in sorted(entries.values(), key=lambda entry: (entry["table_name"], entry["path"])):
+        with open(entry["sql_path"], encoding="utf-8") as sql_file:
+            tables.append((entry["table_name"], sql_file.read().rstrip("\n")))
+    bundle_path = os.path.join(output_dir, BUNDLE_FILE)
+    with open(bundle_path, "w", encoding="utf-8") as bundle_file:
+        bundle_file.write(build_sql_bundle(tables) if tables else "")
+    changed_path = os.path.join(output_dir, CHANGED_TABLES_FILE)
+    with open(changed_path, "w", encoding="utf-8") as changed_file:
+        changed_file.writelines(f"{status}\t{table_name}\n" for status, table_name in changes)
+    return bundle_path, changed_path
@@ -0,0 +1,243 @@
+# Sinh Code CREATE TABLE hàng loạt từ dòng lệnh
+#
+# Ví dụ:
+#     python createtable_cli.py specs/ -o sql/ --schema subpublic --workers 8
+#     python createtable_cli.py specs/ -o sql/ --catalog     # chỉ xử lý lại các file đã thay đổi
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from createtable_arrow import SCHEMA_EXTENSIONS, generate_schema_create_table_sql, is_schema_file
+from createtable_catalog import (
+    MANIFEST_FILE, REMOVED, catalog_entry, catalog_options, load_manifest, plan_catalog, remove_stale_outputs,
+    save_manifest, write_catalog_outputs,
+)
+from createtable_copy import COPY_FORMATS, convert_to_copy_files
+from createtable_core import generate_create_table_sql, normalize_column_name, read_spec_file, table_name_from_path
+from createtable_diff import generate_alter_table_sql, parse_create_tables, schema_snapshot
+from createtable_metrics import METRICS_DIR_ENV, StageMetrics, collect_stages, write_stage_metrics
+from createtable_profile import profile_data_file, profiles_to_sql
+
+SPEC_EXTENSIONS = (".csv", ".xlsx") + SCHEMA_EXTENSIONS
+
+
+# Hàm liệt kê các file đặc tả từ danh sách đường dẫn (file hoặc thư mục)
+def collect_spec_files(paths):
+    spec_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.listdir(path)):
+                # Bỏ qua file khóa tạm của Excel (~$...)
+                if entry.lower().endswith(SPEC_EXTENSIONS) and not entry.startswith("~$"):
+                    spec_files.append(os.path.join(path, entry))
+        else:
+            spec_files.append(path)
+    return spec_files
+
+
+# Hàm tìm các file đặc tả có cùng tên bảng sau khi chuẩn hóa (ví dụ "Số tiền.xlsx" và "so_tien.csv"), vì chúng
+# ghi đè file <bảng>.sql của nhau; trả về {tên bảng: [đường dẫn]} chỉ gồm các tên bị trùng
+def find_table_name_collisions(spec_files):
+    paths_by_table = {}
+    for path in spec_files:
+        paths_by_table.setdefault(table_name_from_path(path), []).append(path)
+    return {table_name: paths for table_name, paths in paths_by_table.items() if len(paths) > 1}
+
+
+# Hàm tìm schema cũ của bảng trong thư mục: ảnh chụp <bảng>.json hoặc Code SQL <bảng>.sql (có cả hai thì lấy
+# file sửa đổi gần nhất); trả về nội dung (None nếu không có)
+def read_previous_schema_file(directory, table_name):
+    paths = [os.path.join(directory, table_name + extension) for extension in (".json", ".sql")]
+    paths = [path for path in paths if os.path.isfile(path)]
+    if not paths:
+        return None
+    with open(max(paths, key=os.path.getmtime), encoding="utf-8") as schema_file:
+        return schema_file.read()
+
+
+# Hàm xử lý một file đặc tả và ghi ra file .sql (chạy trong tiến trình con); copy_format: cùng với profile,
+# chuyển dữ liệu sang định dạng COPY (chia shards file) kèm script \copy; alter_from: thư mục chứa schema cũ,
+# ghi thêm <bảng>_alter.sql; snapshot: ghi thêm ảnh chụp schema <bảng>.json
+def process_spec_file(path, schema_name, output_dir, profile=False, narrow=False, physical_layout=False,
+                      copy_format=None, shards=1, alter_from=None, snapshot=False):
+    table_name = table_name_from_path(path)
+    full_table_name = f"{schema_name}.{table_name}"
+    # Đọc schema cũ trước khi ghi đè (thư mục schema cũ có thể là thư mục đầu ra)
+    previous_schema = read_previous_schema_file(alter_from, table_name) if alter_from else None
+    if is_schema_file(path):
+        # Parquet/Feather: chỉ đọc schema, không đọc dữ liệu
+        sql_output = generate_schema_create_table_sql(path, full_table_name, physical_layout=physical_layout)
+    elif profile:
+        profiles = profile_data_file(path)
+        sql_output = profiles_to_sql(profiles, full_table_name, narrow=narrow, physical_layout=physical_layout)
+        if copy_format:
+            convert_to_copy_files(path, profiles, output_dir, full_table_name, copy_format, shards, narrow)
+    else:
+        sql_output = generate_create_table_sql(read_spec_file(path), full_table_name, physical_layout)
+
+    sql_path = os.path.join(output_dir, f"{table_name}.sql")
+    with open(sql_path, "w", encoding="utf-8") as sql_file:
+        sql_file.write(sql_output + "\n")
+    if previous_schema is not None or snapshot:
+        columns = parse_create_tables(sql_output)[0][1]
+        if previous_schema is not None:
+            with open(os.path.join(output_dir, f"{table_name}_alter.sql"), "w", encoding="utf-8") as alter_file:
+                alter_file.write(generate_alter_table_sql(previous_schema, columns, full_table_name) + "\n")
+        if snapshot:
+            with open(os.path.join(output_dir, f"{table_name}.json"), "w", encoding="utf-8") as snapshot_file:
+                snapshot_file.write(schema_snapshot(columns, full_table_name))
+    return sql_path
+
+
+# Hàm xử lý một file đặc tả và đo các giai đoạn (chạy trong tiến trình con); trả về (đường dẫn file .sql,
+# các giai đoạn đã đo)
+def measured_process_spec_file(*args):
+    with collect_stages(StageMetrics(trace_memory=True)) as metrics:
+        sql_path = process_spec_file(*args)
+    return sql_path, metrics.drain()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Sinh Code SQL CREATE TABLE từ các file đặc tả CSV/XLSX hoặc schema Parquet/Feather."
+    )
+    parser.add_argument("paths", nargs="+", help="File đặc tả hoặc thư mục chứa file đặc tả")
+    parser.add_argument("-o", "--output-dir", default=".", help="Thư mục ghi file .sql (mặc định: thư mục hiện tại)")
+    parser.add_argument("-s", "--schema", default="public", help="Tên schema (mặc định: public)")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Xem các file là dữ liệu thực (mỗi cột một trường) và suy luận kiểu từ mọi dòng",
+    )
+    parser.add_argument(
+        "--narrow", action="store_true",
+        help="Cùng với --profile: thu hẹp kiểu dữ liệu theo giá trị thực (SMALLINT/INTEGER/BIGINT, NUMERIC, ...)",
+    )
+    parser.add_argument(
+        "--physical-layout", action="store_true",
+        help="Sắp xếp cột theo căn lề vật lý (8, 4, 2, 1 byte, độ dài thay đổi) để giảm byte đệm mỗi dòng",
+    )
+    parser.add_argument(
+        "--copy", choices=COPY_FORMATS, default=None,
+        help="Cùng với --profile: chuyển dữ liệu sang định dạng COPY (text/binary) kèm script <bảng>_load.sql",
+    )
+    parser.add_argument("--shards", type=int, default=1, help="Cùng với --copy: số file chia ra để nạp song song")
+    parser.add_argument(
+        "--alter-from", default=None, metavar="DIR",
+        help="Thư mục chứa schema cũ của các bảng (<bảng>.json hoặc <bảng>.sql): ghi thêm <bảng>_alter.sql gồm lệnh "
+             "ALTER TABLE thêm/xóa cột, đổi kiểu thay vì tạo lại bảng (có thể là chính thư mục đầu ra)",
+    )
+    parser.add_argument(
+        "--snapshot", action="store_true",
+        help="Ghi thêm ảnh chụp schema <bảng>.json (dùng cho --alter-from ở lần chạy sau)",
+    )
+    parser.add_argument(
+        "--catalog", nargs="?", const="", default=None, metavar="MANIFEST",
+        help="Chế độ danh mục: chỉ xử lý lại các file mới hoặc đã thay đổi so với manifest (mặc định: "
+             f"{MANIFEST_FILE} trong thư mục đầu ra), ghi thêm file Code SQL gộp của mọi bảng và danh sách "
+             "bảng có Code SQL thay đổi",
+    )
+    parser.add_argument(
+        "--metrics-dir", default=os.environ.get(METRICS_DIR_ENV),
+        help="Đo thời gian, số dòng/cột và bộ nhớ đỉnh (tracemalloc, xử lý chậm hơn) của từng giai đoạn, ghi vào "
+             "createtable_metrics.jsonl và createtable_metrics.prom trong thư mục này "
+             f"(mặc định: biến môi trường {METRICS_DIR_ENV})",
+    )
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Số tiến trình xử lý song song (mặc định: số CPU)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    schema_name = normalize_column_name(args.schema) or "public"
+    if args.copy and not args.profile:
+        print("--copy chỉ dùng được cùng với --profile.", file=sys.stderr)
+        return 2
+    spec_files = collect_spec_files(args.paths)
+    if not spec_files:
+        print("Không tìm thấy file đặc tả nào.", file=sys.stderr)
+        return 1
+    collisions = find_table_name_collisions(spec_files)
+    if collisions:
+        for table_name, paths in sorted(collisions.items()):
+            print(f"Các tệp {', '.join(paths)} cùng sinh bảng {table_name} ({table_name}.sql).", file=sys.stderr)
+        print("Đổi tên các tệp để tên bảng không trùng nhau.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.catalog is not None:
+        manifest_path = args.catalog or os.path.join(args.output_dir, MANIFEST_FILE)
+        options = catalog_options(
+            schema=schema_name, output_dir=os.path.abspath(args.output_dir), profile=args.profile,
+            narrow=args.narrow, physical_layout=args.physical_layout, copy=args.copy, shards=args.shards,
+            alter_from=args.alter_from and os.path.abspath(args.alter_from), snapshot=args.snapshot,
+        )
+        entries, reuse = load_manifest(manifest_path, options)
+        pending, catalog, removed = plan_catalog(spec_files, entries, reuse)
+        changes = [(REMOVED, entry["table_name"]) for entry in removed]
+        print(
+            f"Danh mục: {len(catalog)} file không đổi, {len(pending)} file mới hoặc đã thay đổi, "
+            f"{len(removed)} file đã bỏ."
+        )
+        process_files = list(pending)
+    else:
+        process_files = spec_files
+
+    errors = 0
+    stages = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                measured_process_spec_file if args.metrics_dir else process_spec_file,
+                path, schema_name, args.output_dir, args.profile, args.narrow, args.physical_layout,
+                args.copy, args.shards, args.alter_from, args.snapshot,
+            ): path
+            for path in process_files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors += 1
+                print(f"Lỗi khi xử lý tệp {path}: {e}", file=sys.stderr)
+                continue
+            if args.metrics_dir:
+                result, file_stages = result
+                stages += [dict(record, file=path) for record in file_stages]
+            print(f"{path} -> {result}")
+            if args.catalog is not None:
+                entry, status = catalog_entry(pending[path], result, entries)
+                catalog[entry["path"]] = entry
+                if status:
+                    changes.append((status, entry["table_name"]))
+    elapsed = time.perf_counter() - start
+    if args.metrics_dir:
+        write_stage_metrics(stages, args.metrics_dir)
+    if args.catalog is not None:
+        # File lỗi không được ghi vào manifest nên sẽ được xử lý lại ở lần chạy sau
+        save_manifest(manifest_path, catalog, options)
+        # File .sql của các file đặc tả đã bỏ (trừ file mà một file đặc tả hiện tại ghi vào)
+        kept_paths = [os.path.join(args.output_dir, f"{table_name_from_path(path)}.sql") for path in spec_files]
+        for sql_path in remove_stale_outputs(removed, kept_paths):
+            print(f"Đã xóa {sql_path} (file đặc tả không còn trong danh mục)")
+        changes.sort(key=lambda change: (change[1], change[0]))
+        bundle_path, changed_path = write_catalog_outputs(catalog, changes, args.output_dir)
+        print(f"Code SQL gộp: {bundle_path}; {len(changes)} bảng thay đổi: {changed_path}")
+        for status, table_name in changes:
+            print(f"  {status}\t{table_name}")
+
+    # Tổng kết thời gian thực và tốc độ xử lý
+    files_per_second = len(process_files) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Đã xử lý {len(process_files)} file ({errors} lỗi) trong {elapsed:.2f} giây "
+        f"({files_per_second:.1f} file/giây)."
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
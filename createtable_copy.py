@@ -0,0 +1,379 @@
+# Chuyển file dữ liệu thực sang định dạng COPY của PostgreSQL (text hoặc binary) theo từng khối, kèm script \copy
+# để nạp. Tên cột được chuẩn hóa, giá trị được chuyển sang kiểu đã suy luận từ hồ sơ các cột
+import datetime
+import math
+import os
+import struct
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from createtable_core import DATE_FORMATS, match_date_format
+from createtable_io import DEFAULT_CHUNK_SIZE, iter_data_chunks
+from createtable_metrics import measured_stage
+from createtable_profile import profiles_to_columns
+from createtable_types import parse_number
+
+COPY_FORMATS = ("text", "binary")
+COPY_EXTENSIONS = {"text": ".copy", "binary": ".bin"}
+# Số shard tối đa (mỗi shard là một file nạp độc lập)
+MAX_SHARDS = 64
+
+# Giá trị được hiểu là đúng/sai khi nạp vào cột BOOLEAN (so sánh không phân biệt hoa thường)
+TRUE_VALUES = {"1", "1.0", "true", "t", "y", "yes", "có"}
+FALSE_VALUES = {"0", "0.0", "false", "f", "n", "no", "không"}
+
+# Định dạng binary: chữ ký và phần đầu file, phần cuối file, giá trị NULL
+BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+BINARY_TRAILER = struct.pack("!h", -1)
+BINARY_NULL = struct.pack("!i", -1)
+# Mốc thời gian của kiểu DATE/TIMESTAMP trong định dạng binary
+POSTGRES_EPOCH = datetime.date(2000, 1, 1)
+_POSTGRES_EPOCH_DATETIME = datetime.datetime(2000, 1, 1)
+
+# Ký tự cần thoát trong định dạng text
+_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+# Lỗi khi một giá trị không chuyển được sang kiểu của cột (giá trị được nạp thành NULL và được đếm)
+class CoercionError(ValueError):
+    pass
+
+
+# Hàm đọc giá trị ngày/giờ: theo định dạng ngày phát hiện được của cột, sau đó theo định dạng khớp với giá trị
+def _parse_datetime(value, date_format):
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        return pd.Timestamp(value).to_pydatetime()
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        value = value.strip()
+        for name in (date_format, match_date_format(value)):
+            if name:
+                try:
+                    return datetime.datetime.strptime(value, DATE_FORMATS[name][1])
+                except ValueError:
+                    pass
+    raise CoercionError(f"Không đọc được ngày: {value!r}")
+
+
+# Hàm đọc giá trị số thành Decimal (hiểu dấu phân cách hàng nghìn như khi suy luận kiểu; decimal_separator: dấu
+# thập phân của cột, xem parse_number)
+def _parse_decimal(value, decimal_separator=None):
+    parsed = parse_number(value, decimal_separator)
+    if parsed is not None:
+        number = parsed[0]
+        return Decimal(number) if isinstance(number, int) else Decimal(repr(number))
+    try:
+        number = float(value.strip() if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        raise CoercionError(f"Không đọc được số: {value!r}") from None
+    if not math.isfinite(number):
+        raise CoercionError(f"Giá trị không hữu hạn: {value!r}")
+    return Decimal(repr(number))
+
+
+# Hàm đọc giá trị số thực (chấp nhận số mũ, NaN, inf)
+def _parse_float(value, decimal_separator=None):
+    parsed = parse_number(value, decimal_separator)
+    if parsed is not None:
+        return float(parsed[0])
+    try:
+        return float(value.strip() if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        raise CoercionError(f"Không đọc được số: {value!r}") from None
+
+
+# Hàm đọc giá trị số nguyên
+def _parse_integer(value, decimal_separator=None):
+    number = _parse_decimal(value, decimal_separator)
+    if number != number.to_integral_value():
+        raise CoercionError(f"Không phải số nguyên: {value!r}")
+    return int(number)
+
+
+# Hàm đọc giá trị đúng/sai
+def _parse_boolean(value):
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise CoercionError(f"Không phải giá trị đúng/sai: {value!r}")
+
+
+# Hàm đọc giá trị số thực hữu hạn (NaN/inf: None, Excel không lưu được các giá trị này)
+def _finite_float(value, decimal_separator=None):
+    number = _parse_float(value, decimal_separator)
+    return number if math.isfinite(number) else None
+
+
+# Hàm lấy giá trị chữ (số nguyên đọc từ Excel dạng 1.0 giữ dạng 1)
+def _parse_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+# Hàm định dạng số thực cho định dạng text (PostgreSQL dùng Infinity/-Infinity/NaN)
+def _float_text(number):
+    if math.isnan(number):
+        return "NaN"
+    if math.isinf(number):
+        return "Infinity" if number > 0 else "-Infinity"
+    return repr(number)
+
+
+# Hàm mã hóa NUMERIC cho định dạng binary: các chữ số cơ số 10000 tính từ dấu thập phân
+def _numeric_binary(number):
+    sign = 0x4000 if number < 0 else 0x0000
+    integer, _, fraction = format(abs(number), "f").partition(".")
+    integer = integer.lstrip("0")
+    integer = integer.zfill(-(-len(integer) // 4) * 4)
+    fraction_groups = -(-len(fraction) // 4)
+    digits = [int(integer[i:i + 4]) for i in range(0, len(integer), 4)]
+    digits += [int(fraction.ljust(fraction_groups * 4, "0")[i:i + 4]) for i in range(0, fraction_groups * 4, 4)]
+    weight = len(integer) // 4 - 1
+    while digits and digits[0] == 0:
+        digits.pop(0)
+        weight -= 1
+    while digits and digits[-1] == 0:
+        digits.pop()
+    if not digits:
+        weight, sign = 0, 0x0000
+    return struct.pack(f"!hhHH{len(digits)}H", len(digits), weight, sign, len(fraction), *digits)
+
+
+# Hàm tạo bộ chuyển một giá trị sang dạng text (chưa thoát ký tự đặc biệt) hoặc binary (chưa gồm độ dài)
+# theo kiểu dữ liệu, định dạng ngày và dấu thập phân của cột; giá trị không chuyển được gây CoercionError
+def value_encoder(data_type, date_format, copy_format, decimal_separator=None):
+    base_type = data_type.split("(")[0].strip()
+    binary = copy_format == "binary"
+    if base_type in ("SMALLINT", "INTEGER", "BIGINT"):
+        code = {"SMALLINT": "!h", "INTEGER": "!i", "BIGINT": "!q"}[base_type]
+
+        def encode(value):
+            number = _parse_integer(value, decimal_separator)
+            try:
+                return struct.pack(code, number) if binary else str(number)
+            except struct.error:
+                raise CoercionError(f"Vượt khoảng giá trị của {base_type}: {value!r}") from None
+        return encode
+    if base_type == "NUMERIC":
+        def encode(value):
+            number = _parse_decimal(value, decimal_separator)
+            return _numeric_binary(number) if binary else format(number, "f")
+        return encode
+    if base_type in ("DOUBLE PRECISION", "REAL"):
+        code = "!d" if base_type == "DOUBLE PRECISION" else "!f"
+
+        def encode(value):
+            number = _parse_float(value, decimal_separator)
+            return struct.pack(code, number) if binary else _float_text(number)
+        return encode
+    if base_type == "BOOLEAN":
+        def encode(value):
+            flag = _parse_boolean(value)
+            return (b"\x01" if flag else b"\x00") if binary else ("t" if flag else "f")
+        return encode
+    if base_type == "DATE":
+        def encode(value):
+            day = _parse_datetime(value, date_format).date()
+            return struct.pack("!i", (day - POSTGRES_EPOCH).days) if binary else day.isoformat()
+        return encode
+    if base_type in ("TIMESTAMP", "TIMESTAMPTZ"):
+        def encode(value):
+            moment = _parse_datetime(value, date_format).replace(tzinfo=None)
+            if not binary:
+                return moment.isoformat(sep=" ")
+            delta = moment - _POSTGRES_EPOCH_DATETIME
+            return struct.pack("!q", (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds)
+        return encode
+    # TEXT và các kiểu còn lại: nạp dạng chữ
+    return lambda value: _parse_text(value).encode("utf-8") if binary else _parse_text(value)
+
+
+# Hàm tạo bộ chuyển một giá trị sang giá trị Python theo kiểu dữ liệu của cột (int, float, bool, date, datetime,
+# str), dùng khi xuất dữ liệu đã chuyển đổi ra Excel
+def value_converter(data_type, date_format, decimal_separator=None):
+    base_type = data_type.split("(")[0].strip()
+    if base_type in ("SMALLINT", "INTEGER", "BIGINT"):
+        return lambda value: _parse_integer(value, decimal_separator)
+    if base_type == "NUMERIC":
+        return lambda value: float(_parse_decimal(value, decimal_separator))
+    if base_type in ("DOUBLE PRECISION", "REAL"):
+        return lambda value: _finite_float(value, decimal_separator)
+    if base_type == "BOOLEAN":
+        return _parse_boolean
+    if base_type == "DATE":
+        return lambda value: _parse_datetime(value, date_format).date()
+    if base_type in ("TIMESTAMP", "TIMESTAMPTZ"):
+        return lambda value: _parse_datetime(value, date_format).replace(tzinfo=None)
+    return _parse_text
+
+
+# Hàm chuyển các giá trị của một cột trong khối sang giá trị Python (ô trống và giá trị không chuyển được: None)
+def _convert_column(values, converter):
+    codes, uniques = pd.factorize(values)
+    converted = []
+    for value in uniques:
+        try:
+            converted.append(None if isinstance(value, str) and not value.strip() else converter(value))
+        except CoercionError:
+            converted.append(None)
+    converted.append(None)
+    return np.array(converted, dtype=object)[codes]
+
+
+# Hàm đọc file dữ liệu theo từng khối và lần lượt trả về từng dòng đã chuyển sang kiểu của cột (thứ tự cột
+# theo profiles); chỉ giữ một khối trong bộ nhớ
+def iter_converted_rows(source, profiles, narrow=False, file_name=None, chunksize=DEFAULT_CHUNK_SIZE, sheet_name=None):
+    columns, _ = profiles_to_columns(profiles, narrow)
+    converters = [
+        value_converter(data_type, profile.date_format, profile.decimal_separator)
+        for profile, (_, data_type) in zip(profiles, columns)
+    ]
+    if hasattr(source, "seek"):
+        source.seek(0)
+    for chunk in iter_data_chunks(source, file_name=file_name, chunksize=chunksize, sheet_name=sheet_name,
+                                  usecols=[profile.column_name for profile in profiles]):
+        converted = [
+            _convert_column(chunk[profile.column_name], converter) if profile.column_name in chunk.columns
+            else np.full(len(chunk), None, dtype=object)
+            for profile, converter in zip(profiles, converters)
+        ]
+        for row in zip(*converted):
+            yield list(row)
+
+
+# Hàm chuyển các giá trị của một cột trong khối thành mảng giá trị đã mã hóa; mỗi giá trị khác nhau chỉ chuyển
+# một lần. Trả về (mảng, số giá trị không chuyển được và được nạp thành NULL)
+def _encode_column(values, encoder, copy_format):
+    null = BINARY_NULL if copy_format == "binary" else "\\N"
+    codes, uniques = pd.factorize(values)
+    encoded = []
+    failed = np.zeros(len(uniques) + 1, dtype=bool)
+    for index, value in enumerate(uniques):
+        # Chuỗi chỉ có khoảng trắng là ô trống
+        if isinstance(value, str) and not value.strip():
+            encoded.append(null)
+            continue
+        try:
+            field = encoder(value)
+        except CoercionError:
+            encoded.append(null)
+            failed[index] = True
+            continue
+        if copy_format == "binary":
+            encoded.append(struct.pack("!i", len(field)) + field)
+        else:
+            encoded.append(field.translate(_TEXT_ESCAPES))
+    encoded.append(null)
+    encoded = np.array(encoded, dtype=object)
+    return encoded[codes], int(failed[codes].sum())
+
+
+# Hàm ghi các dòng đã mã hóa của một khối vào file đầu ra
+def _write_rows(output, columns, copy_format):
+    if copy_format == "binary":
+        field_count = struct.pack("!h", len(columns))
+        output.write(b"".join(field_count + b"".join(row) for row in zip(*columns)))
+    else:
+        output.write("".join("\t".join(row) + "\n" for row in zip(*columns)).encode("utf-8"))
+
+
+# Hàm chuyển file dữ liệu sang định dạng COPY, đọc lần lượt từng khối chunksize dòng. Các dòng được chia lần lượt
+# cho các file đầu ra outputs (mỗi file một shard, mở ở chế độ nhị phân). Trả về (số dòng mỗi shard,
+# {tên cột chuẩn hóa: số giá trị không chuyển được kiểu, nạp thành NULL})
+@measured_stage("copy_export", counts=lambda result: (sum(result[0]), len(result[1])))
+def write_copy_data(source, profiles, outputs, copy_format="text", narrow=False, file_name=None,
+                    chunksize=DEFAULT_CHUNK_SIZE, sheet_name=None):
+    if copy_format not in COPY_FORMATS:
+        raise ValueError(f"Định dạng COPY không hợp lệ: {copy_format}")
+    columns, _ = profiles_to_columns(profiles, narrow)
+    encoders = [
+        value_encoder(data_type, profile.date_format, copy_format, profile.decimal_separator)
+        for profile, (_, data_type) in zip(profiles, columns)
+    ]
+    failures = {column_name: 0 for column_name, _ in columns}
+    shard_rows = [0] * len(outputs)
+    if copy_format == "binary":
+        for output in outputs:
+            output.write(BINARY_HEADER)
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    row_offset = 0
+    for chunk in iter_data_chunks(source, file_name=file_name, chunksize=chunksize, sheet_name=sheet_name,
+                                  usecols=[profile.column_name for profile in profiles]):
+        encoded = []
+        for profile, (column_name, _), encoder in zip(profiles, columns, encoders):
+            if profile.column_name in chunk.columns:
+                values, failed = _encode_column(chunk[profile.column_name], encoder, copy_format)
+                failures[column_name] += failed
+            else:
+                values = np.full(len(chunk), BINARY_NULL if copy_format == "binary" else "\\N", dtype=object)
+            encoded.append(values)
+        # Dòng thứ i của tệp thuộc shard i % số shard
+        for shard, output in enumerate(outputs):
+            start = (shard - row_offset) % len(outputs)
+            shard_columns = [values[start::len(outputs)] for values in encoded]
+            if len(chunk) > start:
+                _write_rows(output, shard_columns, copy_format)
+                shard_rows[shard] += len(shard_columns[0]) if shard_columns else 0
+        row_offset += len(chunk)
+
+    if copy_format == "binary":
+        for output in outputs:
+            output.write(BINARY_TRAILER)
+    return shard_rows, failures
+
+
+# Hàm đặt tên các file COPY của bảng: <bảng>.copy hoặc <bảng>_1.copy, <bảng>_2.copy, ... khi chia shard
+def copy_file_names(table_name, copy_format="text", shards=1):
+    extension = COPY_EXTENSIONS[copy_format]
+    if shards == 1:
+        return [f"{table_name}{extension}"]
+    return [f"{table_name}_{index}{extension}" for index in range(1, shards + 1)]
+
+
+# Hàm tạo script psql nạp các file COPY bằng \copy (đường dẫn tương đối so với thư mục chạy psql)
+def build_copy_script(full_table_name, column_names, file_names, copy_format="text"):
+    options = "FORMAT binary" if copy_format == "binary" else "FORMAT text, ENCODING 'UTF8'"
+    lines = [f"-- Nạp dữ liệu vào bảng {full_table_name}: psql -f <script> (chạy trong thư mục chứa các file dữ liệu)"]
+    if len(file_names) > 1:
+        lines.append(
+            "-- Các shard độc lập với nhau: có thể chạy mỗi lệnh \\copy trong một phiên psql riêng để nạp song song"
+        )
+    lines += [
+        f"\\copy {full_table_name} ({', '.join(column_names)}) FROM '{file_name}' WITH ({options})"
+        for file_name in file_names
+    ]
+    return "\n".join(lines) + "\n"
+
+
+# Hàm chuyển file dữ liệu thành các file COPY (chia shards phần) và script <bảng>_load.sql trong output_dir.
+# Trả về (đường dẫn các file, số dòng mỗi shard, số giá trị không chuyển được kiểu của từng cột)
+def convert_to_copy_files(source, profiles, output_dir, full_table_name, copy_format="text", shards=1,
+                          narrow=False, file_name=None, chunksize=DEFAULT_CHUNK_SIZE, sheet_name=None):
+    if not 1 <= shards <= MAX_SHARDS:
+        raise ValueError(f"Số shard phải từ 1 đến {MAX_SHARDS}.")
+    table_name = full_table_name.split(".")[-1]
+    file_names = copy_file_names(table_name, copy_format, shards)
+    paths = [os.path.join(output_dir, name) for name in file_names]
+    outputs = [open(path, "wb") for path in paths]
+    try:
+        shard_rows, failures = write_copy_data(
+            source, profiles, outputs, copy_format, narrow, file_name=file_name, chunksize=chunksize,
+            sheet_name=sheet_name,
+        )
+    finally:
+        for output in outputs:
+            output.close()
+
+    column_names = [column_name for column_name, _ in profiles_to_columns(profiles, narrow)[0]]
+    script_path = os.path.join(output_dir, f"{table_name}_load.sql")
+    with open(script_path, "w", encoding="utf-8") as script_file:
+        script_file.write(build_copy_script(full_table_name, column_names, file_names, copy_format))
+    return paths + [script_path], shard_rows, failures
@@ -0,0 +1,360 @@
+# Lõi sinh Code CREATE TABLE, không phụ thuộc Streamlit (dùng chung cho giao diện và dòng lệnh)
+import unicodedata
+import re
+import datetime
+import os
+import zipfile
+from functools import lru_cache
+from io import BytesIO
+
+from createtable_metrics import measured_stage, stage
+
+# pandas/numpy và các mô-đun đọc tệp, ước tính kích thước được nhập trong các hàm cần đến (nhập muộn): chuẩn hóa
+# tên cột và sinh Code SQL không cần nạp pandas, giao diện hiển thị lần đầu nhanh hơn
+
+# Tên hai cột của file đặc tả
+COLUMN_NAME_KEY = "Tên cột"
+SAMPLE_VALUE_KEY = "Giá trị mẫu"
+
+
+# Hàm bỏ dấu một chuỗi theo đúng các bước gốc (đ -> d, tách dấu NFKD, bỏ dấu, % -> pc)
+def _strip_accents(text):
+    text = text.replace('đ', 'd').replace('Đ', 'd')
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.replace('%', 'pc')
+
+
+# Bảng str.translate tính sẵn cho các ký tự thường gặp (Latin, tiếng Việt, dấu câu, ký tự toàn độ rộng):
+# mỗi ký tự được ánh xạ tới kết quả bỏ dấu của chính nó, chỉ giữ các ký tự bị thay đổi
+_ACCENT_TABLE = {}
+for _code_point in [*range(0x3000), *range(0xFF00, 0xFFF0)]:
+    _char = chr(_code_point)
+    _stripped = _strip_accents(_char)
+    if _stripped != _char:
+        _ACCENT_TABLE[_code_point] = _stripped
+del _code_point, _char, _stripped
+
+_NON_WORD_PATTERN = re.compile(r'\W+')
+NORMALIZE_CACHE_SIZE = 16_384
+
+
+# Hàm chuẩn hóa tên cột
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_column_name(column_name):
+    column_name = column_name.translate(_ACCENT_TABLE)
+    # Ký tự ngoài bảng tính sẵn: xử lý theo các bước gốc (các ký tự đã bỏ dấu không bị đổi lại)
+    if not column_name.isascii():
+        column_name = _strip_accents(column_name)
+    column_name = _NON_WORD_PATTERN.sub('_', column_name.strip().lower())
+    column_name = column_name.rstrip('_')
+    return column_name
+
+
+# Hàm chuẩn hóa cả danh sách tên cột, đồng thời đặt lại tên trùng sau chuẩn hóa
+# (so_tien, so_tien -> so_tien, so_tien_2) và tên rỗng (cot_<vị trí>)
+def normalize_column_names(column_names):
+    normalized = [normalize_column_name(name) for name in column_names]
+    taken = set(normalized)
+    used = set()
+    unique_names = []
+    for index, name in enumerate(normalized, start=1):
+        if not name:
+            name = f"cot_{index}"
+        if name in used:
+            suffix = 2
+            while f"{name}_{suffix}" in taken or f"{name}_{suffix}" in used:
+                suffix += 1
+            name = f"{name}_{suffix}"
+        used.add(name)
+        unique_names.append(name)
+    return unique_names
+
+
+# Danh mục định dạng ngày dạng chuỗi: tên định dạng -> (regex, định dạng strptime của Python,
+# định dạng to_date/to_timestamp của PostgreSQL). Thêm định dạng mới chỉ cần thêm một dòng.
+DATE_FORMATS = {
+    "dd/mm/yyyy": (r"\d{2}/\d{2}/\d{4}", "%d/%m/%Y", "DD/MM/YYYY"),
+    "dd-mm-yyyy": (r"\d{2}-\d{2}-\d{4}", "%d-%m-%Y", "DD-MM-YYYY"),
+    "yyyy-mm-dd hh:mm:ss": (r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}", "%Y-%m-%d %H:%M:%S", "YYYY-MM-DD HH24:MI:SS"),
+    "dd/mm/yy": (r"\d{2}/\d{2}/\d{2}", "%d/%m/%y", "DD/MM/YY"),
+    "dd-mm-yy": (r"\d{2}-\d{2}-\d{2}", "%d-%m-%y", "DD-MM-YY"),
+    "yyyy/mm/dd": (r"\d{4}/\d{2}/\d{2}", "%Y/%m/%d", "YYYY/MM/DD"),
+    "yyyy-mm-dd": (r"\d{4}-\d{2}-\d{2}", "%Y-%m-%d", "YYYY-MM-DD"),
+    "dd.mm.yyyy": (r"\d{2}\.\d{2}\.\d{4}", "%d.%m.%Y", "DD.MM.YYYY"),
+}
+
+# Một regex duy nhất cho mọi định dạng, mỗi định dạng là một nhóm có tên f0, f1, ...
+_DATE_GROUP_NAMES = {f"f{index}": name for index, name in enumerate(DATE_FORMATS)}
+DATE_REGEX = re.compile("|".join(
+    f"(?P<{group}>{DATE_FORMATS[name][0]})" for group, name in _DATE_GROUP_NAMES.items()
+))
+
+
+# Hàm trả về tên định dạng ngày khớp với giá trị (None nếu không khớp)
+def match_date_format(value):
+    if isinstance(value, str):
+        match = DATE_REGEX.fullmatch(value.strip())
+        if match:
+            return _DATE_GROUP_NAMES[match.lastgroup]
+    return None
+
+
+# Hàm kiểm tra định dạng ngày
+def is_date_format(value):
+    return match_date_format(value) is not None
+
+
+# Hàm trả về tên định dạng ngày khớp với từng phần tử của Series (None nếu không khớp hoặc không phải chuỗi)
+def match_date_formats(values):
+    import pandas as pd
+
+    values = pd.Series(values, dtype=object)
+    is_string = pd.Series([isinstance(value, str) for value in values], index=values.index, dtype=bool)
+    formats = pd.Series([None] * len(values), index=values.index, dtype=object)
+    strings = values[is_string]
+    if len(strings):
+        # Mỗi nhóm có tên là một cột; nhóm khớp là cột duy nhất khác NaN của dòng
+        matched = strings.str.strip().str.extract(f"^(?:{DATE_REGEX.pattern})$").notna()
+        matched = matched[matched.any(axis=1)]
+        formats[matched.index] = matched.idxmax(axis=1).map(_DATE_GROUP_NAMES)
+    return formats
+
+
+# Hàm kiểm tra giá trị mẫu bị bỏ trống (None, NaN, NaT, pd.NA, chuỗi chỉ có khoảng trắng)
+def is_blank_value(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    try:
+        return bool(value != value)
+    except TypeError:
+        # pd.NA: phép so sánh không có giá trị đúng/sai
+        return True
+
+
+# Hàm suy luận kiểu dữ liệu
+def infer_data_type(sample_value, column_name):
+    # Nếu tên cột chứa từ "ngay", suy luận kiểu DATE
+    if "ngay" in column_name.lower():
+        return "DATE"
+
+    # Ô trống không cho biết kiểu dữ liệu: mặc định là TEXT
+    if is_blank_value(sample_value):
+        return "TEXT"
+
+    # Kiểm tra nếu giá trị mẫu là chuỗi "INT"
+    if isinstance(sample_value, str) and sample_value.strip().upper() == "INT":
+        return "INTEGER"
+
+    # Kiểm tra nếu giá trị mẫu là kiểu datetime
+    if isinstance(sample_value, datetime.datetime):
+        return "DATE"
+
+    # Kiểm tra ngày dạng chuỗi trước khi bỏ dấu phân cách (01.01.2025 là ngày, không phải số 01012025)
+    if isinstance(sample_value, str) and is_date_format(sample_value):
+        return "DATE"
+
+    # Chuỗi: loại bỏ các ký tự phân cách hàng nghìn (.,); giá trị số đọc từ Excel: dùng trực tiếp
+    if isinstance(sample_value, str):
+        numeric_value = sample_value.replace(",", "").replace(".", "")
+    else:
+        numeric_value = sample_value
+
+    # Kiểm tra nếu là số nguyên
+    try:
+        int(numeric_value)
+        return "DOUBLE PRECISION"
+    except (ValueError, TypeError):
+        pass
+
+    # Kiểm tra nếu là số thực
+    try:
+        float(numeric_value)
+        return "DOUBLE PRECISION"
+    except (ValueError, TypeError):
+        pass
+
+    # Nếu không khớp bất kỳ điều kiện nào, mặc định là TEXT
+    return "TEXT"
+
+
+# Chuỗi mà int()/float() của Python chấp nhận (sau khi đã bỏ dấu phân cách "." và ","):
+# dấu +/-, chữ số có thể ngăn cách bởi "_", số mũ, inf/infinity/nan, khoảng trắng hai đầu
+NUMERIC_STRING_PATTERN = r'(?i)\s*[+-]?(?:\d(?:_?\d)*(?:e[+-]?\d(?:_?\d)*)?|inf(?:inity)?|nan)\s*'
+
+
+# Hàm suy luận kiểu dữ liệu cho cả cột "Giá trị mẫu" cùng lúc (kết quả giống hệt infer_data_type)
+def infer_data_types(sample_values, column_names):
+    import numpy as np
+    import pandas as pd
+
+    sample_values = pd.Series(sample_values).reset_index(drop=True)
+    column_names = pd.Series(column_names).reset_index(drop=True).astype(str)
+
+    # Nếu tên cột chứa từ "ngay", suy luận kiểu DATE
+    name_is_date = column_names.str.lower().str.contains("ngay", regex=False)
+
+    # Cột số hoặc cột ngày giờ: quyết định cho cả cột (ô trống NaN/NaT là TEXT)
+    if pd.api.types.is_numeric_dtype(sample_values.dtype):
+        return pd.Series(np.where(
+            name_is_date, "DATE", np.where(sample_values.isna(), "TEXT", "DOUBLE PRECISION")
+        ), dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(sample_values.dtype):
+        return pd.Series(np.where(name_is_date | sample_values.notna(), "DATE", "TEXT"), dtype=object)
+
+    sample_values = sample_values.astype(object)
+    # Mặt nạ phần tử là chuỗi: cột toàn chuỗi (CSV, ô nhập liệu) không cần duyệt từng phần tử
+    if pd.api.types.infer_dtype(sample_values, skipna=False) == "string":
+        is_string = pd.Series(True, index=sample_values.index)
+    else:
+        is_string = pd.Series(
+            [isinstance(value, str) for value in sample_values], index=sample_values.index, dtype=bool
+        )
+
+    data_types = pd.Series("TEXT", index=sample_values.index, dtype=object)
+
+    # Các phép .str chỉ chạy trên phần tử chuỗi, và chỉ một lần cho mỗi giá trị khác nhau
+    # (giá trị mẫu thường lặp lại: INT, ngày, số)
+    strings = sample_values[is_string]
+    if len(strings):
+        codes, uniques = pd.factorize(strings)
+        uniques = pd.Series(uniques, dtype=object)
+        stripped = uniques.str.strip()
+        # Ngày dạng chuỗi được kiểm tra trước; sau đó loại bỏ các ký tự phân cách hàng nghìn (.,) rồi kiểm tra
+        # kiểu số bằng mặt nạ regex
+        numeric_candidates = uniques.str.replace(",", "", regex=False).str.replace(".", "", regex=False)
+        unique_types = np.select(
+            [
+                stripped.str.upper() == "INT",
+                stripped.str.fullmatch(DATE_REGEX),
+                numeric_candidates.str.fullmatch(NUMERIC_STRING_PATTERN),
+            ],
+            ["INTEGER", "DATE", "DOUBLE PRECISION"],
+            default="TEXT",
+        )
+        data_types[is_string] = np.where(name_is_date[is_string], "DATE", unique_types[codes])
+
+    # Phần tử không phải chuỗi trong cột hỗn hợp (số, datetime, None từ Excel): dùng hàm vô hướng
+    other_values = ~is_string
+    if other_values.any():
+        data_types[other_values] = [
+            infer_data_type(value, name)
+            for value, name in zip(sample_values[other_values], column_names[other_values])
+        ]
+    return data_types
+
+
+# Hàm tạo Code CREATE TABLE từ danh sách (tên cột đã chuẩn hóa, kiểu dữ liệu); comments: chú thích cho
+# từng cột (None: không chú thích); partition_column: bảng phân vùng theo khoảng giá trị của cột này
+# (khóa chính của bảng phân vùng phải chứa cột phân vùng)
+def build_create_table_sql(columns, full_table_name, comments=None, partition_column=None):
+    id_definition = "id SERIAL" if partition_column else "id SERIAL PRIMARY KEY"
+    definitions = [id_definition] + [f"{column_name} {data_type}" for column_name, data_type in columns]
+    comments = [None] + (list(comments) if comments else [None] * len(columns))
+    if partition_column:
+        definitions.append(f"PRIMARY KEY (id, {partition_column})")
+        comments.append(None)
+    lines = []
+    for index, (definition, comment) in enumerate(zip(definitions, comments)):
+        separator = "," if index < len(definitions) - 1 else ""
+        lines.append(f"    {definition}{separator}" + (f" -- {comment}" if comment else ""))
+    suffix = f" PARTITION BY RANGE ({partition_column})" if partition_column else ""
+    return f"CREATE TABLE {full_table_name} (\n" + "\n".join(lines) + f"\n){suffix};"
+
+
+# Hàm sắp xếp các cột theo căn lề vật lý (giảm byte đệm trong mỗi dòng); trả về (danh sách cột theo thứ tự
+# mới, chú thích vị trí gốc của từng cột)
+def physical_layout_columns(columns, lengths=None):
+    from createtable_types import physical_layout_order
+
+    order = physical_layout_order([data_type for _, data_type in columns], lengths)
+    return [columns[index] for index in order], [f"vị trí gốc {index + 1}" for index in order]
+
+
+# Hàm ước tính kích thước dòng (byte) theo thứ tự cột gốc và theo căn lề vật lý
+def physical_layout_savings(columns, lengths=None):
+    from createtable_types import estimate_tuple_bytes, physical_layout_order
+
+    data_types = [data_type for _, data_type in columns]
+    lengths = lengths or [None] * len(columns)
+    order = physical_layout_order(data_types, lengths)
+    return (
+        estimate_tuple_bytes(data_types, lengths),
+        estimate_tuple_bytes([data_types[index] for index in order], [lengths[index] for index in order]),
+    )
+
+
+# Hàm tạo Code CREATE TABLE, physical_layout: sắp xếp cột theo căn lề vật lý kèm chú thích vị trí gốc;
+# partition_column: bảng phân vùng theo khoảng giá trị của cột này
+def build_layout_create_table_sql(columns, full_table_name, physical_layout=False, lengths=None,
+                                  partition_column=None):
+    with stage("build_sql", columns=len(columns)):
+        if not physical_layout:
+            return build_create_table_sql(columns, full_table_name, partition_column=partition_column)
+        columns, comments = physical_layout_columns(columns, lengths)
+        return (
+            "-- Các cột được sắp xếp theo căn lề vật lý (8, 4, 2, 1 byte, độ dài thay đổi)\n"
+            + build_create_table_sql(columns, full_table_name, comments, partition_column=partition_column)
+        )
+
+
+# Hàm suy luận danh sách (tên cột đã chuẩn hóa, kiểu dữ liệu) từ dữ liệu nhập
+def infer_spec_columns(data):
+    import pandas as pd
+
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame(list(data), columns=[COLUMN_NAME_KEY, SAMPLE_VALUE_KEY])
+
+    with stage("normalize_column_names", rows=len(data)):
+        column_names = normalize_column_names(data[COLUMN_NAME_KEY])
+    with stage("infer_data_types", rows=len(data)):
+        data_types = infer_data_types(data[SAMPLE_VALUE_KEY], data[COLUMN_NAME_KEY])
+    return list(zip(column_names, data_types))
+
+
+# Hàm tạo Code CREATE TABLE từ dữ liệu nhập
+def generate_create_table_sql(data, full_table_name, physical_layout=False):
+    return build_layout_create_table_sql(infer_spec_columns(data), full_table_name, physical_layout)
+
+
+# Hàm đọc file đặc tả (CSV/XLSX, cột 1: tên cột, cột 2: giá trị mẫu) thành DataFrame hai cột;
+# file Excel được đọc theo luồng, chỉ hai cột đầu của sheet sheet_name (mặc định: sheet đang hoạt động)
+@measured_stage("read_spec", counts=lambda df: df.shape)
+def read_spec_file(source, file_name=None, sheet_name=None):
+    from createtable_io import read_csv_columns, read_excel_spec
+
+    file_name = file_name or getattr(source, "name", str(source))
+    if file_name.lower().endswith(".csv"):
+        # Chỉ đọc hai cột đầu, mọi giá trị dạng chuỗi (không suy luận kiểu cho từng cột khi đọc)
+        df = read_csv_columns(source, usecols=[0, 1])
+    else:
+        df = read_excel_spec(source, sheet_name=sheet_name)
+
+    if df.shape[1] < 2:
+        raise ValueError("Tệp phải có ít nhất 2 cột: 'Tên cột' và 'Giá trị mẫu'.")
+
+    # Chỉ giữ hai cột đầu và đổi tên để đồng nhất
+    df = df.iloc[:, :2]
+    df.columns = [COLUMN_NAME_KEY, SAMPLE_VALUE_KEY]
+    return df
+
+
+# Hàm suy ra tên bảng từ tên file (bỏ đường dẫn và phần mở rộng)
+def table_name_from_path(path):
+    return normalize_column_name(os.path.splitext(os.path.basename(path))[0])
+
+
+# Hàm gộp Code CREATE TABLE của nhiều bảng [(tên bảng, Code SQL)] thành nội dung một file .sql
+def build_sql_bundle(tables):
+    return "\n\n".join(f"-- Bảng {table_name}\n{sql_output}" for table_name, sql_output in tables) + "\n"
+
+
+# Hàm đóng gói Code CREATE TABLE của nhiều bảng thành file zip, mỗi bảng một file <tên bảng>.sql
+def build_sql_zip(tables):
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for table_name, sql_output in tables:
+            archive.writestr(f"{table_name}.sql", sql_output + "\n")
+    return output.getvalue()
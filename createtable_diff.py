@@ -0,0 +1,211 @@
+# So sánh schema cũ (Code CREATE TABLE đã sinh trước đó hoặc ảnh chụp schema dạng JSON) với danh sách cột mới
+# theo tên cột đã chuẩn hóa và sinh lệnh ALTER TABLE tối thiểu (thêm, xóa cột, đổi kiểu) thay vì tạo lại bảng;
+# đánh dấu các thay đổi kiểu buộc PostgreSQL ghi lại toàn bộ bảng
+import json
+import re
+
+from createtable_core import normalize_column_name
+
+SNAPSHOT_VERSION = 1
+# Cột khóa chính do Code CREATE TABLE tự thêm, không so sánh
+ID_COLUMN = "id"
+# Thao tác của từng thay đổi
+ADD, DROP, ALTER_TYPE = "add", "drop", "alter_type"
+
+_CREATE_TABLE_PATTERN = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.\"]+)\s*\(", re.IGNORECASE)
+# Phần định nghĩa bảng không phải cột
+_CONSTRAINT_PREFIXES = ("PRIMARY KEY", "CONSTRAINT", "UNIQUE", "CHECK", "FOREIGN KEY", "EXCLUDE", "LIKE")
+# Từ khóa bắt đầu phần ràng buộc sau kiểu dữ liệu của cột
+_COLUMN_CONSTRAINT_WORDS = {
+    "NOT", "NULL", "DEFAULT", "PRIMARY", "REFERENCES", "UNIQUE", "CHECK", "CONSTRAINT", "GENERATED", "COLLATE",
+}
+# Tên khác của cùng kiểu dữ liệu -> tên dùng trong Code SQL của ứng dụng
+_TYPE_ALIASES = {
+    "INT": "INTEGER", "INT4": "INTEGER", "INT2": "SMALLINT", "INT8": "BIGINT", "FLOAT8": "DOUBLE PRECISION",
+    "FLOAT": "DOUBLE PRECISION", "FLOAT4": "REAL", "BOOL": "BOOLEAN", "DECIMAL": "NUMERIC",
+    "CHARACTER VARYING": "VARCHAR", "TIMESTAMP WITHOUT TIME ZONE": "TIMESTAMP",
+    "TIMESTAMP WITH TIME ZONE": "TIMESTAMPTZ", "TIME WITHOUT TIME ZONE": "TIME", "SERIAL4": "SERIAL",
+}
+_TYPE_PATTERN = re.compile(r"([A-Z][A-Z0-9 ]*?)\s*(?:\((\d+)(?:,\s*(\d+))?\))?(\[\])?")
+
+
+# Hàm đưa kiểu dữ liệu về dạng chuẩn để so sánh: chữ hoa, tên kiểu thống nhất, NUMERIC(p, s)
+def normalize_data_type(data_type):
+    data_type = " ".join(data_type.upper().split())
+    matched = _TYPE_PATTERN.fullmatch(data_type)
+    if not matched:
+        return data_type
+    base, length, scale, array = matched.groups()
+    base = _TYPE_ALIASES.get(base, base)
+    if length is not None:
+        base += f"({length}, {scale})" if scale is not None else f"({length})"
+    return base + (array or "")
+
+
+# Hàm tách phần thân CREATE TABLE thành các định nghĩa (theo dấu phẩy ngoài ngoặc)
+def _split_definitions(body):
+    definitions, depth, current = [], 0, []
+    for char in body:
+        if char == "," and depth == 0:
+            definitions.append("".join(current))
+            current = []
+            continue
+        depth += (char == "(") - (char == ")")
+        current.append(char)
+    definitions.append("".join(current))
+    return [definition.strip() for definition in definitions if definition.strip()]
+
+
+# Hàm đọc một định nghĩa cột: (tên cột đã chuẩn hóa, kiểu dữ liệu) hoặc None nếu là ràng buộc của bảng
+def _parse_column_definition(definition):
+    if definition.upper().startswith(_CONSTRAINT_PREFIXES):
+        return None
+    if definition.startswith('"'):
+        name, _, rest = definition[1:].partition('"')
+    else:
+        name, _, rest = definition.partition(" ")
+    words = []
+    for word in rest.split():
+        if word.upper() in _COLUMN_CONSTRAINT_WORDS:
+            break
+        words.append(word)
+    return normalize_column_name(name), normalize_data_type(" ".join(words))
+
+
+# Hàm đọc các Code CREATE TABLE trong nội dung SQL: [(tên bảng đầy đủ, [(tên cột, kiểu dữ liệu)])]
+# (bỏ qua chú thích và cột id tự thêm)
+def parse_create_tables(sql_text):
+    sql_text = re.sub(r"--[^\n]*", "", sql_text)
+    tables = []
+    for matched in _CREATE_TABLE_PATTERN.finditer(sql_text):
+        depth, position = 1, matched.end()
+        while depth and position < len(sql_text):
+            depth += (sql_text[position] == "(") - (sql_text[position] == ")")
+            position += 1
+        if depth:
+            raise ValueError(f"Code CREATE TABLE {matched.group(1)} thiếu dấu đóng ngoặc.")
+        definitions = _split_definitions(sql_text[matched.end():position - 1])
+        columns = [
+            column for column in map(_parse_column_definition, definitions)
+            if column is not None and column[0] != ID_COLUMN
+        ]
+        tables.append((matched.group(1).replace('"', ""), columns))
+    return tables
+
+
+# Hàm tạo ảnh chụp schema dạng JSON từ danh sách (tên cột đã chuẩn hóa, kiểu dữ liệu)
+def schema_snapshot(columns, full_table_name):
+    return json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "table": full_table_name,
+        "columns": [{"name": column_name, "type": data_type} for column_name, data_type in columns],
+    }, ensure_ascii=False, indent=1) + "\n"
+
+
+# Hàm đọc schema cũ từ nội dung file: ảnh chụp JSON hoặc Code SQL (file gộp nhiều bảng thì chọn bảng tên đầy đủ
+# table_name, không có thì bảng cùng tên ở schema khác). Trả về danh sách (tên cột, kiểu dữ liệu)
+def read_previous_schema(text, table_name=None):
+    if text.lstrip().startswith("{"):
+        try:
+            snapshot = json.loads(text)
+            return [(normalize_column_name(column["name"]), normalize_data_type(column["type"]))
+                    for column in snapshot["columns"]]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise ValueError(
+                "Ảnh chụp schema JSON không hợp lệ (cần {\"columns\": [{\"name\", \"type\"}]})."
+            ) from None
+
+    tables = parse_create_tables(text)
+    if not tables:
+        raise ValueError("Không tìm thấy Code CREATE TABLE trong schema cũ.")
+    if len(tables) == 1:
+        return tables[0][1]
+    matches = [columns for name, columns in tables if name == table_name]
+    if not matches and table_name:
+        matches = [columns for name, columns in tables if name.split(".")[-1] == table_name.split(".")[-1]]
+    if len(matches) != 1:
+        raise ValueError(f"Schema cũ có {len(tables)} bảng, không xác định được bảng {table_name or ''}.".strip())
+    return matches[0]
+
+
+# Hàm kiểm tra đổi kiểu cột có buộc PostgreSQL ghi lại toàn bộ bảng hay không: không ghi lại khi chỉ nới rộng
+# VARCHAR (hoặc sang TEXT), TEXT sang VARCHAR không giới hạn, hay tăng độ chính xác NUMERIC giữ nguyên số chữ số
+# thập phân (hoặc bỏ giới hạn); các trường hợp còn lại ghi lại bảng và chỉ số dưới khóa ACCESS EXCLUSIVE
+def type_change_rewrites(old_type, new_type):
+    old_type, new_type = normalize_data_type(old_type), normalize_data_type(new_type)
+    if old_type == new_type:
+        return False
+    old_matched, new_matched = _TYPE_PATTERN.fullmatch(old_type), _TYPE_PATTERN.fullmatch(new_type)
+    if not old_matched or not new_matched or old_matched.group(4) or new_matched.group(4):
+        return True
+    old_base, old_length, old_scale, _ = old_matched.groups()
+    new_base, new_length, new_scale, _ = new_matched.groups()
+    if old_base in ("VARCHAR", "TEXT") and new_base in ("VARCHAR", "TEXT"):
+        if new_base == "TEXT" or new_length is None:
+            return False
+        return old_base == "TEXT" or old_length is None or int(new_length) < int(old_length)
+    if old_base == new_base == "NUMERIC":
+        if new_length is None:
+            return False
+        if old_length is None or (old_scale or "0") != (new_scale or "0"):
+            return True
+        return int(new_length) < int(old_length)
+    return True
+
+
+# Hàm so sánh hai danh sách (tên cột đã chuẩn hóa, kiểu dữ liệu) theo tên cột; trả về các thay đổi
+# (thao tác, tên cột, kiểu cũ, kiểu mới, ghi lại bảng): cột thêm theo thứ tự mới, đổi kiểu, rồi cột xóa
+def diff_columns(old_columns, new_columns):
+    old_types = {column_name: normalize_data_type(data_type) for column_name, data_type in old_columns}
+    new_types = {column_name: normalize_data_type(data_type) for column_name, data_type in new_columns}
+    changes = [(ADD, name, None, data_type, False) for name, data_type in new_types.items() if name not in old_types]
+    changes += [
+        (ALTER_TYPE, name, old_types[name], data_type, type_change_rewrites(old_types[name], data_type))
+        for name, data_type in new_types.items()
+        if name in old_types and old_types[name] != data_type
+    ]
+    changes += [(DROP, name, data_type, None, False) for name, data_type in old_types.items() if name not in new_types]
+    return changes
+
+
+# Hàm tạo lệnh ALTER TABLE (một lệnh cho mọi thay đổi: PostgreSQL ghi lại bảng nhiều nhất một lần) từ các thay
+# đổi của diff_columns; cột thêm không có giá trị mặc định nên không ghi lại bảng. Trả về chú thích nếu
+# không có thay đổi
+def build_alter_table_sql(changes, full_table_name):
+    if not changes:
+        return f"-- Bảng {full_table_name} không có thay đổi so với schema cũ"
+    counts = {action: sum(change[0] == action for change in changes) for action in (ADD, ALTER_TYPE, DROP)}
+    rewrites = sum(rewrite for *_, rewrite in changes)
+    lines = [
+        f"-- Thay đổi bảng {full_table_name}: thêm {counts[ADD]} cột, đổi kiểu {counts[ALTER_TYPE]} cột, "
+        f"xóa {counts[DROP]} cột"
+    ]
+    if rewrites:
+        lines.append(
+            f"-- CẢNH BÁO: {rewrites} cột đổi kiểu buộc ghi lại toàn bộ bảng (khóa ACCESS EXCLUSIVE trong suốt "
+            "quá trình ghi lại, cần dung lượng trống bằng kích thước bảng)"
+        )
+    lines.append(f"ALTER TABLE {full_table_name}")
+    for index, (action, column_name, old_type, new_type, rewrite) in enumerate(changes):
+        separator = "," if index < len(changes) - 1 else ";"
+        if action == ADD:
+            lines.append(f"    ADD COLUMN {column_name} {new_type}{separator}")
+        elif action == DROP:
+            lines.append(f"    DROP COLUMN {column_name}{separator} -- xóa dữ liệu của cột ({old_type})")
+        elif rewrite:
+            lines.append(
+                f"    ALTER COLUMN {column_name} TYPE {new_type} USING {column_name}::{new_type}{separator}"
+                f" -- GHI LẠI BẢNG: {old_type} -> {new_type}"
+            )
+        else:
+            lines.append(
+                f"    ALTER COLUMN {column_name} TYPE {new_type}{separator} -- không ghi lại bảng: {old_type} -> "
+                f"{new_type}"
+            )
+    return "\n".join(lines)
+
+
+# Hàm sinh lệnh ALTER TABLE từ nội dung schema cũ (Code SQL hoặc ảnh chụp JSON) và danh sách cột mới
+def generate_alter_table_sql(previous_text, new_columns, full_table_name):
+    old_columns = read_previous_schema(previous_text, full_table_name)
+    return build_alter_table_sql(diff_columns(old_columns, new_columns), full_table_name)
@@ -0,0 +1,461 @@
+# Đọc file đặc tả và file dữ liệu theo luồng/từng khối (chunk) để bộ nhớ không phụ thuộc kích thước file
+import codecs
+import csv
+import datetime
+import math
+import re
+import tempfile
+import unicodedata
+from collections import deque
+from io import BytesIO
+
+import pandas as pd
+
+from createtable_metrics import measured_stage, track_peak_memory
+
+DEFAULT_CHUNK_SIZE = 50_000
+# Tham số mặc định khi đọc mẫu: số dòng mỗi khối mẫu và số khối trải đều trên tệp
+DEFAULT_SAMPLE_ROWS = 5_000
+DEFAULT_STRATA = 20
+# Số dòng tối đa của một sheet Excel
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Số byte đầu tệp CSV dùng để nhận dạng bảng mã và dấu phân cách
+CSV_SNIFF_BYTES = 8 * 1024
+# Các dấu phân cách được thử (ngang nhau thì ưu tiên theo thứ tự)
+CSV_DELIMITERS = (",", ";", "\t", "|")
+# Bảng mã khi nội dung không phải UTF-8: bảng mã Windows tiếng Việt. cp1258 không định nghĩa các byte 0x81, 0x8A,
+# 0x8D-0x90, 0x9A, 0x9D, 0x9E nên các byte này được đọc thành ký tự thay thế U+FFFD (xem csv_encoding_errors)
+CSV_FALLBACK_ENCODING = "cp1258"
+
+
+# Hàm đặt tên cho tiêu đề cột trống hoặc trùng trong file dữ liệu
+def _clean_headers(headers):
+    cleaned = []
+    for index, header in enumerate(headers, start=1):
+        header = "" if header is None else str(header).strip()
+        header = header or f"cot_{index}"
+        if header in cleaned:
+            header = f"{header}_{index}"
+        cleaned.append(header)
+    return cleaned
+
+
+# Hàm đọc tối đa size byte đầu của tệp (đường dẫn hoặc đối tượng tệp, vị trí đọc được đưa về đầu tệp)
+def _read_head(source, size):
+    if isinstance(source, str):
+        with open(source, "rb") as head_file:
+            return head_file.read(size)
+    source.seek(0)
+    head = source.read(size)
+    source.seek(0)
+    return head
+
+
+# Hàm nhận dạng bảng mã từ các byte đầu tệp: BOM (UTF-8, UTF-16), UTF-16 không BOM (byte 0 xen kẽ),
+# UTF-8 (ký tự nhiều byte bị cắt ở cuối đoạn vẫn hợp lệ), còn lại là cp1258 (đọc với byte không định nghĩa được
+# thay thế)
+def sniff_encoding(head):
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    if len(head) >= 4 and head.count(0) * 4 >= len(head):
+        return "utf-16-le" if head[1::2].count(0) > head[0::2].count(0) else "utf-16-be"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return CSV_FALLBACK_ENCODING
+
+
+# Hàm chọn cách xử lý byte không giải mã được của bảng mã: bảng mã dự phòng thay bằng U+FFFD (tệp vẫn đọc được),
+# bảng mã đã nhận dạng chắc chắn (BOM, UTF-8 hợp lệ ở đầu tệp) thì báo lỗi
+def csv_encoding_errors(encoding):
+    return "replace" if encoding == CSV_FALLBACK_ENCODING else "strict"
+
+
+# Hàm đếm số dấu phân cách ngoài dấu nháy kép trong một dòng
+def _count_delimiter(line, delimiter):
+    return sum(part.count(delimiter) for part in line.split('"')[::2])
+
+
+# Hàm nhận dạng dấu phân cách từ các dòng đầu: dấu xuất hiện cùng số lần (khác 0) ở nhiều dòng nhất, ngang nhau
+# thì nhiều lần hơn trong mỗi dòng; không dấu nào xuất hiện thì dùng dấu phẩy
+def sniff_delimiter(lines):
+    best, best_score = ",", (0, 0)
+    for delimiter in CSV_DELIMITERS:
+        counts = [_count_delimiter(line, delimiter) for line in lines]
+        if not counts or not counts[0]:
+            continue
+        # Số dòng có cùng số dấu như dòng tiêu đề
+        score = (sum(count == counts[0] for count in counts), counts[0])
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+# Hàm nhận dạng định dạng tệp CSV chỉ từ CSV_SNIFF_BYTES byte đầu (đọc thêm nếu dòng tiêu đề dài hơn):
+# trả về (bảng mã, dấu phân cách, tên các cột ở dòng tiêu đề)
+def sniff_csv_format(source):
+    size = CSV_SNIFF_BYTES
+    head = _read_head(source, size)
+    while b"\n" not in head and len(head) == size:
+        size *= 4
+        head = _read_head(source, size)
+    encoding = sniff_encoding(head)
+    text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(head, final=False)
+    lines = text.splitlines()
+    # Dòng cuối có thể bị cắt dở (trừ khi đã đọc hết tệp)
+    if len(head) == size and len(lines) > 1:
+        lines = lines[:-1]
+    delimiter = sniff_delimiter([line for line in lines if line.strip()])
+    header = next(csv.reader(lines[:1], delimiter=delimiter), [])
+    return encoding, delimiter, header
+
+
+# Hàm đưa chuỗi về dạng dựng sẵn (NFC): tệp cp1258 lưu tiếng Việt dạng ký tự gốc kèm dấu tổ hợp
+def _compose_text(frame):
+    for column_name in frame.columns:
+        values = frame[column_name]
+        if not pd.api.types.is_numeric_dtype(values.dtype):
+            frame[column_name] = values.str.normalize("NFC")
+    frame.columns = [unicodedata.normalize("NFC", str(column_name)) for column_name in frame.columns]
+    return frame
+
+
+_RAGGED_ROW_PATTERN = re.compile(r"Expected (\d+) fields in line (\d+), saw (\d+)")
+
+
+# Hàm tạo thông báo lỗi cho dòng CSV có nhiều trường hơn dòng tiêu đề từ lỗi của engine C
+def _ragged_row_message(error):
+    matched = _RAGGED_ROW_PATTERN.search(str(error))
+    if not matched:
+        return f"Tệp CSV không đọc được: {error}"
+    expected, line, seen = matched.groups()
+    return f"Dòng {line} của tệp CSV có {seen} trường, nhiều hơn {expected} cột của dòng tiêu đề."
+
+
+# Hàm đọc các cột usecols (None: mọi cột) của tệp CSV dưới dạng chuỗi; nhận dạng bảng mã và dấu phân cách từ
+# các byte đầu, đọc bằng engine pyarrow (đa luồng) và quay về engine C nếu không có pyarrow hoặc pyarrow không
+# đọc được (số trường mỗi dòng không đều, tiêu đề trùng tên, byte không giải mã được...). Dòng thiếu trường được
+# đọc thành ô trống; dòng có nhiều trường hơn dòng tiêu đề gây ValueError (không bỏ bớt trường hay dịch cột)
+def read_csv_columns(source, usecols=None):
+    encoding, delimiter, header = sniff_csv_format(source)
+    options = {"sep": delimiter, "encoding": encoding, "encoding_errors": csv_encoding_errors(encoding), "dtype": str}
+    names = None if usecols is None else [header[index] for index in usecols if index < len(header)]
+    if names is None or len(set(names)) == len(names) == len(usecols):
+        try:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            frame = pd.read_csv(source, engine="pyarrow", usecols=names, **options)
+            return _compose_text(frame) if encoding == CSV_FALLBACK_ENCODING else frame
+        except (ImportError, ValueError):
+            pass
+    if hasattr(source, "seek"):
+        source.seek(0)
+    # Đọc dòng tiêu đề như một dòng dữ liệu: engine C chỉ báo lỗi dòng thừa trường khi không có usecols và không
+    # dùng header (nếu không, trường thừa bị bỏ đi hoặc cột đầu bị dùng làm index mà không báo lỗi)
+    try:
+        frame = pd.read_csv(source, header=None, **options)
+    except pd.errors.ParserError as e:
+        raise ValueError(_ragged_row_message(e)) from None
+    frame.columns = _clean_headers(None if pd.isna(name) else name for name in frame.iloc[0])
+    frame = frame.iloc[1:].reset_index(drop=True)
+    if usecols is not None:
+        frame = frame.iloc[:, [index for index in usecols if index < frame.shape[1]]]
+    return _compose_text(frame) if encoding == CSV_FALLBACK_ENCODING else frame
+
+
+# Hàm mở workbook Excel ở chế độ chỉ đọc (openpyxl đọc XML theo luồng, không dựng toàn bộ workbook)
+def _open_workbook(source):
+    from openpyxl import load_workbook
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return load_workbook(source, read_only=True, data_only=True)
+
+
+# Hàm lấy sheet theo tên (mặc định: sheet đang hoạt động)
+def _get_sheet(workbook, sheet_name=None):
+    return workbook[sheet_name] if sheet_name else workbook.active
+
+
+# Hàm liệt kê tên các sheet của file Excel (không đọc dữ liệu)
+def list_sheet_names(source):
+    workbook = _open_workbook(source)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+# Hàm tìm vị trí các cột cần đọc theo tên tiêu đề (None: đọc mọi cột)
+def _column_indexes(headers, usecols):
+    if usecols is None:
+        return list(range(len(headers)))
+    usecols = set(usecols)
+    return [index for index, header in enumerate(headers) if header in usecols]
+
+
+# Hàm đọc file Excel theo khối bằng openpyxl ở chế độ chỉ đọc, chỉ giữ các cột usecols
+def _iter_excel_chunks(source, chunksize, sheet_name=None, usecols=None):
+    workbook = _open_workbook(source)
+    try:
+        rows = _get_sheet(workbook, sheet_name).iter_rows(values_only=True)
+        headers = _clean_headers(next(rows, ()))
+        indexes = _column_indexes(headers, usecols)
+        columns = [headers[index] for index in indexes]
+        buffer = []
+        for row in rows:
+            # Bỏ qua dòng trống hoàn toàn ở cuối sheet
+            if all(value is None for value in row):
+                continue
+            buffer.append([row[index] if index < len(row) else None for index in indexes])
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+# Hàm đọc file dữ liệu (CSV/XLSX, mỗi cột một trường) thành các DataFrame tối đa chunksize dòng
+def iter_data_chunks(source, file_name=None, chunksize=DEFAULT_CHUNK_SIZE, sheet_name=None, usecols=None):
+    file_name = file_name or getattr(source, "name", str(source))
+    if file_name.lower().endswith(".csv"):
+        # Đọc mọi giá trị dưới dạng chuỗi để suy luận giống như với "Giá trị mẫu", chỉ đọc các cột usecols
+        # (engine C: pyarrow không đọc theo khối)
+        encoding, delimiter, _ = sniff_csv_format(source)
+        wanted = None if usecols is None else set(usecols)
+
+        def wanted_column(column):
+            return unicodedata.normalize("NFC", str(column).strip()) in wanted
+
+        with pd.read_csv(source, chunksize=chunksize, dtype=str, sep=delimiter, encoding=encoding,
+                         encoding_errors=csv_encoding_errors(encoding),
+                         usecols=None if wanted is None else wanted_column) as reader:
+            for chunk in reader:
+                if encoding == CSV_FALLBACK_ENCODING:
+                    chunk = _compose_text(chunk)
+                chunk.columns = _clean_headers(chunk.columns)
+                yield chunk
+    else:
+        yield from _iter_excel_chunks(source, chunksize, sheet_name=sheet_name, usecols=usecols)
+
+
+# Hàm đọc dòng tiêu đề của file dữ liệu (tên các cột)
+def read_data_headers(source, file_name=None, sheet_name=None):
+    file_name = file_name or getattr(source, "name", str(source))
+    if file_name.lower().endswith(".csv"):
+        encoding, delimiter, _ = sniff_csv_format(source)
+        headers = pd.read_csv(source, nrows=0, sep=delimiter, encoding=encoding,
+                              encoding_errors=csv_encoding_errors(encoding)).columns
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return _clean_headers(unicodedata.normalize("NFC", str(header)) for header in headers)
+    workbook = _open_workbook(source)
+    try:
+        return _clean_headers(next(_get_sheet(workbook, sheet_name).iter_rows(values_only=True), ()))
+    finally:
+        workbook.close()
+
+
+# Hàm ghi dòng tiêu đề và các dòng (iterable, mỗi dòng một danh sách giá trị) ra file Excel ở chế độ
+# constant_memory của xlsxwriter: mỗi dòng được ghi xuống tệp ngay khi chuyển sang dòng sau, bộ nhớ lúc ghi không phụ thuộc
+# số dòng. Chuỗi luôn được ghi dạng chữ (không hiểu "=..." là công thức). Trả về số dòng dữ liệu đã ghi
+@measured_stage("excel_export", counts=lambda row_count: (row_count, None))
+def write_excel_rows(path, headers, rows, sheet_name="Converted Data"):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        worksheet = workbook.add_worksheet(sheet_name)
+        date_format = workbook.add_format({"num_format": "dd/mm/yyyy"})
+        datetime_format = workbook.add_format({"num_format": "dd/mm/yyyy hh:mm:ss"})
+        worksheet.write_row(0, 0, headers)
+        row_index = 0
+        for row_index, row in enumerate(rows, start=1):
+            if row_index >= EXCEL_MAX_ROWS:
+                raise ValueError(f"Dữ liệu vượt quá {EXCEL_MAX_ROWS - 1:,} dòng, số dòng tối đa của một sheet Excel.")
+            for column_index, value in enumerate(row):
+                if value is None:
+                    continue
+                if isinstance(value, str):
+                    worksheet.write_string(row_index, column_index, value)
+                elif isinstance(value, bool):
+                    worksheet.write_boolean(row_index, column_index, value)
+                elif isinstance(value, datetime.datetime):
+                    worksheet.write_datetime(row_index, column_index, value, datetime_format)
+                elif isinstance(value, datetime.date):
+                    worksheet.write_datetime(row_index, column_index, value, date_format)
+                elif isinstance(value, (int, float)) and math.isfinite(value):
+                    worksheet.write_number(row_index, column_index, value)
+                else:
+                    worksheet.write_string(row_index, column_index, str(value))
+        return row_index
+    finally:
+        workbook.close()
+
+
+# Hàm đọc file đặc tả Excel theo luồng: chỉ đọc hai cột đầu của sheet, bỏ các dòng trống
+def read_excel_spec(source, sheet_name=None):
+    workbook = _open_workbook(source)
+    try:
+        rows = _get_sheet(workbook, sheet_name).iter_rows(max_col=2, values_only=True)
+        header = tuple(next(rows, ()))
+        data = [row for row in rows if row[0] is not None or (len(row) > 1 and row[1] is not None)]
+    finally:
+        workbook.close()
+
+    if len(header) < 2 or (header[1] is None and all(len(row) < 2 or row[1] is None for row in data)):
+        raise ValueError("Tệp phải có ít nhất 2 cột: 'Tên cột' và 'Giá trị mẫu'.")
+    return pd.DataFrame(data, columns=_clean_headers(header))
+
+
+# Đọc mẫu phân tầng từ file CSV: chia file thành các đoạn byte đều nhau, nhảy (seek) tới đầu
+# mỗi đoạn và chỉ đọc rows_per_stratum dòng, không cần đọc toàn bộ file. Tệp UTF-16 (không tách dòng theo byte
+# được) được chuyển sang UTF-8 trong tệp tạm trước khi đọc mẫu
+class CsvSampler:
+    def __init__(self, source, rows_per_stratum, strata):
+        self.encoding, self.delimiter, _ = sniff_csv_format(source)
+        self._owns_file = isinstance(source, str)
+        self._file = open(source, "rb") if self._owns_file else source
+        if self.encoding.startswith("utf-16"):
+            self._file = self._transcode(self._file)
+            self._owns_file = True
+            self.encoding = "utf-8"
+        self._file.seek(0)
+        self.header = self._file.readline()
+        self.data_start = self._file.tell()
+        self.size = self._file.seek(0, 2)
+        self.rows_per_stratum = rows_per_stratum
+        self.strata = max(1, strata)
+        # Vị trí byte đã đọc tới (các đoạn mẫu và phần cuối tệp không đọc trùng nhau)
+        self.position = self.data_start
+        self.reached_end = self.data_start >= self.size
+
+    # Hàm chép nội dung tệp UTF-16 sang tệp tạm UTF-8 (theo từng khối); đóng tệp gốc nếu đã tự mở
+    def _transcode(self, source):
+        target = tempfile.TemporaryFile()
+        source.seek(0)
+        reader = codecs.getreader(self.encoding)(source)
+        for block in iter(lambda: reader.read(1024 * 1024), ""):
+            target.write(block.encode("utf-8"))
+        if self._owns_file:
+            source.close()
+        return target
+
+    def _parse(self, lines):
+        chunk = pd.read_csv(BytesIO(self.header + b"".join(lines)), dtype=str, on_bad_lines="skip",
+                            sep=self.delimiter, encoding=self.encoding,
+                            encoding_errors=csv_encoding_errors(self.encoding))
+        if self.encoding == CSV_FALLBACK_ENCODING:
+            chunk = _compose_text(chunk)
+        chunk.columns = _clean_headers(chunk.columns)
+        return chunk
+
+    # Các khối mẫu, khối đầu tiên bắt đầu từ đầu tệp
+    def iter_strata(self):
+        span = self.size - self.data_start
+        for index in range(self.strata):
+            if self.reached_end:
+                return
+            offset = max(self.data_start + span * index // self.strata, self.position)
+            self._file.seek(offset)
+            # Bỏ phần dòng bị cắt dở khi nhảy vào giữa đoạn
+            if offset != self.position:
+                self._file.readline()
+            lines = []
+            while len(lines) < self.rows_per_stratum:
+                line = self._file.readline()
+                if not line:
+                    self.reached_end = True
+                    break
+                lines.append(line)
+            self.position = self._file.tell()
+            if lines:
+                yield self._parse(lines)
+
+    # Khối tối đa tail_rows dòng cuối tệp nằm sau phần đã đọc (đọc ngược từ cuối),
+    # None nếu các khối mẫu đã đọc tới cuối tệp
+    def read_tail(self, tail_rows):
+        if self.position >= self.size or tail_rows <= 0:
+            return None
+        block_size = 64 * 1024
+        while True:
+            start = max(self.position, self.size - block_size)
+            self._file.seek(start)
+            lines = self._file.read(self.size - start).split(b"\n")
+            if start > self.position:
+                lines = lines[1:]
+            lines = [line + b"\n" for line in lines if line.strip()]
+            if len(lines) >= tail_rows or start == self.position:
+                return self._parse(lines[-tail_rows:]) if lines else None
+            block_size *= 2
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+
+# Đọc mẫu từ file Excel: XLSX không nhảy (seek) được nên các khối mẫu là các khối liên tiếp từ đầu sheet,
+# phần cuối sheet được đọc riêng
+class ExcelSampler:
+    def __init__(self, source, rows_per_stratum, strata, sheet_name=None):
+        self._workbook = _open_workbook(source)
+        self._sheet = _get_sheet(self._workbook, sheet_name)
+        self._rows = self._sheet.iter_rows(values_only=True)
+        self.header = _clean_headers(next(self._rows, ()))
+        self.rows_per_stratum = rows_per_stratum
+        self.strata = max(1, strata)
+        # Số dòng dữ liệu đã đọc (không tính tiêu đề)
+        self.position = 0
+        self.reached_end = False
+
+    def _to_frame(self, rows):
+        return pd.DataFrame([row[:len(self.header)] for row in rows], columns=self.header)
+
+    def iter_strata(self):
+        for _ in range(self.strata):
+            rows = []
+            for row in self._rows:
+                self.position += 1
+                if any(value is not None for value in row):
+                    rows.append(row)
+                if len(rows) >= self.rows_per_stratum:
+                    break
+            else:
+                self.reached_end = True
+            if rows:
+                yield self._to_frame(rows)
+            if self.reached_end:
+                return
+
+    def read_tail(self, tail_rows):
+        if self.reached_end or tail_rows <= 0:
+            return None
+        max_row = self._sheet.max_row
+        if max_row:
+            # Dòng 1 là tiêu đề, dòng dữ liệu thứ position nằm ở dòng position + 1 của sheet
+            min_row = max(self.position + 2, max_row - tail_rows + 1)
+            if min_row > max_row:
+                return None
+            rows = self._sheet.iter_rows(min_row=min_row, max_row=max_row, values_only=True)
+        else:
+            # Sheet không ghi kích thước: đọc tiếp tới cuối, chỉ giữ tail_rows dòng cuối
+            rows = deque(self._rows, maxlen=tail_rows)
+        rows = [row for row in rows if any(value is not None for value in row)]
+        return self._to_frame(rows) if rows else None
+
+    def close(self):
+        self._workbook.close()
+
+
+# Hàm mở bộ đọc mẫu phù hợp với loại tệp
+def open_sampler(source, file_name=None, rows_per_stratum=DEFAULT_SAMPLE_ROWS, strata=DEFAULT_STRATA, sheet_name=None):
+    file_name = file_name or getattr(source, "name", str(source))
+    if file_name.lower().endswith(".csv"):
+        return CsvSampler(source, rows_per_stratum, strata)
+    return ExcelSampler(source, rows_per_stratum, strata, sheet_name=sheet_name)
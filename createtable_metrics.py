@@ -0,0 +1,221 @@
+# Đo thời gian, số dòng/cột và bộ nhớ đỉnh của từng giai đoạn xử lý (đọc tệp, chuẩn hóa tên cột, suy luận kiểu,
+# sinh Code SQL, xuất dữ liệu); ghi kết quả dạng JSON lines và dạng văn bản Prometheus (textfile collector)
+import contextvars
+import functools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Tên các tệp ghi số đo trong thư mục số đo
+METRICS_JSONL_FILE = "createtable_metrics.jsonl"
+METRICS_PROM_FILE = "createtable_metrics.prom"
+# Thư mục số đo mặc định của giao diện (không đặt: không ghi tệp)
+METRICS_DIR_ENV = "CREATETABLE_METRICS_DIR"
+
+# Bộ ghi số đo đang hoạt động (mỗi luồng một bộ ghi; None: các giai đoạn không được ghi)
+_current = contextvars.ContextVar("createtable_stage_metrics", default=None)
+
+# Các chỉ số Prometheus: (tên, loại, mô tả)
+_PROMETHEUS_METRICS = (
+    ("createtable_stage_runs_total", "counter", "Số lần chạy của giai đoạn"),
+    ("createtable_stage_seconds_total", "counter", "Tổng thời gian chạy của giai đoạn (giây)"),
+    ("createtable_stage_rows_total", "counter", "Tổng số dòng đã xử lý của giai đoạn"),
+    ("createtable_stage_last_seconds", "gauge", "Thời gian của lần chạy gần nhất (giây)"),
+    ("createtable_stage_last_peak_memory_bytes", "gauge", "Bộ nhớ đỉnh của lần chạy gần nhất có đo (byte)"),
+)
+_PROMETHEUS_LINE = re.compile(r'^(\w+)\{stage="((?:[^"\\]|\\.)*)"\} (\S+)$')
+
+
+# Các khối đang đo bộ nhớ đỉnh (lồng nhau hoặc ở các luồng khác), mỗi phần tử: [bộ nhớ đỉnh lớn nhất đã thấy].
+# Số khối đang đo là bộ đếm tham chiếu của tracemalloc (dùng chung cả tiến trình): started: tracemalloc được bật
+# bởi các khối này, tắt khi khối cuối cùng kết thúc. Mọi thao tác trên hai biến giữ _memory_lock (các phiên
+# Streamlit chạy ở các luồng khác nhau)
+_peak_watchers = []
+_tracing = {"started": False}
+_memory_lock = threading.Lock()
+# Khóa đọc - cộng dồn - ghi tệp số đo giữa các luồng của tiến trình
+_write_lock = threading.Lock()
+
+
+# Đo bộ nhớ đỉnh (tracemalloc) trong khối with; kết quả ghi vào dict trả về khi khối kết thúc: {"peak_bytes": ...}.
+# Các khối lồng nhau không làm sai bộ nhớ đỉnh của nhau: trước khi đặt lại đỉnh, đỉnh hiện tại được ghi nhận
+# cho mọi khối đang đo
+@contextmanager
+def track_peak_memory():
+    result = {}
+    watcher = [0]
+    with _memory_lock:
+        if not _peak_watchers and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing["started"] = True
+        peak = tracemalloc.get_traced_memory()[1]
+        for outer in _peak_watchers:
+            outer[0] = max(outer[0], peak)
+        tracemalloc.reset_peak()
+        _peak_watchers.append(watcher)
+    try:
+        yield result
+    finally:
+        with _memory_lock:
+            peak = max(watcher[0], tracemalloc.get_traced_memory()[1])
+            _peak_watchers.remove(watcher)
+            for outer in _peak_watchers:
+                outer[0] = max(outer[0], peak)
+            result["peak_bytes"] = peak
+            if not _peak_watchers and _tracing["started"]:
+                tracemalloc.stop()
+                _tracing["started"] = False
+
+
+# Bộ ghi số đo các giai đoạn: records là các giai đoạn đã kết thúc chưa được lấy ra (drain);
+# trace_memory đo bộ nhớ đỉnh bằng tracemalloc (làm chậm việc cấp phát bộ nhớ)
+class StageMetrics:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+
+    # Lấy ra các giai đoạn đã ghi (theo thứ tự kết thúc) và làm rỗng bộ ghi
+    def drain(self):
+        records, self.records = self.records, []
+        return records
+
+
+# Đặt bộ ghi số đo cho luồng hiện tại (không khôi phục bộ ghi cũ); None: tắt ghi
+def activate_stage_metrics(metrics):
+    _current.set(metrics)
+
+
+# Ghi các giai đoạn trong khối with vào metrics, rồi khôi phục bộ ghi trước đó
+@contextmanager
+def collect_stages(metrics):
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+# Đo một giai đoạn: thời gian thực, số dòng/cột, kích thước dữ liệu vào và bộ nhớ đỉnh (nếu bộ ghi bật đo bộ nhớ).
+# Bản ghi trả về cho khối with để cập nhật số dòng/cột khi đã biết; không có bộ ghi thì chỉ trả về bản ghi.
+# Giai đoạn lỗi vẫn được ghi (error: True)
+@contextmanager
+def stage(name, rows=None, columns=None, size_bytes=None):
+    record = {"stage": name, "rows": rows, "columns": columns, "size_bytes": size_bytes}
+    metrics = _current.get()
+    if metrics is None:
+        yield record
+        return
+
+    record["started_at"] = time.time()
+    start = time.perf_counter()
+    memory = {}
+    try:
+        with track_peak_memory() if metrics.trace_memory else nullcontext(memory) as memory:
+            yield record
+    except BaseException:
+        record["error"] = True
+        raise
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        record["peak_bytes"] = memory.get("peak_bytes")
+        metrics.records.append(record)
+
+
+# Decorator đo mỗi lần gọi hàm là một giai đoạn; counts: hàm lấy (số dòng, số cột) từ kết quả
+def measured_stage(name, counts=None):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = function(*args, **kwargs)
+                if counts is not None:
+                    record["rows"], record["columns"] = counts(result)
+            return result
+        return wrapper
+    return decorate
+
+
+# Thêm các giai đoạn đã đo ở nơi khác (ví dụ trong tiến trình con) vào bộ ghi đang hoạt động
+def record_stages(records):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.records.extend(records)
+
+
+# Hàm chuyển các giai đoạn thành JSON lines (mỗi giai đoạn một dòng)
+def stages_to_json_lines(records):
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+# Hàm đọc các giá trị đã ghi trong tệp Prometheus: {(tên chỉ số, giai đoạn): giá trị}
+def _read_prometheus(path):
+    values = {}
+    if not os.path.isfile(path):
+        return values
+    with open(path, encoding="utf-8") as prom_file:
+        for line in prom_file:
+            matched = _PROMETHEUS_LINE.match(line.strip())
+            if matched:
+                name, stage_name, value = matched.groups()
+                values[name, stage_name.replace('\\"', '"').replace("\\\\", "\\")] = float(value)
+    return values
+
+
+# Hàm cộng dồn các giai đoạn vào các giá trị Prometheus đã có (bộ đếm cộng dồn, gauge lấy lần chạy gần nhất)
+def _update_prometheus(values, records):
+    for record in records:
+        name = record["stage"]
+        for metric, increment in (
+            ("createtable_stage_runs_total", 1),
+            ("createtable_stage_seconds_total", record["seconds"]),
+            ("createtable_stage_rows_total", record["rows"] or 0),
+        ):
+            values[metric, name] = values.get((metric, name), 0) + increment
+        values["createtable_stage_last_seconds", name] = record["seconds"]
+        if record.get("peak_bytes") is not None:
+            values["createtable_stage_last_peak_memory_bytes", name] = record["peak_bytes"]
+    return values
+
+
+# Hàm tạo nội dung tệp Prometheus (định dạng văn bản) từ các giá trị
+def prometheus_text(values):
+    lines = []
+    for metric, metric_type, description in _PROMETHEUS_METRICS:
+        samples = sorted((stage_name, value) for (name, stage_name), value in values.items() if name == metric)
+        if not samples:
+            continue
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {metric_type}"]
+        for stage_name, value in samples:
+            label = stage_name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{stage="{label}"}} {value:.17g}')
+    return "\n".join(lines) + "\n"
+
+
+# Hàm ghi các giai đoạn vào thư mục số đo: nối thêm vào tệp JSON lines và cộng dồn vào tệp Prometheus
+# (ghi tệp tạm riêng rồi đổi tên để công cụ giám sát không đọc phải tệp ghi dở). Các luồng (phiên Streamlit) ghi
+# lần lượt dưới _write_lock nên không mất phần cộng dồn của nhau
+def write_stage_metrics(records, directory):
+    if not records:
+        return
+    os.makedirs(directory, exist_ok=True)
+    prom_path = os.path.join(directory, METRICS_PROM_FILE)
+    with _write_lock:
+        with open(os.path.join(directory, METRICS_JSONL_FILE), "a", encoding="utf-8") as jsonl_file:
+            jsonl_file.write(stages_to_json_lines(records))
+
+        values = _update_prometheus(_read_prometheus(prom_path), records)
+        descriptor, temp_path = tempfile.mkstemp(prefix=f"{METRICS_PROM_FILE}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as prom_file:
+                prom_file.write(prometheus_text(values))
+            # mkstemp tạo tệp chỉ chủ sở hữu đọc được; công cụ giám sát thường chạy dưới người dùng khác
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, prom_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
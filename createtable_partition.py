@@ -0,0 +1,107 @@
+# Đề xuất phân vùng theo khoảng ngày (PARTITION BY RANGE) và index cho các bảng lớn
+import datetime
+import re
+
+from createtable_core import build_layout_create_table_sql
+
+# Các kiểu ngày dùng được làm cột phân vùng
+DATE_TYPES = ("DATE", "TIMESTAMP", "TIMESTAMPTZ")
+# Khoảng thời gian của mỗi phân vùng
+PARTITION_INTERVALS = ("month", "year")
+# Số phân vùng tối đa sinh ra cho một bảng
+MAX_PARTITIONS = 1_200
+# Tên cột dạng mã/khóa sau chuẩn hóa: ma_kh, id_giao_dich, khach_hang_id, ma, ...
+KEY_NAME_PATTERN = re.compile(r"(?:^|_)(?:ma|id|code|key)(?:_|$)")
+# Cột có tỷ lệ giá trị khác nhau / số ô có dữ liệu thấp hơn ngưỡng này: index B-tree ít hiệu quả
+LOW_SELECTIVITY_RATIO = 0.01
+
+
+# Hàm lấy tên các cột kiểu ngày (có thể chọn làm cột phân vùng)
+def date_columns(columns):
+    return [column_name for column_name, data_type in columns if data_type in DATE_TYPES]
+
+
+# Hàm trả về ngày đầu kỳ chứa day và ngày đầu kỳ kế tiếp
+def _period_bounds(day, interval):
+    if interval == "year":
+        lower = day.replace(month=1, day=1)
+        return lower, lower.replace(year=lower.year + 1)
+    lower = day.replace(day=1)
+    return lower, (lower + datetime.timedelta(days=32)).replace(day=1)
+
+
+# Hàm liệt kê các phân vùng (hậu tố tên bảng, ngày bắt đầu, ngày kết thúc không bao gồm) phủ khoảng [start, end)
+def iter_partition_ranges(start, end, interval="month"):
+    if interval not in PARTITION_INTERVALS:
+        raise ValueError(f"Khoảng phân vùng không hợp lệ: {interval}")
+    lower, upper = _period_bounds(start, interval)
+    while lower < end:
+        yield (f"{lower:%Y}" if interval == "year" else f"{lower:%Y_%m}"), lower, upper
+        lower, upper = _period_bounds(upper, interval)
+
+
+# Hàm tạo Code CREATE TABLE cho các phân vùng của bảng, kèm phân vùng DEFAULT cho giá trị ngoài khoảng
+def build_partitions_sql(full_table_name, start, end, interval="month"):
+    partitions = list(iter_partition_ranges(start, end, interval))
+    if len(partitions) > MAX_PARTITIONS:
+        raise ValueError(f"Khoảng ngày tạo ra {len(partitions):,} phân vùng, vượt quá {MAX_PARTITIONS:,}.")
+    statements = [
+        f"CREATE TABLE {full_table_name}_{suffix} PARTITION OF {full_table_name}\n"
+        f"    FOR VALUES FROM ('{lower:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}');"
+        for suffix, lower, upper in partitions
+    ]
+    statements.append(f"CREATE TABLE {full_table_name}_default PARTITION OF {full_table_name} DEFAULT;")
+    return "\n".join(statements)
+
+
+# Hàm tạo Code CREATE TABLE của bảng phân vùng theo cột partition_column và các phân vùng trong khoảng [start, end)
+def build_partitioned_table_sql(columns, full_table_name, partition_column, start, end, interval="month",
+                                physical_layout=False, lengths=None):
+    return (
+        build_layout_create_table_sql(columns, full_table_name, physical_layout, lengths, partition_column)
+        + "\n\n" + build_partitions_sql(full_table_name, start, end, interval)
+    )
+
+
+# Hàm đề xuất index cho các cột: BRIN cho cột ngày, B-tree cho cột dạng mã/khóa. profiles (hồ sơ các cột từ dữ liệu
+# thực, nếu có) cho biết số giá trị khác nhau; trả về danh sách (tên cột, loại index, lý do, Code SQL hoặc None)
+def recommend_indexes(columns, full_table_name, partition_column=None, profiles=None):
+    profiles = {profile.normalized_name: profile for profile in profiles or []}
+    table_name = full_table_name.split(".")[-1]
+    recommendations = []
+    for column_name, data_type in columns:
+        profile = profiles.get(column_name)
+        if data_type in DATE_TYPES:
+            if column_name == partition_column:
+                reason = "Cột phân vùng: mỗi phân vùng chỉ chứa một khoảng ngày, BRIN nhỏ và đủ để lọc trong phân vùng"
+            else:
+                reason = ("Cột ngày thường tăng theo thứ tự nạp dữ liệu: BRIN nhỏ hơn B-tree nhiều lần "
+                          "(dùng B-tree nếu dữ liệu không được nạp theo thời gian)")
+            recommendations.append((
+                column_name, "BRIN", reason,
+                f"CREATE INDEX {table_name}_{column_name}_brin ON {full_table_name} USING BRIN ({column_name});",
+            ))
+            continue
+
+        if not KEY_NAME_PATTERN.search(column_name):
+            continue
+        filled = profile.row_count - profile.null_count if profile else 0
+        if profile and profile.distinct_count is not None and filled:
+            if profile.distinct_count / filled < LOW_SELECTIVITY_RATIO:
+                recommendations.append((
+                    column_name, None,
+                    f"Cột dạng mã nhưng chỉ có {profile.distinct_count:,} giá trị khác nhau trên {filled:,} dòng: "
+                    "index B-tree ít hiệu quả",
+                    None,
+                ))
+                continue
+            reason = f"Cột dạng mã/khóa, {profile.distinct_count:,} giá trị khác nhau trên {filled:,} dòng"
+        elif profile and filled:
+            reason = "Cột dạng mã/khóa, có nhiều giá trị khác nhau"
+        else:
+            reason = "Cột dạng mã/khóa (theo tên cột), thường dùng để tra cứu và nối bảng"
+        recommendations.append((
+            column_name, "B-tree", reason,
+            f"CREATE INDEX {table_name}_{column_name}_idx ON {full_table_name} ({column_name});",
+        ))
+    return recommendations
@@ -0,0 +1,300 @@
+# Suy luận kiểu dữ liệu từ toàn bộ file dữ liệu thực (mỗi cột một trường), đọc theo từng khối
+import math
+
+import pandas as pd
+
+from createtable_core import (
+    build_layout_create_table_sql,
+    infer_data_type,
+    infer_data_types,
+    match_date_formats,
+    normalize_column_name,
+    normalize_column_names,
+)
+from createtable_io import DEFAULT_CHUNK_SIZE, DEFAULT_SAMPLE_ROWS, DEFAULT_STRATA, iter_data_chunks, open_sampler
+from createtable_metrics import measured_stage
+from createtable_types import (
+    decimal_separator_from_votes,
+    decimal_separator_votes,
+    estimate_type_bytes,
+    has_time_component,
+    narrow_data_type,
+    summarize_numbers,
+)
+
+# Tham số mặc định của chế độ lấy mẫu: độ tin cậy, tỷ lệ giá trị khác kiểu chấp nhận bỏ sót
+# và số dòng cuối tệp luôn được kiểm tra
+DEFAULT_CONFIDENCE = 0.99
+DEFAULT_TOLERANCE = 0.001
+DEFAULT_TAIL_ROWS = 1_000
+# Số giá trị khác nhau tối đa được đếm cho mỗi cột (nhiều hơn: xem như có nhiều giá trị khác nhau)
+DISTINCT_LIMIT = 1_000
+
+
+# Bằng chứng kiểu dữ liệu của một cột, cộng dồn qua từng khối (bộ nhớ cố định cho mỗi cột)
+class ColumnProfile:
+    def __init__(self, column_name):
+        self.column_name = column_name
+        self.normalized_name = normalize_column_name(column_name)
+        self.row_count = 0
+        self.null_count = 0
+        self.type_counts = {}
+        # Số giá trị theo từng định dạng ngày (dùng lại khi chuyển đổi dữ liệu để nạp vào bảng)
+        self.date_format_counts = {}
+        # Số phiếu cho dấu thập phân "." và "," của các giá trị số dạng chuỗi (1.000 là một nghìn hay một?)
+        self.separator_votes = {".": 0, ",": 0}
+        # Chế độ lấy mẫu: kiểu thay đổi sau khi kiểm tra phần cuối tệp
+        self.tail_outlier = False
+        # Giá trị đã quan sát, dùng để thu hẹp kiểu và đề xuất index: khoảng và độ chính xác của các giá trị số,
+        # các giá trị khác nhau (None khi đã quá DISTINCT_LIMIT), thành phần giờ của giá trị ngày,
+        # độ dài giá trị chữ
+        self.number_min = None
+        self.number_max = None
+        self.max_integer_digits = 0
+        self.max_scale = 0
+        self.inexact_numbers = 0
+        self.distinct_values = set()
+        self.has_time = False
+        self.text_length = 0
+        self.text_count = 0
+
+    # Cộng dồn bằng chứng từ một khối giá trị của cột
+    def update(self, values):
+        row_count = len(values)
+        # Ô trống (NaN, None, chuỗi chỉ có khoảng trắng) không phải là bằng chứng về kiểu
+        values = values[values.notna()]
+        if values.dtype == object:
+            values = values[values.astype(str).str.strip() != ""]
+        self.row_count += row_count
+        self.null_count += row_count - len(values)
+        if len(values):
+            data_types = infer_data_types(values, [self.column_name] * len(values))
+            for data_type, count in data_types.value_counts().items():
+                self.type_counts[data_type] = self.type_counts.get(data_type, 0) + int(count)
+            date_values = values[(data_types == "DATE").to_numpy()]
+            for date_format, count in match_date_formats(date_values).value_counts().items():
+                self.date_format_counts[date_format] = self.date_format_counts.get(date_format, 0) + int(count)
+            self._update_observed(values, data_types)
+
+    # Cộng dồn các giá trị đã quan sát dùng để thu hẹp kiểu
+    def _update_observed(self, values, data_types):
+        if self.distinct_values is not None:
+            self.distinct_values.update(pd.unique(values.astype(str).str.strip().str.lower()))
+            if len(self.distinct_values) > DISTINCT_LIMIT:
+                self.distinct_values = None
+
+        numbers = values[(data_types == "DOUBLE PRECISION").to_numpy()]
+        if len(numbers):
+            for separator, votes in decimal_separator_votes(numbers).items():
+                self.separator_votes[separator] += votes
+            number_min, number_max, integer_digits, scale, inexact = summarize_numbers(numbers, self.decimal_separator)
+            if number_min is not None:
+                self.number_min = number_min if self.number_min is None else min(self.number_min, number_min)
+                self.number_max = number_max if self.number_max is None else max(self.number_max, number_max)
+            self.max_integer_digits = max(self.max_integer_digits, integer_digits)
+            self.max_scale = max(self.max_scale, scale)
+            self.inexact_numbers += inexact
+
+        dates = values[(data_types == "DATE").to_numpy()]
+        if len(dates) and not self.has_time:
+            if pd.api.types.is_datetime64_any_dtype(dates.dtype):
+                self.has_time = bool((dates != dates.dt.normalize()).any())
+            else:
+                self.has_time = any(has_time_component(value) for value in pd.unique(dates))
+
+        texts = values[(data_types == "TEXT").to_numpy()]
+        if len(texts):
+            self.text_length += int(texts.astype(str).str.len().sum())
+            self.text_count += len(texts)
+
+    # Kiểu dữ liệu của cả cột: một kiểu duy nhất thì giữ nguyên, trộn số nguyên/số thực thì là số thực,
+    # còn lại là TEXT
+    @property
+    def data_type(self):
+        observed = set(self.type_counts)
+        if not observed:
+            return infer_data_type(None, self.column_name)
+        if len(observed) == 1:
+            return observed.pop()
+        if observed <= {"INTEGER", "DOUBLE PRECISION"}:
+            return "DOUBLE PRECISION"
+        return "TEXT"
+
+    # Định dạng ngày gặp nhiều nhất trong các giá trị dạng chuỗi (None nếu không có)
+    @property
+    def date_format(self):
+        if not self.date_format_counts:
+            return None
+        return max(self.date_format_counts, key=self.date_format_counts.get)
+
+    # Dấu thập phân của các giá trị số dạng chuỗi theo bằng chứng đã gặp (None nếu chưa xác định được)
+    @property
+    def decimal_separator(self):
+        return decimal_separator_from_votes(self.separator_votes)
+
+    # Độ tin cậy rằng tỷ lệ giá trị khác kiểu trong phần chưa đọc nhỏ hơn tolerance,
+    # sau khi mọi giá trị đã đọc đều khớp với kiểu hiện tại. Chỉ tính các giá trị không trống: ô trống không phải
+    # bằng chứng về kiểu, nên cột chưa có giá trị nào không bao giờ hội tụ
+    def confidence(self, tolerance=DEFAULT_TOLERANCE):
+        # Cột có tên chứa "ngay" luôn là DATE: không cần đọc thêm
+        if infer_data_type(None, self.column_name) == "DATE":
+            return 1.0
+        if not self.type_counts:
+            return 0.0
+        # TEXT là trạng thái cuối
+        if self.data_type == "TEXT":
+            return 1.0
+        return 1.0 - (1.0 - tolerance) ** (self.row_count - self.null_count)
+
+    # Độ dài trung bình (ký tự) của các giá trị dạng chữ, None nếu chưa có
+    @property
+    def average_length(self):
+        return self.text_length / self.text_count if self.text_count else None
+
+    # Số giá trị khác nhau đã quan sát (None nếu nhiều hơn DISTINCT_LIMIT)
+    @property
+    def distinct_count(self):
+        return None if self.distinct_values is None else len(self.distinct_values)
+
+    # Kiểu hẹp nhất theo giá trị đã quan sát và lý do chọn, ví dụ ("SMALLINT", "Số nguyên, ...")
+    @property
+    def narrowed(self):
+        return narrow_data_type(self)
+
+    # Tóm tắt bằng chứng, ví dụ "DOUBLE PRECISION: 998, TEXT: 2"
+    @property
+    def evidence(self):
+        return ", ".join(f"{data_type}: {count}" for data_type, count in
+                         sorted(self.type_counts.items(), key=lambda item: -item[1]))
+
+
+# Hàm đặt tên chuẩn hóa không trùng nhau cho các cột (so_tien, so_tien_2, ...)
+def _assign_normalized_names(profiles):
+    profiles = list(profiles)
+    for profile, normalized_name in zip(profiles, normalize_column_names([p.column_name for p in profiles])):
+        profile.normalized_name = normalized_name
+    return profiles
+
+
+# Số dòng (đã đọc) và số cột của các hồ sơ, dùng cho số đo giai đoạn lập hồ sơ
+def _profile_counts(profiles):
+    return max((profile.row_count for profile in profiles), default=0), len(profiles)
+
+
+# Hàm lập hồ sơ từng cột của file dữ liệu, đọc lần lượt từng khối chunksize dòng
+@measured_stage("profile_data", counts=_profile_counts)
+def profile_data_file(source, file_name=None, chunksize=DEFAULT_CHUNK_SIZE, sheet_name=None, usecols=None):
+    profiles = {}
+    for chunk in iter_data_chunks(source, file_name=file_name, chunksize=chunksize, sheet_name=sheet_name,
+                                  usecols=usecols):
+        for column_name in chunk.columns:
+            if column_name not in profiles:
+                profiles[column_name] = ColumnProfile(column_name)
+            profiles[column_name].update(chunk[column_name])
+    return _assign_normalized_names(profiles.values())
+
+
+# Số giá trị khớp kiểu liên tiếp cần đọc để đạt độ tin cậy confidence với tỷ lệ bỏ sót tolerance
+def rows_for_confidence(confidence=DEFAULT_CONFIDENCE, tolerance=DEFAULT_TOLERANCE):
+    return math.ceil(math.log(1.0 - confidence) / math.log(1.0 - tolerance))
+
+
+# Hàm lập hồ sơ các cột bằng mẫu phân tầng trên toàn tệp, dừng đọc từng cột khi kiểu đã hội tụ
+# (đạt độ tin cậy confidence), sau đó luôn kiểm tra tail_rows dòng cuối tệp để bắt giá trị bất thường
+@measured_stage("sample_data", counts=_profile_counts)
+def sample_data_file(source, file_name=None, rows_per_stratum=DEFAULT_SAMPLE_ROWS, strata=DEFAULT_STRATA,
+                     tail_rows=DEFAULT_TAIL_ROWS, confidence=DEFAULT_CONFIDENCE, tolerance=DEFAULT_TOLERANCE,
+                     sheet_name=None, usecols=None):
+    profiles = {}
+    sampler = open_sampler(source, file_name=file_name, rows_per_stratum=rows_per_stratum, strata=strata,
+                           sheet_name=sheet_name)
+    try:
+        last_chunk, skipped_columns = None, []
+        for chunk in sampler.iter_strata():
+            if usecols is not None:
+                chunk = chunk[[column_name for column_name in chunk.columns if column_name in set(usecols)]]
+            last_chunk, skipped_columns = chunk, []
+            for column_name in chunk.columns:
+                if column_name not in profiles:
+                    profiles[column_name] = ColumnProfile(column_name)
+                if profiles[column_name].confidence(tolerance) < confidence:
+                    profiles[column_name].update(chunk[column_name])
+                else:
+                    skipped_columns.append(column_name)
+            if all(profile.confidence(tolerance) >= confidence for profile in profiles.values()):
+                break
+
+        # Kiểm tra tail_rows dòng cuối tệp cho mọi cột: phần sau vị trí đã đọc, cộng thêm phần cuối
+        # của khối mẫu cuối cùng (với các cột đã dừng đọc ở khối đó) nếu phần sau chưa đủ tail_rows dòng
+        data_types = {column_name: profile.data_type for column_name, profile in profiles.items()}
+        tail = sampler.read_tail(tail_rows)
+        if tail is not None and usecols is not None:
+            tail = tail[[column_name for column_name in tail.columns if column_name in set(usecols)]]
+        missing_rows = tail_rows - (0 if tail is None else len(tail))
+        if missing_rows > 0 and last_chunk is not None:
+            for column_name in skipped_columns:
+                profiles[column_name].update(last_chunk[column_name].tail(missing_rows))
+        if tail is not None:
+            for column_name in tail.columns:
+                if column_name not in profiles:
+                    profiles[column_name] = ColumnProfile(column_name)
+                profiles[column_name].update(tail[column_name])
+        for column_name, profile in profiles.items():
+            profile.tail_outlier = column_name in data_types and profile.data_type != data_types[column_name]
+    finally:
+        sampler.close()
+    return _assign_normalized_names(profiles.values())
+
+
+# Hàm lấy kiểu dữ liệu của cột (narrow: kiểu đã thu hẹp theo giá trị thực)
+def _profile_type(profile, narrow):
+    return profile.narrowed[0] if narrow else profile.data_type
+
+
+# Hàm lấy danh sách (tên cột đã chuẩn hóa, kiểu dữ liệu) và độ dài trung bình của các cột từ hồ sơ
+def profiles_to_columns(profiles, narrow=False):
+    columns = [(profile.normalized_name, _profile_type(profile, narrow)) for profile in profiles]
+    return columns, [profile.average_length for profile in profiles]
+
+
+# Hàm tạo Code CREATE TABLE từ hồ sơ các cột (physical_layout: sắp xếp cột theo căn lề vật lý)
+def profiles_to_sql(profiles, full_table_name, narrow=False, physical_layout=False):
+    columns, lengths = profiles_to_columns(profiles, narrow)
+    return build_layout_create_table_sql(columns, full_table_name, physical_layout, lengths)
+
+
+# Hàm ước tính số byte dữ liệu trung bình của cột mỗi dòng theo kiểu data_type (ô trống chỉ chiếm
+# một bit trong bitmap NULL, không tính)
+def _column_bytes(profile, data_type):
+    filled_ratio = 1 - profile.null_count / profile.row_count if profile.row_count else 1
+    return estimate_type_bytes(data_type, profile.average_length) * filled_ratio
+
+
+# Hàm ước tính số byte dữ liệu mỗi dòng (gồm cột id SERIAL, chưa tính phần đầu dòng và byte đệm)
+def estimate_row_bytes(profiles, narrow=False):
+    return estimate_type_bytes("SERIAL") + sum(
+        _column_bytes(profile, _profile_type(profile, narrow)) for profile in profiles
+    )
+
+
+# Hàm chuyển hồ sơ các cột thành bảng hiển thị (narrow: thêm kiểu thu hẹp, lý do và số byte trước/sau)
+def profiles_to_frame(profiles, narrow=False):
+    frame = pd.DataFrame({
+        "Tên cột": [profile.column_name for profile in profiles],
+        "Tên chuẩn hóa": [profile.normalized_name for profile in profiles],
+        "Kiểu dữ liệu": [profile.data_type for profile in profiles],
+        "Định dạng ngày": [profile.date_format for profile in profiles],
+        "Số dòng đã đọc": [profile.row_count for profile in profiles],
+        "Số ô trống": [profile.null_count for profile in profiles],
+        "Bằng chứng": [profile.evidence for profile in profiles],
+        "Bất thường ở cuối tệp": [profile.tail_outlier for profile in profiles],
+    })
+    if narrow:
+        narrowed = [profile.narrowed for profile in profiles]
+        frame.insert(3, "Kiểu thu hẹp", [data_type for data_type, _ in narrowed])
+        frame.insert(4, "Lý do chọn kiểu", [reason for _, reason in narrowed])
+        frame.insert(5, "Byte/dòng trước", [round(_column_bytes(profile, profile.data_type), 1) for profile in profiles])
+        frame.insert(6, "Byte/dòng sau", [
+            round(_column_bytes(profile, data_type), 1) for profile, (data_type, _) in zip(profiles, narrowed)
+        ])
+    return frame
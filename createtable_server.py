@@ -0,0 +1,507 @@
+# Dịch vụ HTTP cục bộ sinh Code CREATE TABLE cho các chương trình khác (không cần Streamlit, chỉ dùng thư viện
+# chuẩn): nhận danh sách cột dạng JSON hoặc tệp đặc tả tải lên, gom các yêu cầu nhỏ đồng thời thành một lần suy
+# luận kiểu, đọc tệp trong nhóm tiến trình có giới hạn và đo độ trễ của từng yêu cầu
+#
+# Ví dụ:
+#     python createtable_server.py --port 8765 --workers 4
+#     curl -s localhost:8765/ddl -d '{"table": "khach_hang", "columns": [["Mã KH", "INT"], ["Ngày sinh", ""]]}'
+#     curl -s "localhost:8765/upload?table=khach_hang&file_name=khach_hang.xlsx" --data-binary @khach_hang.xlsx
+#     curl -s localhost:8765/metrics
+#     python createtable_server.py --load-test 2000 --concurrency 16   # chạy thử tải trên cổng ngẫu nhiên
+#     python -m pytest tests/test_server.py                            # kiểm thử trên cổng ngẫu nhiên
+import argparse
+import http.client
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+from createtable_arrow import infer_arrow_columns, is_schema_file, read_arrow_schema
+from createtable_core import (
+    build_layout_create_table_sql,
+    infer_data_types,
+    infer_spec_columns,
+    normalize_column_name,
+    normalize_column_names,
+    read_spec_file,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Số cột tối đa gom vào một lần suy luận kiểu; thời gian chờ thêm yêu cầu trước khi suy luận (0: chỉ gom các yêu
+# cầu đã xếp hàng trong lúc lần suy luận trước đang chạy, không làm chậm yêu cầu lẻ)
+DEFAULT_BATCH_ROWS = 50_000
+DEFAULT_BATCH_WAIT_MS = 0.0
+# Số tệp tải lên tối đa đang chờ hoặc đang xử lý (vượt quá: trả về 503 thay vì xếp hàng vô hạn)
+DEFAULT_MAX_PENDING_UPLOADS = 64
+# Kích thước tối đa của nội dung yêu cầu (như giới hạn tải tệp mặc định của Streamlit)
+MAX_BODY_BYTES = 200 * 1024 * 1024
+# Số yêu cầu gần nhất của mỗi đường dẫn dùng để tính phân vị độ trễ
+LATENCY_WINDOW = 10_000
+
+# Lỗi khi đọc tệp tải lên do chính tệp (sai định dạng, thiếu cột, sai mã hóa, không có sheet): trả về 400;
+# các lỗi khác là lỗi phía máy chủ
+UPLOAD_CLIENT_ERRORS = (ValueError, LookupError, EOFError, zipfile.BadZipFile)
+
+logger = logging.getLogger("createtable")
+
+
+# Lỗi trả về cho người gọi kèm mã trạng thái HTTP
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Hàm tính phân vị (cách xếp hạng gần nhất) của danh sách đã sắp xếp
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * fraction // 1))
+    return sorted_values[int(rank) - 1]
+
+
+# Độ trễ các yêu cầu gần nhất theo đường dẫn (mili giây), dùng chung cho các luồng xử lý yêu cầu
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._counts = {}
+
+    def record(self, route, milliseconds, error=False):
+        with self._lock:
+            self._latencies.setdefault(route, deque(maxlen=self.window)).append(milliseconds)
+            counts = self._counts.setdefault(route, {"requests": 0, "errors": 0})
+            counts["requests"] += 1
+            counts["errors"] += bool(error)
+
+    # Tổng hợp theo đường dẫn: số yêu cầu, số lỗi, trung bình và các phân vị của cửa sổ gần nhất
+    def summary(self):
+        with self._lock:
+            snapshot = {route: sorted(latencies) for route, latencies in self._latencies.items()}
+            counts = {route: dict(counts) for route, counts in self._counts.items()}
+        summary = {}
+        for route, latencies in snapshot.items():
+            summary[route] = dict(
+                counts[route],
+                window=len(latencies),
+                mean_ms=round(sum(latencies) / len(latencies), 3),
+                **{f"p{int(q * 100)}_ms": round(percentile(latencies, q), 3) for q in (0.5, 0.95, 0.99)},
+                max_ms=round(latencies[-1], 3),
+            )
+        return summary
+
+
+# Gom các yêu cầu suy luận kiểu đồng thời: một luồng nền lấy mọi yêu cầu đang xếp hàng (tối đa max_rows cột)
+# và suy luận kiểu cho tất cả bằng một lần gọi infer_data_types. Kiểu của mỗi cột chỉ phụ thuộc tên và giá trị
+# mẫu của chính nó (giá trị được đưa vào dạng object nên kết quả không phụ thuộc các yêu cầu gom chung);
+# chuẩn hóa tên cột (đặt lại tên trùng) vẫn làm riêng cho từng yêu cầu
+class InferenceBatcher:
+    def __init__(self, max_rows=DEFAULT_BATCH_ROWS, max_wait_ms=DEFAULT_BATCH_WAIT_MS):
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="createtable-batcher", daemon=True)
+        self._thread.start()
+
+    # Suy luận kiểu của các cột một yêu cầu (chờ đến khi lô chứa yêu cầu này xong); trả về danh sách kiểu
+    def infer(self, sample_values, column_names):
+        future = Future()
+        self._queue.put((sample_values, column_names, future))
+        return future.result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_item(self, deadline):
+        if self.max_wait <= 0:
+            return self._queue.get_nowait()
+        return self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            items, rows = [item], len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_rows:
+                try:
+                    item = self._next_item(deadline)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                items.append(item)
+                rows += len(item[0])
+            self._infer_batch(items)
+
+    def _infer_batch(self, items):
+        import pandas as pd
+
+        sample_values = [value for values, _, _ in items for value in values]
+        column_names = [name for _, names, _ in items for name in names]
+        try:
+            data_types = list(infer_data_types(pd.Series(sample_values, dtype=object), column_names))
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(items)
+        offset = 0
+        for values, _, future in items:
+            future.set_result(data_types[offset:offset + len(values)])
+            offset += len(values)
+
+
+# Hàm đọc danh sách cột của yêu cầu JSON: [[tên cột, giá trị mẫu], ...] hoặc [{"name": ..., "sample": ...}, ...];
+# giá trị null được xem là ô trống. Trả về (tên các cột, giá trị mẫu)
+def parse_columns(payload):
+    columns = payload.get("columns") if isinstance(payload, dict) else None
+    if not isinstance(columns, list) or not columns:
+        raise RequestError(400, "Thiếu danh sách cột 'columns'.")
+    column_names, sample_values = [], []
+    for index, column in enumerate(columns, start=1):
+        if isinstance(column, dict):
+            name, sample = column.get("name"), column.get("sample")
+        elif isinstance(column, list) and len(column) == 2:
+            name, sample = column
+        else:
+            raise RequestError(400, f"Cột {index}: cần [tên cột, giá trị mẫu] hoặc {{\"name\", \"sample\"}}.")
+        if not isinstance(name, str) or isinstance(sample, (dict, list)):
+            raise RequestError(400, f"Cột {index}: tên cột phải là chuỗi, giá trị mẫu phải là chuỗi hoặc số.")
+        column_names.append(name)
+        sample_values.append("" if sample is None else sample)
+    return column_names, sample_values
+
+
+# Hàm tạo tên bảng đầy đủ (schema.bảng, đã chuẩn hóa) từ tham số của yêu cầu
+def full_table_name_from(params):
+    table_name = normalize_column_name(str(params.get("table") or ""))
+    if not table_name:
+        raise RequestError(400, "Thiếu tên bảng 'table'.")
+    schema_name = normalize_column_name(str(params.get("schema") or "")) or "public"
+    return f"{schema_name}.{table_name}"
+
+
+# Hàm đọc tham số đúng/sai từ JSON hoặc query string ("1", "true", "yes")
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+# Sinh Code CREATE TABLE cho tệp tải lên (chạy trong tiến trình con nên nhận nội dung dạng bytes); profile: xem
+# tệp là dữ liệu thực (mỗi cột một trường) và suy luận kiểu từ mọi dòng
+def upload_job(content, file_name, sheet_name, full_table_name, physical_layout=False, profile=False):
+    if is_schema_file(file_name):
+        columns = infer_arrow_columns(read_arrow_schema(BytesIO(content), file_name=file_name))
+        return {"sql": build_layout_create_table_sql(columns, full_table_name, physical_layout), "columns": columns}
+    if profile:
+        from createtable_profile import profile_data_file, profiles_to_columns, profiles_to_sql
+
+        profiles = profile_data_file(BytesIO(content), file_name=file_name, sheet_name=sheet_name)
+        columns, _ = profiles_to_columns(profiles)
+        return {"sql": profiles_to_sql(profiles, full_table_name, physical_layout=physical_layout), "columns": columns}
+    columns = infer_spec_columns(read_spec_file(BytesIO(content), file_name=file_name, sheet_name=sheet_name))
+    return {"sql": build_layout_create_table_sql(columns, full_table_name, physical_layout), "columns": columns}
+
+
+# Bộ xử lý yêu cầu HTTP; các đối tượng dùng chung (bộ gom, nhóm tiến trình, độ trễ) nằm trên server
+class CreateTableHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "createtable"
+
+    def do_GET(self):
+        self._handle({"/health": self._health, "/metrics": self._metrics})
+
+    def do_POST(self):
+        self._handle({"/ddl": self._ddl, "/infer": self._infer, "/upload": self._upload})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _handle(self, routes):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = routes.get(url.path)
+        try:
+            if route is None:
+                raise RequestError(404, f"Không có đường dẫn {url.path}.")
+            status, body = 200, route()
+        except RequestError as e:
+            status, body = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, body = 400, {"error": str(e)}
+        except Exception as e:
+            logger.exception("Lỗi khi xử lý %s", self.path)
+            status, body = 500, {"error": str(e)}
+        milliseconds = (time.perf_counter() - start) * 1000
+        if route is not None:
+            self.server.latency.record(url.path, milliseconds, error=status >= 400)
+        self._send_json(status, body, milliseconds)
+
+    def _send_json(self, status, body, milliseconds):
+        content = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        # Độ trễ xử lý phía máy chủ của yêu cầu này
+        self.send_header("Server-Timing", f"app;dur={milliseconds:.3f}")
+        self.end_headers()
+        self.wfile.write(content)
+
+    # Đọc nội dung yêu cầu theo Content-Length. Độ dài không hợp lệ hoặc quá lớn thì không đọc phần nội dung còn
+    # lại và đóng kết nối sau khi trả lời (rfile.read(-1) chờ đến khi người gọi đóng kết nối)
+    def _read_body(self):
+        header = self.headers.get("Content-Length")
+        if header is None:
+            if self.headers.get("Transfer-Encoding"):
+                self.close_connection = True
+                raise RequestError(411, "Cần header Content-Length (không hỗ trợ Transfer-Encoding).")
+            return b""
+        header = header.strip()
+        if not header.isdigit() or not header.isascii():
+            self.close_connection = True
+            raise RequestError(400, f"Content-Length không hợp lệ: {header!r}.")
+        length = int(header)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise RequestError(413, f"Nội dung vượt quá {MAX_BODY_BYTES // (1024 * 1024)} MB.")
+        return self.rfile.read(length)
+
+    def _read_json(self):
+        try:
+            return json.loads(self._read_body() or b"{}")
+        except ValueError:
+            raise RequestError(400, "Nội dung yêu cầu không phải JSON hợp lệ.") from None
+
+    def _infer_columns(self, payload):
+        column_names, sample_values = parse_columns(payload)
+        data_types = self.server.batcher.infer(sample_values, column_names)
+        return list(zip(normalize_column_names(column_names), data_types))
+
+    def _health(self):
+        return {"status": "ok"}
+
+    def _metrics(self):
+        batcher = self.server.batcher
+        return {
+            "latency": self.server.latency.summary(),
+            "batching": {"batches": batcher.batches, "requests": batcher.requests},
+            "uploads": {"pending": self.server.pending_uploads, "max_pending": self.server.max_pending_uploads},
+        }
+
+    # Suy luận (tên cột đã chuẩn hóa, kiểu dữ liệu) của các cột
+    def _infer(self):
+        return {"columns": self._infer_columns(self._read_json())}
+
+    # Sinh Code CREATE TABLE từ danh sách cột
+    def _ddl(self):
+        payload = self._read_json()
+        full_table_name = full_table_name_from(payload if isinstance(payload, dict) else {})
+        columns = self._infer_columns(payload)
+        sql_output = build_layout_create_table_sql(columns, full_table_name, _flag(payload.get("physical_layout")))
+        return {"table": full_table_name, "sql": sql_output, "columns": columns}
+
+    # Sinh Code CREATE TABLE từ tệp tải lên (nội dung yêu cầu là nội dung tệp; tên tệp trong tham số file_name
+    # hoặc header X-File-Name); đọc tệp trong nhóm tiến trình
+    def _upload(self):
+        file_name = self.query.get("file_name") or self.headers.get("X-File-Name")
+        if not file_name:
+            raise RequestError(400, "Thiếu tên tệp (tham số 'file_name' hoặc header X-File-Name).")
+        full_table_name = full_table_name_from(self.query)
+        if not self.server.acquire_upload_slot():
+            self.close_connection = True
+            raise RequestError(503, "Máy chủ đang bận, hãy thử lại sau.")
+        try:
+            content = self._read_body()
+            executor = self.server.executor
+            try:
+                result = executor.submit(
+                    upload_job, content, file_name, self.query.get("sheet") or None, full_table_name,
+                    _flag(self.query.get("physical_layout")), _flag(self.query.get("profile")),
+                ).result()
+            except BrokenProcessPool:
+                # Tiến trình con bị dừng đột ngột (hết bộ nhớ, bị kết thúc): tạo lại nhóm tiến trình cho các yêu
+                # cầu sau
+                logger.exception("Nhóm tiến trình bị hỏng khi xử lý %s", file_name)
+                self.server.replace_broken_executor(executor)
+                raise RequestError(503, "Tiến trình xử lý tệp bị dừng đột ngột, hãy thử lại.") from None
+            except UPLOAD_CLIENT_ERRORS as e:
+                # Tệp không đọc được (sai định dạng, thiếu cột, ...) là lỗi của yêu cầu
+                raise RequestError(400, f"Lỗi khi xử lý tệp {file_name}: {e}") from None
+        finally:
+            self.server.release_upload_slot()
+        return {"table": full_table_name, **result}
+
+
+# Máy chủ HTTP đa luồng: mỗi kết nối một luồng, tệp tải lên được đọc trong nhóm tiến trình workers tiến trình
+class CreateTableServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, batch_rows=DEFAULT_BATCH_ROWS, batch_wait_ms=DEFAULT_BATCH_WAIT_MS,
+                 max_pending_uploads=DEFAULT_MAX_PENDING_UPLOADS):
+        super().__init__(address, CreateTableHandler)
+        self.latency = LatencyStats()
+        self.batcher = InferenceBatcher(batch_rows, batch_wait_ms)
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.max_pending_uploads = max_pending_uploads
+        self.pending_uploads = 0
+        self._upload_lock = threading.Lock()
+
+    # Giữ một chỗ cho tệp tải lên; False nếu đã đủ max_pending_uploads tệp đang chờ hoặc đang xử lý
+    def acquire_upload_slot(self):
+        with self._upload_lock:
+            if self.pending_uploads >= self.max_pending_uploads:
+                return False
+            self.pending_uploads += 1
+            return True
+
+    def release_upload_slot(self):
+        with self._upload_lock:
+            self.pending_uploads -= 1
+
+    # Thay nhóm tiến trình bị hỏng bằng nhóm mới (chỉ một lần dù nhiều yêu cầu cùng gặp lỗi với nhóm cũ)
+    def replace_broken_executor(self, executor):
+        with self._upload_lock:
+            if self.executor is not executor:
+                return
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+        self.executor.shutdown(cancel_futures=True)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+# Hàm chạy máy chủ trong luồng nền (dùng khi kiểm thử trên máy cục bộ; port 0: cổng ngẫu nhiên còn trống);
+# trả về máy chủ, dừng bằng server.shutdown() rồi server.server_close()
+def start_background_server(host=DEFAULT_HOST, port=0, **options):
+    server = CreateTableServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="createtable-server", daemon=True).start()
+    return server
+
+
+# Hàm gửi một yêu cầu JSON qua kết nối có sẵn; trả về (mã trạng thái, nội dung đã giải mã)
+def post_json(connection, path, payload):
+    connection.request("POST", path, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+# Hàm chạy thử tải: gửi total yêu cầu /ddl (mỗi yêu cầu columns cột) từ concurrency kết nối song song;
+# trả về độ trễ phía người gọi (mili giây, đã sắp xếp), số lỗi và thời gian chạy
+def run_load_test(host, port, total, concurrency, columns=20):
+    samples = ["INT", "01/02/2024", "1.250.000", "12,5", "Hà Nội"]
+    payload = {
+        "schema": "public", "table": "khach_hang",
+        "columns": [[f"Cột {index}", samples[index % len(samples)]] for index in range(columns)],
+    }
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        connection = http.client.HTTPConnection(host, port)
+        latencies, errors = [], 0
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            start = time.perf_counter()
+            status, _ = post_json(connection, "/ddl", payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += status != 200
+        connection.close()
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: worker(), range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return sorted(latency for latencies, _ in results for latency in latencies), sum(e for _, e in results), elapsed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Dịch vụ HTTP cục bộ sinh Code SQL CREATE TABLE.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Địa chỉ lắng nghe (mặc định: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Cổng (mặc định: {DEFAULT_PORT})")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Số tiến trình đọc tệp tải lên (mặc định: số CPU)")
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS,
+                        help=f"Số cột tối đa gom vào một lần suy luận kiểu (mặc định: {DEFAULT_BATCH_ROWS})")
+    parser.add_argument("--batch-wait-ms", type=float, default=DEFAULT_BATCH_WAIT_MS,
+                        help="Thời gian chờ gom thêm yêu cầu trước khi suy luận kiểu (mặc định: 0, chỉ gom các "
+                             "yêu cầu đang xếp hàng)")
+    parser.add_argument("--max-pending-uploads", type=int, default=DEFAULT_MAX_PENDING_UPLOADS,
+                        help="Số tệp tải lên tối đa đang chờ hoặc đang xử lý, vượt quá trả về 503 "
+                             f"(mặc định: {DEFAULT_MAX_PENDING_UPLOADS})")
+    parser.add_argument("--load-test", type=int, default=None, metavar="N",
+                        help="Chạy máy chủ trên cổng ngẫu nhiên, gửi N yêu cầu /ddl rồi in độ trễ p50/p95/p99")
+    parser.add_argument("--concurrency", type=int, default=8, help="Cùng với --load-test: số kết nối song song")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.load_test is not None and args.load_test < 1:
+        print("--load-test phải lớn hơn 0.", file=sys.stderr)
+        return 2
+    options = {
+        "workers": args.workers, "batch_rows": args.batch_rows, "batch_wait_ms": args.batch_wait_ms,
+        "max_pending_uploads": args.max_pending_uploads,
+    }
+    if args.load_test is not None:
+        server = start_background_server(args.host, 0, **options)
+        try:
+            latencies, errors, elapsed = run_load_test(args.host, server.server_port, args.load_test,
+                                                       args.concurrency)
+            batching = server.batcher.requests / server.batcher.batches if server.batcher.batches else 0.0
+        finally:
+            server.shutdown()
+            server.server_close()
+        print(
+            f"{len(latencies)} yêu cầu ({errors} lỗi) trong {elapsed:.2f} giây ({len(latencies) / elapsed:.0f} yêu "
+            f"cầu/giây), trung bình {batching:.1f} yêu cầu mỗi lần suy luận"
+        )
+        print("Độ trễ (ms): " + ", ".join(
+            f"p{int(q * 100)} {percentile(latencies, q):.2f}" for q in (0.5, 0.95, 0.99)
+        ) + f", max {latencies[-1]:.2f}")
+        return 1 if errors else 0
+
+    server = CreateTableServer((args.host, args.port), **options)
+    print(f"Đang phục vụ tại {server.url} (Ctrl+C để dừng)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
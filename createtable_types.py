@@ -0,0 +1,303 @@
+# Thu hẹp kiểu dữ liệu theo giá trị thực đã quan sát (khoảng giá trị, độ chính xác, thành phần giờ)
+# và ước tính dung lượng lưu trữ của từng kiểu PostgreSQL
+import datetime
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+# Khoảng giá trị của các kiểu số nguyên PostgreSQL
+INTEGER_RANGES = (
+    ("SMALLINT", -2**15, 2**15 - 1),
+    ("INTEGER", -2**31, 2**31 - 1),
+    ("BIGINT", -2**63, 2**63 - 1),
+)
+
+# Các cặp giá trị dạng chữ được xem là BOOLEAN (so sánh không phân biệt hoa thường). Cột số chỉ có 0 và 1 vẫn là
+# số (SMALLINT): các lần nạp sau có thể có giá trị khác như 2
+BOOLEAN_PAIRS = (
+    {"true", "false"},
+    {"t", "f"},
+    {"y", "n"},
+    {"yes", "no"},
+    {"có", "không"},
+)
+
+# Kích thước (byte) của các kiểu có độ dài cố định
+FIXED_TYPE_BYTES = {
+    "BOOLEAN": 1,
+    "SMALLINT": 2,
+    "INTEGER": 4,
+    "SERIAL": 4,
+    "REAL": 4,
+    "DATE": 4,
+    "BIGINT": 8,
+    "DOUBLE PRECISION": 8,
+    "TIMESTAMP": 8,
+    "TIMESTAMPTZ": 8,
+    "TIME": 8,
+    "INTERVAL": 16,
+}
+
+# Độ dài trung bình giả định của giá trị TEXT khi không có dữ liệu thực
+DEFAULT_TEXT_LENGTH = 16
+
+_NUMBER_STRING = re.compile(r"\s*([+-]?)(\d[\d.,]*)\s*")
+# Số có một dấu phân cách, phần nguyên 1-3 chữ số không bắt đầu bằng 0 và đúng 3 chữ số sau dấu (1.000, 12,500):
+# có thể là phân cách hàng nghìn hoặc dấu thập phân, tùy các giá trị khác của cột
+_THOUSANDS_STRING = re.compile(r"[1-9]\d{0,2}[.,]\d{3}")
+
+
+# Hàm đếm bằng chứng về dấu thập phân trong các giá trị dạng chuỗi của cột: {".": số phiếu, ",": số phiếu}.
+# Giá trị có cả hai dấu (dấu đứng sau là dấu thập phân), dấu lặp lại (phân cách hàng nghìn, dấu còn lại là
+# dấu thập phân) hoặc một dấu không có dạng hàng nghìn (0.125, 1,5) là bằng chứng; dạng 1.000 không là bằng chứng
+def decimal_separator_votes(values):
+    votes = {".": 0, ",": 0}
+    for value in pd.unique(pd.Series(values, dtype=object)):
+        match = _NUMBER_STRING.fullmatch(value) if isinstance(value, str) else None
+        if not match:
+            continue
+        body = match[2]
+        last_dot, last_comma = body.rfind("."), body.rfind(",")
+        if last_dot >= 0 and last_comma >= 0:
+            votes["." if last_dot > last_comma else ","] += 1
+        elif last_dot >= 0 or last_comma >= 0:
+            separator = "." if last_dot >= 0 else ","
+            if body.count(separator) > 1:
+                votes["," if separator == "." else "."] += 1
+            elif not _THOUSANDS_STRING.fullmatch(body):
+                votes[separator] += 1
+    return votes
+
+
+# Hàm chọn dấu thập phân của cột theo số phiếu của decimal_separator_votes (None nếu không có hoặc ngang nhau)
+def decimal_separator_from_votes(votes):
+    if votes["."] == votes[","]:
+        return None
+    return "." if votes["."] > votes[","] else ","
+
+
+# Hàm đọc một giá trị số (chuỗi có dấu phân cách . hoặc , hoặc số đọc từ Excel) thành
+# (giá trị, số chữ số phần nguyên, số chữ số phần thập phân); None nếu không biểu diễn chính xác được
+# (số mũ, inf, nan, chuỗi không phải số). decimal_separator: dấu thập phân của cột; số có một dấu dạng 1.000 chỉ
+# được hiểu là phân cách hàng nghìn khi dấu đó không phải dấu thập phân của cột, không biết thì là số thập phân
+def parse_number(value, decimal_separator=None):
+    if isinstance(value, (bool, np.bool_)):
+        return int(value), 1, 0
+    if isinstance(value, (int, np.integer)):
+        return int(value), len(str(abs(int(value))).lstrip("0")), 0
+    if isinstance(value, (float, np.floating)):
+        if not math.isfinite(value):
+            return None
+        text = repr(float(value))
+        if "e" in text:
+            return None
+        integer, _, fraction = text.lstrip("-").partition(".")
+        fraction = fraction.rstrip("0")
+        if not fraction:
+            return int(value), len(integer.lstrip("0")), 0
+        return float(value), len(integer.lstrip("0")), len(fraction)
+    if not isinstance(value, str):
+        return None
+
+    match = _NUMBER_STRING.fullmatch(value)
+    if not match:
+        return None
+    sign, body = match.groups()
+    last_dot, last_comma = body.rfind("."), body.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        # Có cả hai dấu: dấu đứng sau là dấu thập phân (1.000,5 hoặc 1,000.5)
+        decimal_separator = "." if last_dot > last_comma else ","
+    elif last_dot >= 0 or last_comma >= 0:
+        separator = "." if last_dot >= 0 else ","
+        is_thousands = body.count(separator) > 1 or (
+            decimal_separator not in (None, separator) and _THOUSANDS_STRING.fullmatch(body)
+        )
+        decimal_separator = None if is_thousands else separator
+    else:
+        decimal_separator = None
+
+    if decimal_separator:
+        integer, fraction = body.rsplit(decimal_separator, 1)
+    else:
+        integer, fraction = body, ""
+    integer = integer.replace(".", "").replace(",", "")
+    if not integer.isdigit() or (fraction and not fraction.isdigit()):
+        return None
+    if not fraction.rstrip("0"):
+        return int(sign + integer), len(integer.lstrip("0")), 0
+    return float(f"{sign}{integer}.{fraction}"), len(integer.lstrip("0")), len(fraction.rstrip("0"))
+
+
+# Số dạng đơn giản (chữ số, có thể có phần thập phân sau dấu chấm) được đọc trực tiếp, trừ dạng 1.000 ở cột có
+# dấu thập phân là dấu phẩy; số nguyên quá 15 chữ số và các dạng khác đi qua parse_number
+_PLAIN_NUMBER = re.compile(r"\s*([+-]?)(\d{1,15})(?:\.(\d+))?\s*")
+
+
+# Hàm tóm tắt các giá trị số của một khối: (nhỏ nhất, lớn nhất, số chữ số phần nguyên tối đa,
+# số chữ số thập phân tối đa, số giá trị không biểu diễn chính xác được); mỗi giá trị khác nhau chỉ đọc một lần.
+# decimal_separator: dấu thập phân của cột (như parse_number)
+def summarize_numbers(values, decimal_separator=None):
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    counts = np.bincount(codes, minlength=len(uniques))
+    minimum = maximum = None
+    max_integer_digits = max_scale = inexact = 0
+    for value, count in zip(uniques, counts):
+        match = _PLAIN_NUMBER.fullmatch(value) if isinstance(value, str) else None
+        if match and decimal_separator == "," and match[3] and _THOUSANDS_STRING.fullmatch(f"{match[2]}.{match[3]}"):
+            match = None
+        if match:
+            fraction = match[3].rstrip("0") if match[3] else ""
+            number = float(match[0]) if fraction else int(match[1] + match[2])
+            integer_digits, scale = len(match[2].lstrip("0")), len(fraction)
+        else:
+            parsed = parse_number(value, decimal_separator)
+            if parsed is None:
+                inexact += int(count)
+                continue
+            number, integer_digits, scale = parsed
+        if minimum is None or number < minimum:
+            minimum = number
+        if maximum is None or number > maximum:
+            maximum = number
+        if integer_digits > max_integer_digits:
+            max_integer_digits = integer_digits
+        if scale > max_scale:
+            max_scale = scale
+    return minimum, maximum, max_integer_digits, max_scale, inexact
+
+
+# Hàm kiểm tra giá trị ngày có thành phần giờ khác 00:00:00 hay không
+def has_time_component(value):
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        return value.time() != datetime.time(0)
+    if isinstance(value, str):
+        parts = value.strip().split(" ", 1)
+        return len(parts) == 2 and parts[1].strip("0:") != ""
+    return False
+
+
+# Hàm kiểm tra tập giá trị khác nhau của cột có phải một cặp giá trị BOOLEAN hay không
+def is_boolean_pair(distinct_values):
+    return len(distinct_values) == 2 and any(distinct_values <= pair for pair in BOOLEAN_PAIRS)
+
+
+# Hàm chọn kiểu số nguyên nhỏ nhất chứa được khoảng [minimum, maximum] (None nếu vượt BIGINT)
+def integer_type_for_range(minimum, maximum):
+    for data_type, low, high in INTEGER_RANGES:
+        if low <= minimum and maximum <= high:
+            return data_type
+    return None
+
+
+# Hàm chọn kiểu dữ liệu hẹp nhất cho cột theo hồ sơ đã lập (ColumnProfile), trả về (kiểu, lý do)
+def narrow_data_type(profile):
+    data_type = profile.data_type
+    if data_type == "TEXT" and profile.distinct_values is not None and is_boolean_pair(profile.distinct_values):
+        values = ", ".join(sorted(profile.distinct_values))
+        return "BOOLEAN", f"Chỉ có hai giá trị: {values}"
+
+    if data_type == "DATE":
+        if profile.has_time:
+            return "TIMESTAMP", "Có giá trị chứa giờ khác 00:00:00"
+        return "DATE", "Không có giá trị nào chứa giờ"
+
+    if data_type in ("DOUBLE PRECISION", "INTEGER") and profile.number_min is not None:
+        if profile.inexact_numbers:
+            return "DOUBLE PRECISION", f"{profile.inexact_numbers:,} giá trị dạng số mũ hoặc NaN/inf"
+        value_range = f"nhỏ nhất {profile.number_min:,}, lớn nhất {profile.number_max:,}"
+        if profile.max_scale == 0:
+            integer_type = integer_type_for_range(profile.number_min, profile.number_max)
+            if integer_type:
+                return integer_type, f"Số nguyên, {value_range}"
+            return f"NUMERIC({profile.max_integer_digits}, 0)", f"Số nguyên vượt BIGINT, {value_range}"
+        precision = max(profile.max_integer_digits + profile.max_scale, 1)
+        return (
+            f"NUMERIC({precision}, {profile.max_scale})",
+            f"Số thập phân, tối đa {profile.max_integer_digits} chữ số phần nguyên và "
+            f"{profile.max_scale} chữ số thập phân",
+        )
+
+    if data_type == "TEXT" and profile.type_counts:
+        return "TEXT", f"Giá trị dạng chữ, dài trung bình {profile.average_length:.1f} ký tự"
+    if not profile.type_counts:
+        return data_type, "Không có giá trị để thu hẹp kiểu"
+    return data_type, "Giữ nguyên kiểu đã suy luận"
+
+
+# Hàm ước tính số byte lưu trữ một giá trị của kiểu dữ liệu; kiểu độ dài thay đổi (TEXT, NUMERIC...)
+# tính theo độ dài trung bình average_length và phần đầu varlena (1 byte nếu ngắn hơn 127 byte, ngược lại 4)
+def estimate_type_bytes(data_type, average_length=None):
+    if data_type in FIXED_TYPE_BYTES:
+        return FIXED_TYPE_BYTES[data_type]
+    match = re.fullmatch(r"NUMERIC\((\d+), (\d+)\)", data_type)
+    if match:
+        # NUMERIC lưu mỗi nhóm 4 chữ số trong 2 byte, cộng 2 byte đầu và 1 byte varlena
+        precision, scale = int(match.group(1)), int(match.group(2))
+        return 3 + 2 * (math.ceil((precision - scale) / 4) + math.ceil(scale / 4))
+    length = DEFAULT_TEXT_LENGTH if average_length is None else average_length
+    return length + (1 if length < 127 else 4)
+
+
+# Căn lề (byte) của các kiểu có độ dài cố định trong dòng PostgreSQL (typalign)
+FIXED_TYPE_ALIGNMENTS = {
+    "BOOLEAN": 1,
+    "SMALLINT": 2,
+    "INTEGER": 4,
+    "SERIAL": 4,
+    "REAL": 4,
+    "DATE": 4,
+    "BIGINT": 8,
+    "DOUBLE PRECISION": 8,
+    "TIMESTAMP": 8,
+    "TIMESTAMPTZ": 8,
+    "TIME": 8,
+    "INTERVAL": 8,
+}
+
+# Phần đầu mỗi dòng (23 byte, làm tròn theo căn lề 8 byte)
+TUPLE_HEADER_BYTES = 24
+
+
+# Hàm căn lề vị trí offset lên bội số của alignment
+def _align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+# Hàm trả về căn lề của kiểu dữ liệu; kiểu độ dài thay đổi (varlena) ngắn hơn 127 byte có phần đầu 1 byte
+# và không cần căn lề, dài hơn thì căn lề 4 byte
+def type_alignment(data_type, average_length=None):
+    if data_type in FIXED_TYPE_ALIGNMENTS:
+        return FIXED_TYPE_ALIGNMENTS[data_type]
+    return 1 if estimate_type_bytes(data_type, average_length) < 127 else 4
+
+
+# Hàm ước tính kích thước một dòng (phần đầu dòng, cột id SERIAL, các cột theo đúng thứ tự và byte đệm căn lề),
+# giả sử không có ô trống; lengths là độ dài trung bình của các cột độ dài thay đổi (None: giá trị mặc định)
+def estimate_tuple_bytes(data_types, lengths=None):
+    lengths = lengths or [None] * len(data_types)
+    offset = FIXED_TYPE_BYTES["SERIAL"]
+    for data_type, length in zip(data_types, lengths):
+        offset = _align(offset, type_alignment(data_type, length))
+        offset += math.ceil(estimate_type_bytes(data_type, length))
+    return TUPLE_HEADER_BYTES + _align(offset, 8)
+
+
+# Hàm sắp xếp các cột theo căn lề vật lý: 8 byte, 4, 2, 1 byte rồi tới các kiểu độ dài thay đổi (giữ thứ tự
+# gốc trong từng nhóm); cột id SERIAL (4 byte) luôn đứng đầu nên một cột 4 byte được đưa lên ngay sau nó để
+# lấp chỗ trống trước nhóm 8 byte. Trả về danh sách vị trí gốc theo thứ tự mới
+def physical_layout_order(data_types, lengths=None):
+    lengths = lengths or [None] * len(data_types)
+
+    def group(index):
+        data_type = data_types[index]
+        if data_type not in FIXED_TYPE_ALIGNMENTS:
+            return 4
+        return {8: 0, 4: 1, 2: 2, 1: 3}[FIXED_TYPE_ALIGNMENTS[data_type]]
+
+    order = sorted(range(len(data_types)), key=group)
+    groups = [group(index) for index in order]
+    if groups and groups[0] == 0 and 1 in groups:
+        order.insert(0, order.pop(groups.index(1)))
+    return order
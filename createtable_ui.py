@@ -0,0 +1,965 @@
+# Các phần giao diện Streamlit dùng chung cho createtable.py (createtable3.py chạy lại script này) và createtable2.py
+import datetime
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from io import BytesIO, StringIO
+
+import streamlit as st
+
+from createtable_arrow import (
+    SCHEMA_EXTENSIONS,
+    infer_arrow_columns,
+    is_schema_file,
+    read_arrow_schema,
+)
+from createtable_core import (
+    COLUMN_NAME_KEY,
+    SAMPLE_VALUE_KEY,
+    build_layout_create_table_sql,
+    build_sql_bundle,
+    build_sql_zip,
+    infer_data_types,
+    infer_spec_columns,
+    normalize_column_name,
+    normalize_column_names,
+    physical_layout_savings,
+    read_spec_file,
+    table_name_from_path,
+)
+from createtable_metrics import (
+    METRICS_DIR_ENV,
+    StageMetrics,
+    activate_stage_metrics,
+    collect_stages,
+    record_stages,
+    stage,
+    track_peak_memory,
+    write_stage_metrics,
+)
+from createtable_partition import build_partitioned_table_sql, date_columns, recommend_indexes
+
+# pandas/openpyxl và các mô-đun đọc tệp (createtable_io, createtable_profile, createtable_copy, createtable_upsert)
+# được nhập trong các hàm cần đến: lần hiển thị đầu tiên (chưa nhập liệu, chưa tải tệp) không nạp pandas
+
+# Số kết quả tối đa giữ trong mỗi cache (kết quả cũ nhất bị loại trước)
+CACHE_MAX_ENTRIES = 32
+# Số dòng mỗi trang của bảng xem trước danh sách cột
+PREVIEW_PAGE_SIZE = 100
+# Lựa chọn xử lý mọi sheet của file Excel (mỗi sheet một bảng)
+ALL_SHEETS_LABEL = "(Tất cả các sheet)"
+# Số lần chạy và số giai đoạn gần nhất giữ lại trong bảng debug
+TIMING_HISTORY = 20
+STAGE_HISTORY = 50
+# Tham số URL bật bảng debug (thời gian chạy, số đo các giai đoạn) và đo bộ nhớ đỉnh của các giai đoạn
+DEBUG_QUERY_PARAM = "debug"
+
+logger = logging.getLogger("createtable")
+# Lần chạy đầu tiên của tiến trình (tính cả thời gian nạp các mô-đun)
+_first_run_in_process = True
+
+
+# Logo thu nhỏ theo chiều rộng hiển thị (gấp đôi cho màn hình mật độ điểm ảnh cao), đọc và nén một lần cho cả
+# tiến trình thay vì đọc lại tệp gốc ở mỗi lần chạy lại; đường dẫn tương đối tính từ thư mục chứa ứng dụng.
+# None nếu không có tệp
+@st.cache_resource(show_spinner=False)
+def _logo_image(path, width):
+    from PIL import Image
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    if not os.path.isfile(path):
+        return None
+    with Image.open(path) as image:
+        image.thumbnail((width * 2, image.height))
+        output = BytesIO()
+        image.save(output, format="PNG", optimize=True)
+    return output.getvalue()
+
+
+# Hiển thị logo ở đầu giao diện (width: chiều rộng hiển thị, pixel)
+def render_logo(path, width):
+    st.image(_logo_image(path, width) or path, width=width)
+
+
+# Bật ghi số đo các giai đoạn xử lý cho lần chạy hiện tại (gọi ở đầu script và đầu mỗi fragment): bộ ghi được giữ
+# trong session_state, bộ nhớ đỉnh chỉ được đo khi bảng debug đang mở (tracemalloc làm chậm việc đọc tệp)
+def start_stage_metrics():
+    metrics = st.session_state.setdefault("stage_metrics", StageMetrics())
+    metrics.trace_memory = DEBUG_QUERY_PARAM in st.query_params
+    activate_stage_metrics(metrics)
+
+
+# Hàm định dạng một giai đoạn thành một dòng của bảng Markdown (không dựng DataFrame để không nạp pandas)
+def _stage_row(record):
+    cells = [
+        record["stage"] + (" (lỗi)" if record.get("error") else ""),
+        f"{record['seconds'] * 1000:,.1f}",
+        "" if record["rows"] is None else f"{record['rows']:,}",
+        "" if record["columns"] is None else f"{record['columns']:,}",
+        "" if record["size_bytes"] is None else format_megabytes(record["size_bytes"]),
+        "" if record["peak_bytes"] is None else format_megabytes(record["peak_bytes"]),
+    ]
+    return "| " + " | ".join(cells) + " |"
+
+
+# Bảng debug ở cuối mỗi lần chạy script, từ started_at (time.perf_counter() ở đầu script) tới khi mọi phần đã được
+# dựng: lần chạy đầu tiên của phiên là thời gian tới lần hiển thị đầu tiên (lần đầu của tiến trình tính cả thời gian
+# nạp mô-đun), các lần sau là thời gian chạy lại. Thời gian mỗi lần chạy được ghi vào log; các giai đoạn đã đo
+# (kể cả trong các lần chạy lại của fragment) được ghi vào thư mục số đo nếu có biến môi trường
+# CREATETABLE_METRICS_DIR. Thêm ?debug vào URL để xem ở thanh bên
+def render_debug_panel(started_at):
+    global _first_run_in_process
+
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    timings = st.session_state.setdefault("run_timings", [])
+    if _first_run_in_process:
+        kind = "khởi động tiến trình"
+    elif not timings:
+        kind = "hiển thị lần đầu"
+    else:
+        kind = "chạy lại"
+    _first_run_in_process = False
+    run_number = timings[-1][0] + 1 if timings else 1
+    timings.append((run_number, kind, elapsed_ms, "pandas" in sys.modules))
+    del timings[:-TIMING_HISTORY]
+    logger.info("Lần chạy %d (%s): %.0f ms", run_number, kind, elapsed_ms)
+
+    records = st.session_state.setdefault("stage_metrics", StageMetrics()).drain()
+    stages = st.session_state.setdefault("stage_history", [])
+    stages.extend(records)
+    del stages[:-STAGE_HISTORY]
+    metrics_dir = os.environ.get(METRICS_DIR_ENV)
+    if metrics_dir:
+        try:
+            write_stage_metrics(records, metrics_dir)
+        except OSError as e:
+            logger.warning("Không ghi được số đo vào %s: %s", metrics_dir, e)
+
+    if DEBUG_QUERY_PARAM not in st.query_params:
+        return
+    with st.sidebar.expander("Thời gian chạy", expanded=True):
+        for run_number, kind, elapsed_ms, pandas_loaded in reversed(timings):
+            st.caption(
+                f"Lần {run_number} ({kind}): {elapsed_ms:,.0f} ms" + (", đã nạp pandas" if pandas_loaded else "")
+            )
+    with st.sidebar.expander("Số đo các giai đoạn", expanded=True):
+        if not stages:
+            st.caption("Chưa có giai đoạn nào được đo.")
+            return
+        st.markdown("\n".join(
+            ["| Giai đoạn | ms | Dòng | Cột | Dữ liệu vào | Bộ nhớ đỉnh |", "|---|--:|--:|--:|--:|--:|"]
+            + [_stage_row(record) for record in reversed(stages)]
+        ))
+        if metrics_dir:
+            st.caption(f"Số đo được ghi vào {metrics_dir}.")
+
+
+# Hàm tính mã băm nội dung tệp tải lên; lưu theo file_id trong session để không băm lại ở mỗi lần chạy lại
+def upload_content_hash(uploaded_file):
+    hashes = st.session_state.setdefault("upload_content_hashes", {})
+    if uploaded_file.file_id not in hashes:
+        with stage("upload_read") as record:
+            content = uploaded_file.getvalue()
+            hashes[uploaded_file.file_id] = hashlib.sha256(content).hexdigest()
+            record["size_bytes"] = len(content)
+        while len(hashes) > CACHE_MAX_ENTRIES:
+            hashes.pop(next(iter(hashes)))
+    return hashes[uploaded_file.file_id]
+
+
+# Danh sách sheet của file Excel tải lên, cache theo mã băm nội dung
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_sheet_names(content_hash, _uploaded_file):
+    from createtable_io import list_sheet_names
+
+    return list_sheet_names(_uploaded_file)
+
+
+# Đọc và suy luận kiểu cho một sheet (hoặc file CSV, Parquet/Feather) của tệp tải lên. Chạy trong tiến trình
+# con nên nhận nội dung tệp dạng bytes; trả về tên các cột gốc, danh sách (tên cột đã chuẩn hóa, kiểu dữ liệu)
+# và bộ nhớ đỉnh khi xử lý (Code SQL được sinh sau, theo schema, tên bảng và thứ tự cột đang chọn)
+def _upload_table_job(content, file_name, sheet_name):
+    # Số đo các giai đoạn được trả về cùng kết quả (tiến trình con không ghi được vào bộ ghi của phiên)
+    with collect_stages(StageMetrics(trace_memory=True)) as metrics:
+        with stage("upload_table", size_bytes=len(content)) as record:
+            if is_schema_file(file_name):
+                # Parquet/Feather: chỉ đọc schema
+                schema = read_arrow_schema(BytesIO(content), file_name=file_name)
+                column_names = list(schema.names)
+                columns = infer_arrow_columns(schema)
+            else:
+                df = read_spec_file(BytesIO(content), file_name=file_name, sheet_name=sheet_name)
+                column_names = list(df[COLUMN_NAME_KEY])
+                columns = infer_spec_columns(df)
+            record.update(rows=len(column_names), columns=len(columns))
+    return {
+        "column_names": column_names,
+        "columns": columns,
+        "peak_bytes": record["peak_bytes"],
+        "stages": metrics.drain(),
+    }
+
+
+# Kết quả của một bảng, lỗi được giữ lại để hiển thị thay vì dừng cả lô
+def _job_result(call, *args):
+    try:
+        return call(*args)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# Đọc và suy luận cả lô bảng song song trong nhóm tiến trình (mỗi bảng một việc), cache theo (mã băm nội dung,
+# phần mở rộng của tệp, sheet) của mọi bảng: đổi schema, tên bảng hay thứ tự cột không đọc lại tệp; kết quả giữ
+# đúng thứ tự
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_upload_tables(jobs_key, _jobs):
+    if len(_jobs) == 1:
+        results = [_job_result(_upload_table_job, *_jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(_jobs), os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(_upload_table_job, *job) for job in _jobs]
+            results = [_job_result(future.result) for future in futures]
+    for result in results:
+        record_stages(result.get("stages", []))
+    return results
+
+
+# Code CREATE TABLE của một bảng tải lên, cache theo (tên bảng đầy đủ, khóa của việc đọc tệp: mã băm nội dung,
+# phần mở rộng, sheet; thứ tự cột theo căn lề vật lý): rerun không sinh lại Code SQL của mọi bảng
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_upload_sql(full_table_name, job_key, physical_layout, _columns):
+    return build_layout_create_table_sql(_columns, full_table_name, physical_layout)
+
+
+# Hàm chọn sheet của file Excel tải lên (file CSV: [None]); allow_all cho phép chọn mọi sheet
+def select_upload_sheets(uploaded_file, key, allow_all=True):
+    if not uploaded_file.name.lower().endswith(".xlsx"):
+        return [None]
+    sheet_names = _cached_sheet_names(upload_content_hash(uploaded_file), uploaded_file)
+    options = ([ALL_SHEETS_LABEL] if allow_all and len(sheet_names) > 1 else []) + sheet_names
+    choice = st.selectbox("Chọn sheet", options, index=options.index(sheet_names[0]), key=key)
+    return sheet_names if choice == ALL_SHEETS_LABEL else [choice]
+
+
+# Hàm định dạng số byte thành MB
+def format_megabytes(size_bytes):
+    return f"{size_bytes / (1024 * 1024):,.1f} MB"
+
+
+# Hiển thị kích thước dòng ước tính trước/sau khi sắp xếp cột theo căn lề vật lý
+def render_layout_savings(columns, lengths=None):
+    before, after = physical_layout_savings(columns, lengths)
+    saved = before - after
+    st.caption(
+        f"Kích thước dòng ước tính: {before:,} → {after:,} byte; tiết kiệm {saved:,} byte mỗi dòng, "
+        f"khoảng {format_megabytes(saved * 1_000_000)} mỗi triệu dòng."
+    )
+
+
+# Hàm đánh dấu các tên cột xung đột sau chuẩn hóa: trùng với tên cột khác (được đổi thành ten_2, ...) hoặc rỗng
+# (được đặt thành cot_<vị trí>)
+def normalization_conflicts(column_names):
+    normalized = [normalize_column_name(str(name)) for name in column_names]
+    counts = Counter(normalized)
+    return [not name or counts[name] > 1 for name in normalized]
+
+
+# Bảng xem trước danh sách cột theo từng trang (mỗi trang PREVIEW_PAGE_SIZE dòng, chi phí hiển thị không phụ thuộc
+# số cột), lọc được theo kiểu dữ liệu và theo tên xung đột sau chuẩn hóa; frame có các cột "Kiểu dữ liệu" và
+# "Xung đột tên"; key: tiền tố khóa của các widget
+def render_column_preview(frame, key):
+    col1, col2, col3 = st.columns([3, 2, 1])
+    data_types = col1.multiselect(
+        "Lọc theo kiểu dữ liệu", sorted(frame["Kiểu dữ liệu"].dropna().unique()), key=f"{key}_types"
+    )
+    conflicts = int(frame["Xung đột tên"].sum())
+    conflicts_only = col2.checkbox(
+        f"Chỉ hiện tên trùng/rỗng sau chuẩn hóa ({conflicts:,})", key=f"{key}_conflicts"
+    )
+    if data_types:
+        frame = frame[frame["Kiểu dữ liệu"].isin(data_types)]
+    if conflicts_only:
+        frame = frame[frame["Xung đột tên"]]
+
+    pages = max(1, -(-len(frame) // PREVIEW_PAGE_SIZE))
+    # Trang đang chọn chỉ đặt qua session_state (không truyền value cho widget, tránh cảnh báo giá trị mặc định bị
+    # ghi đè); vượt quá số trang sau khi lọc hoặc sửa dữ liệu thì quay về trang đầu
+    if st.session_state.setdefault(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = 1
+    page = col3.number_input("Trang", min_value=1, max_value=pages, key=f"{key}_page")
+    start = (page - 1) * PREVIEW_PAGE_SIZE
+    st.dataframe(frame.iloc[start:start + PREVIEW_PAGE_SIZE], hide_index=True)
+    if len(frame):
+        st.caption(f"Dòng {start + 1:,}–{min(start + PREVIEW_PAGE_SIZE, len(frame)):,} trên {len(frame):,} dòng.")
+
+
+# Hàm suy luận kiểu cho các dòng nhập trực tiếp: kết quả theo từng cặp (tên cột, giá trị mẫu) được giữ trong
+# session_state, mỗi lần chạy lại chỉ suy luận các cặp mới hoặc đã sửa. Trả về kiểu dữ liệu theo thứ tự dòng
+def _infer_direct_input_types(column_names, sample_values):
+    previous = st.session_state.get("direct_input_types", {})
+    lines = list(zip(column_names, sample_values))
+    changed = [line for line in dict.fromkeys(lines) if line not in previous]
+    if changed:
+        # Có dòng mới hoặc đã sửa mới cần suy luận (nạp pandas)
+        with stage("infer_data_types", rows=len(changed)):
+            inferred = infer_data_types([sample for _, sample in changed], [name for name, _ in changed])
+        previous.update(zip(changed, inferred))
+    # Chỉ giữ kết quả của các dòng hiện có
+    current = {line: previous[line] for line in lines}
+    st.session_state["direct_input_types"] = current
+    return [current[line] for line in lines]
+
+
+# Tab nhập dữ liệu trực tiếp (tên cột và giá trị mẫu, mỗi dòng một cột), chạy lại riêng khi sửa ô nhập liệu
+# (fragment) thay vì chạy lại cả trang; export_template thêm nút tải xuống file Excel mẫu,
+# physical_layout sắp xếp cột theo căn lề vật lý
+@st.fragment
+def render_direct_input_tab(full_table_name, table_name, physical_layout=False, export_template=False):
+    # Fragment chạy lại riêng không qua đầu script: bật lại bộ ghi số đo cho lần chạy này
+    start_stage_metrics()
+    # Khu vực nhập liệu
+    col1, col2 = st.columns(2)
+    column_names_input = col1.text_area(
+        "Tên cột", height=200, placeholder="Nhập danh sách tên cột, mỗi dòng một cột", key="direct_column_names"
+    )
+    sample_values_input = col2.text_area(
+        "Giá trị mẫu", height=200, placeholder="Nhập danh sách giá trị mẫu, mỗi dòng một giá trị",
+        key="direct_sample_values",
+    )
+
+    column_names = (
+        [name.strip() for name in column_names_input.strip().split("\n")] if column_names_input.strip() else []
+    )
+    sample_values = (
+        [value.strip() for value in sample_values_input.strip().split("\n")] if sample_values_input.strip() else []
+    )
+    row_count = max(len(column_names), len(sample_values))
+    # Kiểu dữ liệu của các dòng có đủ tên cột và giá trị mẫu
+    data_types = _infer_direct_input_types(column_names, sample_values)
+    with stage("normalize_column_names", rows=len(column_names)):
+        normalized_names = normalize_column_names(column_names)
+
+    # Hiển thị dữ liệu đã nhập (ngay cả khi không hợp lệ); chưa nhập gì thì không dựng bảng (không nạp pandas)
+    st.write("### Dữ liệu đã nhập:")
+    if not row_count:
+        st.caption("Chưa có dòng nào.")
+    else:
+        import pandas as pd
+
+        render_column_preview(pd.DataFrame({
+            "STT": range(1, row_count + 1),
+            COLUMN_NAME_KEY: column_names + [""] * (row_count - len(column_names)),
+            SAMPLE_VALUE_KEY: sample_values + [""] * (row_count - len(sample_values)),
+            "Tên chuẩn hóa": normalized_names + [None] * (row_count - len(normalized_names)),
+            "Kiểu dữ liệu": data_types + [None] * (row_count - len(data_types)),
+            "Xung đột tên": normalization_conflicts(column_names) + [False] * (row_count - len(column_names)),
+        }), key="direct_preview")
+
+    # Kiểm tra tính hợp lệ của dữ liệu
+    if len(column_names) != len(sample_values):
+        st.error("Số lượng dòng giữa 'Tên cột' và 'Giá trị mẫu' không khớp!")
+        return
+
+    label = "Tạo code SQL và xuất Excel" if export_template else "Tạo code SQL từ dữ liệu nhập"
+    if not st.button(label, key="direct_generate"):
+        return
+    if not column_names:
+        st.error("Vui lòng nhập đầy đủ cả danh sách tên cột và giá trị mẫu!")
+        return
+    try:
+        columns = list(zip(normalized_names, data_types))
+        sql_output = build_layout_create_table_sql(columns, full_table_name, physical_layout)
+        st.subheader("Câu lệnh CREATE TABLE:")
+        st.code(sql_output, language="sql")
+        if physical_layout:
+            render_layout_savings(columns)
+
+        # Nút tải xuống file SQL
+        st.download_button(
+            label="Tải xuống file SQL",
+            data=sql_output,
+            file_name=f"{table_name}.sql",
+            mime="text/sql",
+            key="download_sql",
+        )
+        if export_template:
+            render_template_download(column_names, table_name, key="download_excel")
+    except Exception as e:
+        st.error(f"Lỗi: {e}")
+
+
+# Phần đề xuất phân vùng và index cho bảng lớn: tùy chọn phân vùng theo khoảng ngày của một cột kiểu ngày
+# và danh sách index đề xuất (profiles: hồ sơ các cột từ dữ liệu thực, nếu có); key: tiền tố khóa của các widget
+def render_partition_section(columns, full_table_name, table_name, key, physical_layout=False, lengths=None,
+                             profiles=None):
+    with st.expander("Phân vùng và index cho bảng lớn"):
+        partition_column = None
+        if st.checkbox("Phân vùng theo khoảng ngày (PARTITION BY RANGE)", key=f"{key}_partition"):
+            candidates = date_columns(columns)
+            if not candidates:
+                st.info("Không có cột kiểu DATE/TIMESTAMP để phân vùng.")
+            else:
+                col1, col2, col3, col4 = st.columns(4)
+                partition_column = col1.selectbox("Cột phân vùng", candidates, key=f"{key}_partition_column")
+                interval = col2.radio(
+                    "Mỗi phân vùng", ["month", "year"], key=f"{key}_partition_interval",
+                    format_func={"month": "Một tháng", "year": "Một năm"}.get,
+                )
+                this_year = datetime.date.today().replace(month=1, day=1)
+                start = col3.date_input("Từ ngày", value=this_year, key=f"{key}_partition_start")
+                end = col4.date_input(
+                    "Đến ngày (không bao gồm)", value=this_year.replace(year=this_year.year + 1),
+                    key=f"{key}_partition_end",
+                )
+
+        recommendations = recommend_indexes(columns, full_table_name, partition_column, profiles)
+        if recommendations:
+            import pandas as pd
+
+            st.write("#### Index đề xuất:")
+            st.dataframe(pd.DataFrame(
+                [(column_name, index_type or "Không", reason)
+                 for column_name, index_type, reason, _ in recommendations],
+                columns=["Cột", "Loại index", "Lý do"],
+            ), hide_index=True)
+        else:
+            st.caption("Không có cột ngày hoặc cột dạng mã/khóa để đề xuất index.")
+
+        statements = []
+        if partition_column:
+            try:
+                statements.append(build_partitioned_table_sql(
+                    columns, full_table_name, partition_column, start, end, interval, physical_layout, lengths
+                ))
+            except ValueError as e:
+                st.error(str(e))
+        statements += [sql for *_, sql in recommendations if sql]
+        if statements:
+            sql_output = "\n\n".join(statements)
+            st.code(sql_output, language="sql")
+            st.download_button(
+                label="Tải xuống file SQL phân vùng và index",
+                data=sql_output,
+                file_name=f"{table_name}_partition_index.sql",
+                mime="text/sql",
+                key=f"{key}_download_partition_sql",
+            )
+
+
+# Phần so sánh với schema cũ: tải lên Code SQL đã sinh trước đó hoặc ảnh chụp schema JSON để nhận lệnh ALTER TABLE
+# (thêm/xóa cột, đổi kiểu) thay vì tạo lại bảng; tải xuống ảnh chụp schema hiện tại cho lần so sánh sau
+def render_schema_diff(columns, full_table_name, table_name, key):
+    from createtable_diff import (
+        ADD,
+        ALTER_TYPE,
+        build_alter_table_sql,
+        diff_columns,
+        read_previous_schema,
+        schema_snapshot,
+    )
+
+    with st.expander("So sánh với schema cũ (ALTER TABLE)"):
+        st.download_button(
+            "Tải xuống ảnh chụp schema (JSON)", schema_snapshot(columns, full_table_name), f"{table_name}.json",
+            "application/json", key=f"{key}_download_snapshot",
+        )
+        previous_file = st.file_uploader(
+            "Schema cũ: Code SQL đã sinh (.sql) hoặc ảnh chụp schema (.json)", type=["sql", "json"],
+            key=f"{key}_previous_schema",
+        )
+        if previous_file is None:
+            return
+        try:
+            old_columns = read_previous_schema(previous_file.getvalue().decode("utf-8-sig"), full_table_name)
+        except (UnicodeDecodeError, ValueError) as e:
+            st.error(f"Không đọc được schema cũ: {e}")
+            return
+        changes = diff_columns(old_columns, columns)
+        if changes:
+            import pandas as pd
+
+            labels = {ADD: "Thêm cột", ALTER_TYPE: "Đổi kiểu"}
+            st.dataframe(pd.DataFrame(
+                [(labels.get(action, "Xóa cột"), column_name, old_type or "", new_type or "", rewrite)
+                 for action, column_name, old_type, new_type, rewrite in changes],
+                columns=["Thay đổi", "Cột", "Kiểu cũ", "Kiểu mới", "Ghi lại bảng"],
+            ), hide_index=True)
+            rewrites = [column_name for _, column_name, *_, rewrite in changes if rewrite]
+            if rewrites:
+                st.warning(
+                    f"Đổi kiểu các cột {', '.join(rewrites)} buộc ghi lại toàn bộ bảng "
+                    "(khóa bảng trong suốt quá trình)."
+                )
+        sql_output = build_alter_table_sql(changes, full_table_name)
+        st.code(sql_output, language="sql")
+        if changes:
+            st.download_button(
+                "Tải xuống file SQL ALTER TABLE", sql_output, f"{table_name}_alter.sql", "text/sql",
+                key=f"{key}_download_alter_sql",
+            )
+
+
+# Hàm chuyển file dữ liệu tải lên sang định dạng COPY (các file tạm), đóng gói các file dữ liệu và script \copy
+# thành file zip. Trả về (nội dung zip, số dòng mỗi shard, số giá trị không chuyển được kiểu của từng cột)
+def _copy_export_zip(uploaded_file, profiles, full_table_name, copy_format, shards, narrow, sheet_name):
+    from createtable_copy import convert_to_copy_files
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        paths, shard_rows, failures = convert_to_copy_files(
+            uploaded_file, profiles, output_dir, full_table_name, copy_format, shards, narrow,
+            file_name=uploaded_file.name, sheet_name=sheet_name,
+        )
+        output = BytesIO()
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path in paths:
+                archive.write(path, os.path.basename(path))
+    return output.getvalue(), shard_rows, failures
+
+
+# Phần chuyển dữ liệu tải lên sang định dạng COPY của PostgreSQL (text/binary, có thể chia shard để nạp song song);
+# kết quả giữ trong session_state cho tới khi tệp, các cột hoặc tùy chọn thay đổi
+def render_copy_export(uploaded_file, profiles, full_table_name, table_name, narrow=False, sheet_name=None):
+    from createtable_copy import COPY_FORMATS, MAX_SHARDS
+    from createtable_profile import profiles_to_columns
+
+    with st.expander("Chuyển dữ liệu sang định dạng COPY để nạp vào PostgreSQL"):
+        col1, col2 = st.columns(2)
+        copy_format = col1.radio(
+            "Định dạng", COPY_FORMATS, key="copy_format", horizontal=True,
+            format_func={"text": "Text (đọc được)", "binary": "Binary (nạp nhanh hơn)"}.get,
+        )
+        shards = col2.number_input(
+            "Số shard (nạp song song)", min_value=1, max_value=MAX_SHARDS, value=1, key="copy_shards"
+        )
+        params = (
+            upload_content_hash(uploaded_file), sheet_name, full_table_name, copy_format, int(shards),
+            tuple(profiles_to_columns(profiles, narrow)[0]),
+            tuple((profile.date_format, profile.decimal_separator) for profile in profiles),
+        )
+        if st.button("Chuyển đổi", key="copy_convert"):
+            with st.spinner("Đang chuyển đổi dữ liệu..."):
+                st.session_state["copy_export"] = (params, _copy_export_zip(
+                    uploaded_file, profiles, full_table_name, copy_format, int(shards), narrow, sheet_name
+                ))
+
+        stored = st.session_state.get("copy_export")
+        if stored is None or stored[0] != params:
+            return
+        archive, shard_rows, failures = stored[1]
+        st.caption(
+            f"Đã chuyển {sum(shard_rows):,} dòng vào {len(shard_rows)} file "
+            f"({', '.join(f'{rows:,}' for rows in shard_rows)} dòng), kèm script {table_name}_load.sql."
+        )
+        failed = {column_name: count for column_name, count in failures.items() if count}
+        if failed:
+            st.warning("Giá trị không chuyển được kiểu, nạp thành NULL: " + ", ".join(
+                f"{column_name} ({count:,})" for column_name, count in failed.items()
+            ))
+        st.download_button(
+            "Tải xuống file zip (dữ liệu COPY và script \\copy)", archive, f"{table_name}_copy.zip", "application/zip",
+            key="copy_download_zip",
+        )
+
+
+# Hàm ghi file Excel từ các dòng (iterable) ở chế độ constant_memory vào tệp tạm; trả về (nội dung file, số dòng).
+# Lúc ghi không dựng DataFrame hay bộ đệm BytesIO trung gian, nhưng nút tải xuống của Streamlit vẫn giữ toàn bộ
+# nội dung file (đã nén) trong bộ nhớ một lần
+def _excel_file_bytes(headers, rows, file_name):
+    from createtable_io import write_excel_rows
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        path = os.path.join(output_dir, file_name)
+        row_count = write_excel_rows(path, headers, rows)
+        with open(path, "rb") as excel_file:
+            return excel_file.read(), row_count
+
+
+# Nút tải xuống file Excel ghi từ các dòng (iterable)
+def render_excel_download(headers, rows, file_name, key, label="Tải xuống file Excel"):
+    from createtable_io import EXCEL_MIME
+
+    content, row_count = _excel_file_bytes(headers, rows, file_name)
+    st.download_button(label, content, file_name, EXCEL_MIME, key=key)
+    return row_count
+
+
+# Nút tải xuống toàn bộ dữ liệu tải lên đã chuyển đổi (tên cột chuẩn hóa, giá trị theo kiểu đã suy luận) dạng file
+# Excel mẫu với action_type = insert, dùng để sinh script cập nhật dữ liệu. Nút hiện ngay; file chỉ được ghi khi bấm
+# tải xuống (Streamlit gọi hàm tạo nội dung ở luồng riêng, đọc từ bản sao nội dung tệp tải lên)
+def render_converted_export(uploaded_file, profiles, table_name, narrow=False, sheet_name=None):
+    from createtable_io import EXCEL_MIME
+
+    content, file_name = uploaded_file.getvalue(), uploaded_file.name
+    headers = ["action_type", "id"] + [profile.normalized_name for profile in profiles]
+    excel_name = f"{table_name}_converted.xlsx"
+
+    def converted_excel():
+        from createtable_copy import iter_converted_rows
+
+        rows = (
+            ["insert", None] + row
+            for row in iter_converted_rows(BytesIO(content), profiles, narrow, file_name=file_name,
+                                           sheet_name=sheet_name)
+        )
+        return _excel_file_bytes(headers, rows, excel_name)[0]
+
+    st.download_button(
+        "Tải xuống dữ liệu đã chuyển đổi dạng file Excel mẫu", converted_excel, excel_name, EXCEL_MIME,
+        key="profile_download_converted_excel",
+    )
+
+
+# Nút tải xuống file Excel mẫu để nhập dữ liệu (action_type, id và các cột đã chuẩn hóa)
+def render_template_download(column_names, table_name, key):
+    normalized_columns = normalize_column_names(column_names)
+    render_excel_download(["action_type", "id"] + normalized_columns, [], f"{table_name}_converted.xlsx", key)
+
+
+# Hàm lập danh sách bảng cần sinh từ các tệp tải lên: [(tệp, sheet, tên bảng)]. Một tệp: các sheet được chọn,
+# tên bảng nhập vào (một sheet) hoặc tên sheet; nhiều tệp: mọi sheet của mọi tệp, tên bảng lấy theo tên tệp
+# (thêm tên sheet nếu tệp có nhiều sheet). Tên bảng được chuẩn hóa và không trùng nhau
+def _plan_upload_tables(uploaded_files, table_name):
+    planned = []
+    if len(uploaded_files) == 1:
+        uploaded_file = uploaded_files[0]
+        sheet_names = select_upload_sheets(uploaded_file, key="upload_sheet")
+        for sheet_name in sheet_names:
+            planned.append((uploaded_file, sheet_name, table_name if len(sheet_names) == 1 else sheet_name))
+    else:
+        for uploaded_file in uploaded_files:
+            file_table_name = table_name_from_path(uploaded_file.name)
+            if not uploaded_file.name.lower().endswith(".xlsx"):
+                sheet_names = [None]
+            else:
+                sheet_names = _cached_sheet_names(upload_content_hash(uploaded_file), uploaded_file)
+            for sheet_name in sheet_names:
+                candidate = file_table_name if len(sheet_names) == 1 else f"{file_table_name}_{sheet_name}"
+                planned.append((uploaded_file, sheet_name, candidate))
+    table_names = normalize_column_names([candidate for _, _, candidate in planned])
+    return [(uploaded_file, sheet_name, name) for (uploaded_file, sheet_name, _), name in zip(planned, table_names)]
+
+
+# Hiển thị Code CREATE TABLE của một bảng và các nút tải xuống
+def _render_upload_table(result, table_name, key_suffix, export_template, physical_layout):
+    st.caption(
+        f"{len(result['column_names']):,} cột, bộ nhớ đỉnh khi xử lý: {format_megabytes(result['peak_bytes'])}"
+    )
+    with st.expander("Danh sách cột"):
+        import pandas as pd
+
+        render_column_preview(pd.DataFrame({
+            "STT": range(1, len(result["columns"]) + 1),
+            COLUMN_NAME_KEY: result["column_names"],
+            "Tên chuẩn hóa": [column_name for column_name, _ in result["columns"]],
+            "Kiểu dữ liệu": [data_type for _, data_type in result["columns"]],
+            "Xung đột tên": normalization_conflicts(result["column_names"]),
+        }), key=f"upload_preview{key_suffix}")
+    st.subheader("Code SQL CREATE TABLE:")
+    st.code(result["sql"], language="sql")
+    if physical_layout:
+        render_layout_savings(result["columns"])
+
+    # Nút tải xuống file SQL
+    st.download_button(
+        label="Tải xuống file SQL",
+        data=result["sql"],
+        file_name=f"{table_name}.sql",
+        mime="text/sql",
+        key=f"download_sql_file{key_suffix}",
+    )
+    if export_template:
+        render_template_download(result["column_names"], table_name, key=f"download_excel_file{key_suffix}")
+    render_schema_diff(result["columns"], result["full_table_name"], table_name, f"upload_diff{key_suffix}")
+
+
+# Tab đính kèm tệp đặc tả: mỗi sheet (hoặc mỗi tệp CSV) sinh một Code CREATE TABLE, nhiều bảng thì tải xuống
+# được một file .sql gộp hoặc file zip; export_template thêm nút tải xuống file Excel mẫu cho từng bảng,
+# physical_layout sắp xếp cột theo căn lề vật lý
+def render_upload_tab(schema_name, table_name, export_template=False, physical_layout=False):
+    # Khu vực tải lên tệp
+    uploaded_files = st.file_uploader(
+        "Tải lên tệp Excel, CSV hoặc Parquet/Feather (có thể chọn nhiều tệp)",
+        type=["xlsx", "csv"] + [extension.lstrip(".") for extension in SCHEMA_EXTENSIONS],
+        accept_multiple_files=True,
+    )
+    if not uploaded_files:
+        return
+
+    try:
+        planned = _plan_upload_tables(uploaded_files, table_name)
+        # Đọc và suy luận (cache theo mã băm nội dung, không xử lý lại khi đổi schema hay tên bảng)
+        jobs_key = tuple(
+            (upload_content_hash(uploaded_file), os.path.splitext(uploaded_file.name)[1].lower(), sheet_name)
+            for uploaded_file, sheet_name, _ in planned
+        )
+        jobs = [(uploaded_file.getvalue(), uploaded_file.name, sheet_name) for uploaded_file, sheet_name, _ in planned]
+        with st.spinner(f"Đang xử lý {len(jobs)} bảng..."):
+            results = _cached_upload_tables(jobs_key, jobs)
+        # Code CREATE TABLE sinh từ các cột đã cache, cache theo schema, tên bảng và thứ tự cột hiện tại
+        results = [
+            result if "error" in result else dict(
+                result,
+                full_table_name=f"{schema_name}.{name}",
+                sql=_cached_upload_sql(f"{schema_name}.{name}", job_key, physical_layout, result["columns"]),
+            )
+            for (_, _, name), job_key, result in zip(planned, jobs_key, results)
+        ]
+    except Exception as e:
+        st.error(f"Lỗi khi xử lý tệp: {e}")
+        return
+
+    if len(planned) == 1:
+        if "error" in results[0]:
+            st.error(f"Lỗi khi xử lý tệp: {results[0]['error']}")
+        else:
+            _render_upload_table(results[0], planned[0][2], "", export_template, physical_layout)
+            render_partition_section(
+                results[0]["columns"], f"{schema_name}.{planned[0][2]}", planned[0][2], "upload", physical_layout
+            )
+        return
+
+    # Nhiều bảng: tải xuống tất cả trong một file .sql gộp hoặc file zip (mỗi bảng một file)
+    tables = [(name, result["sql"]) for (_, _, name), result in zip(planned, results) if "error" not in result]
+    st.write(f"### Đã sinh {len(tables)}/{len(planned)} bảng")
+    if tables:
+        col1, col2 = st.columns(2)
+        col1.download_button(
+            "Tải xuống file SQL gộp", build_sql_bundle(tables), f"{schema_name}.sql", "text/sql",
+            key="download_sql_bundle",
+        )
+        col2.download_button(
+            "Tải xuống file zip (mỗi bảng một file)", build_sql_zip(tables), f"{schema_name}.zip",
+            "application/zip", key="download_sql_zip",
+        )
+
+    for (uploaded_file, sheet_name, name), result in zip(planned, results):
+        source = uploaded_file.name if sheet_name is None else f"{uploaded_file.name} / {sheet_name}"
+        if "error" in result:
+            st.error(f"Lỗi khi xử lý {source}: {result['error']}")
+            continue
+        with st.expander(f"{schema_name}.{name} ({source})"):
+            _render_upload_table(result, name, f"_{name}", export_template, physical_layout)
+
+
+# Lập hồ sơ dữ liệu thực, cache theo mã băm nội dung tệp và các tham số; trả về (hồ sơ các cột,
+# bộ nhớ đỉnh hoặc None nếu không đo — tracemalloc làm chậm việc đọc nhiều lần)
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_profiles(content_hash, sampling, chunksize, tail_rows, confidence, tolerance, sheet_name, usecols,
+                     measure_memory, _uploaded_file):
+    from createtable_profile import profile_data_file, sample_data_file
+
+    _uploaded_file.seek(0)
+    with track_peak_memory() if measure_memory else nullcontext({}) as memory:
+        if sampling:
+            profiles = sample_data_file(_uploaded_file, tail_rows=tail_rows, confidence=confidence,
+                                        tolerance=tolerance, sheet_name=sheet_name, usecols=usecols)
+        else:
+            profiles = profile_data_file(_uploaded_file, chunksize=chunksize, sheet_name=sheet_name, usecols=usecols)
+    return profiles, memory.get("peak_bytes")
+
+
+# Tiêu đề các cột của file dữ liệu tải lên, cache theo mã băm nội dung và sheet
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_headers(content_hash, file_name, sheet_name, _uploaded_file):
+    from createtable_io import read_data_headers
+
+    return read_data_headers(_uploaded_file, file_name=file_name, sheet_name=sheet_name)
+
+
+# Phần lập hồ sơ của tệp đã tải lên: tùy chọn đọc tệp, hồ sơ các cột, Code CREATE TABLE và các phần xuất dữ liệu
+def _render_profile(uploaded_file, full_table_name, table_name, physical_layout, export_template):
+    from createtable_io import DEFAULT_CHUNK_SIZE, DEFAULT_SAMPLE_ROWS, DEFAULT_STRATA
+    from createtable_profile import (
+        DEFAULT_CONFIDENCE,
+        DEFAULT_TAIL_ROWS,
+        DEFAULT_TOLERANCE,
+        estimate_row_bytes,
+        profiles_to_columns,
+        profiles_to_frame,
+        profiles_to_sql,
+        rows_for_confidence,
+    )
+
+    sampling = st.checkbox("Lấy mẫu và dừng sớm (tệp lớn)", value=True, key="profile_sampling")
+    if sampling:
+        col1, col2, col3 = st.columns(3)
+        confidence = col1.number_input(
+            "Độ tin cậy", min_value=0.5, max_value=0.9999, value=DEFAULT_CONFIDENCE, format="%.4f",
+            key="profile_confidence",
+        )
+        tolerance = col2.number_input(
+            "Tỷ lệ giá trị khác kiểu chấp nhận", min_value=0.00001, max_value=0.1, value=DEFAULT_TOLERANCE,
+            format="%.5f", key="profile_tolerance",
+        )
+        tail_rows = col3.number_input(
+            "Số dòng cuối tệp luôn kiểm tra", min_value=0, value=DEFAULT_TAIL_ROWS, step=500, key="profile_tail_rows"
+        )
+        st.caption(
+            f"Mỗi cột dừng đọc sau khoảng {rows_for_confidence(confidence, tolerance):,} dòng khớp kiểu "
+            f"(đọc {DEFAULT_STRATA} khối mẫu x {DEFAULT_SAMPLE_ROWS:,} dòng trải đều trên tệp)."
+        )
+        chunksize = DEFAULT_CHUNK_SIZE
+    else:
+        chunksize = st.number_input(
+            "Số dòng mỗi khối đọc", min_value=1_000, value=DEFAULT_CHUNK_SIZE, step=10_000, key="profile_chunksize"
+        )
+        tail_rows, confidence, tolerance = DEFAULT_TAIL_ROWS, DEFAULT_CONFIDENCE, DEFAULT_TOLERANCE
+
+    measure_memory = st.checkbox("Đo bộ nhớ đỉnh (đọc chậm hơn)", value=False, key="profile_measure_memory")
+    narrow = st.checkbox(
+        "Thu hẹp kiểu dữ liệu theo giá trị thực (SMALLINT/INTEGER/BIGINT, NUMERIC, BOOLEAN, TIMESTAMP)",
+        value=False, key="profile_narrow",
+    )
+
+    try:
+        content_hash = upload_content_hash(uploaded_file)
+        # Chỉ đọc một sheet và các cột được chọn
+        sheet_name = select_upload_sheets(uploaded_file, key="profile_sheet", allow_all=False)[0]
+        headers = _cached_headers(content_hash, uploaded_file.name, sheet_name, uploaded_file)
+        selected = st.multiselect("Các cột cần lập hồ sơ", headers, default=headers, key="profile_columns")
+        usecols = None if len(selected) == len(headers) else tuple(selected)
+
+        with st.spinner("Đang đọc và phân tích dữ liệu..."):
+            profiles, peak_bytes = _cached_profiles(
+                content_hash, sampling, int(chunksize), int(tail_rows), confidence, tolerance, sheet_name,
+                usecols, measure_memory, uploaded_file,
+            )
+        if peak_bytes is not None:
+            st.caption(f"Bộ nhớ đỉnh khi đọc tệp: {format_megabytes(peak_bytes)}")
+
+        st.write("### Hồ sơ các cột:")
+        st.dataframe(profiles_to_frame(profiles, narrow=narrow), hide_index=True)
+        if narrow:
+            before, after = estimate_row_bytes(profiles), estimate_row_bytes(profiles, narrow=True)
+            st.caption(
+                f"Ước tính dữ liệu mỗi dòng (chưa tính phần đầu dòng và byte đệm): {before:,.0f} byte → "
+                f"{after:,.0f} byte ({after - before:+,.0f} byte)."
+            )
+        outliers = [profile.column_name for profile in profiles if profile.tail_outlier]
+        if outliers:
+            st.warning(f"Kiểu dữ liệu thay đổi khi kiểm tra cuối tệp: {', '.join(outliers)}")
+
+        sql_output = profiles_to_sql(profiles, full_table_name, narrow=narrow, physical_layout=physical_layout)
+        st.subheader("Code SQL CREATE TABLE:")
+        st.code(sql_output, language="sql")
+        columns, lengths = profiles_to_columns(profiles, narrow)
+        if physical_layout:
+            render_layout_savings(columns, lengths)
+
+        st.download_button(
+            label="Tải xuống file SQL",
+            data=sql_output,
+            file_name=f"{table_name}.sql",
+            mime="text/sql",
+            key="profile_download_sql",
+        )
+        render_partition_section(
+            columns, full_table_name, table_name, "profile", physical_layout, lengths, profiles
+        )
+        render_schema_diff(columns, full_table_name, table_name, "profile_diff")
+        render_copy_export(uploaded_file, profiles, full_table_name, table_name, narrow, sheet_name)
+        if export_template:
+            render_converted_export(uploaded_file, profiles, table_name, narrow, sheet_name)
+    except Exception as e:
+        st.error(f"Lỗi khi xử lý tệp: {e}")
+
+
+# Tab lập hồ sơ dữ liệu thực: suy luận kiểu từ mọi dòng của file dữ liệu thay vì một giá trị mẫu
+# (physical_layout: sắp xếp cột theo căn lề vật lý; export_template: xuất dữ liệu đã chuyển đổi ra file Excel mẫu)
+def render_profile_tab(full_table_name, table_name, physical_layout=False, export_template=False):
+    uploaded_file = st.file_uploader(
+        "Tải lên tệp dữ liệu thực (Excel hoặc CSV, mỗi cột một trường)", type=["xlsx", "csv"], key="profile_file"
+    )
+    # Các tùy chọn đọc tệp chỉ hiển thị khi đã có tệp (các mô-đun đọc tệp và pandas chỉ được nạp khi cần)
+    if uploaded_file is not None:
+        _render_profile(uploaded_file, full_table_name, table_name, physical_layout, export_template)
+
+    st.markdown("---")
+    st.write("""
+    ### Hướng dẫn lập hồ sơ dữ liệu
+    Tải lên tệp dữ liệu thực, dòng đầu tiên là tiêu đề, mỗi cột là một trường:
+    - Tệp được đọc lần lượt từng khối, bộ nhớ sử dụng không phụ thuộc số dòng.
+    - Kiểu dữ liệu được suy luận từ mọi dòng, ô trống được bỏ qua.
+    - Cột chỉ có số → DOUBLE PRECISION, chỉ có ngày → DATE, trộn lẫn → TEXT.
+    - Chế độ lấy mẫu đọc các khối trải đều trên tệp và dừng đọc mỗi cột khi kiểu đã đủ độ tin cậy;
+      các dòng cuối tệp luôn được kiểm tra để phát hiện giá trị bất thường.
+    - Tệp CSV có ô chứa xuống dòng nên tắt chế độ lấy mẫu để đọc toàn bộ.
+    - Thu hẹp kiểu chọn kiểu nhỏ nhất chứa được mọi giá trị đã đọc; khi lấy mẫu, khoảng giá trị chỉ dựa
+      trên các dòng mẫu nên hãy tắt lấy mẫu nếu cần chắc chắn.
+    - Với tệp Excel, chỉ sheet và các cột được chọn được đọc (chế độ chỉ đọc của openpyxl).
+    - Chuyển sang định dạng COPY đọc lại toàn bộ tệp theo từng khối: tên cột được chuẩn hóa, giá trị được chuyển
+      sang kiểu đã suy luận (ngày theo định dạng phát hiện được); giá trị không chuyển được nạp thành NULL.
+    """)
+
+
+# Script cập nhật dữ liệu từ file mẫu đã điền, cache theo mã băm nội dung, sheet, tên bảng, số dòng mỗi lô và cột
+# phân vùng
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_upsert_script(content_hash, sheet_name, full_table_name, batch_size, partition_column, _uploaded_file):
+    from createtable_upsert import write_upsert_script
+
+    output = StringIO()
+    counts = write_upsert_script(
+        _uploaded_file, output, full_table_name, batch_size=batch_size, file_name=_uploaded_file.name,
+        sheet_name=sheet_name, partition_column=partition_column,
+    )
+    return output.getvalue(), counts
+
+
+# Tab sinh script cập nhật dữ liệu từ file mẫu (action_type, id, các cột) đã điền: lệnh INSERT ... ON CONFLICT,
+# UPDATE ... FROM (VALUES ...) và DELETE ... = ANY(...) cho từng lô dòng
+def render_upsert_tab(full_table_name, table_name):
+    uploaded_file = st.file_uploader(
+        "Tải lên file mẫu đã điền (Excel hoặc CSV, có cột action_type và id)", type=["xlsx", "csv"],
+        key="upsert_file",
+    )
+    if uploaded_file is None:
+        return
+    from createtable_upsert import ACTION_COLUMN, DEFAULT_BATCH_SIZE, ID_COLUMN
+
+    batch_size = st.number_input(
+        "Số dòng mỗi lệnh", min_value=1, max_value=100_000, value=DEFAULT_BATCH_SIZE, step=500,
+        key="upsert_batch_size",
+    )
+    try:
+        sheet_name = select_upload_sheets(uploaded_file, key="upsert_sheet", allow_all=False)[0]
+        content_hash = upload_content_hash(uploaded_file)
+        headers = _cached_headers(content_hash, uploaded_file.name, sheet_name, uploaded_file)
+        # Bảng phân vùng có khóa chính (id, cột phân vùng): lệnh INSERT ... ON CONFLICT cần cả cột phân vùng
+        partition_options = [None] + [
+            name for name in normalize_column_names(headers) if name not in (ACTION_COLUMN, ID_COLUMN)
+        ]
+        partition_column = st.selectbox(
+            "Bảng phân vùng theo cột", partition_options, key="upsert_partition_column",
+            format_func=lambda name: "(Không phân vùng)" if name is None else name,
+        )
+        with st.spinner("Đang đọc file mẫu và sinh lệnh..."):
+            script, counts = _cached_upsert_script(
+                content_hash, sheet_name, full_table_name, int(batch_size), partition_column, uploaded_file
+            )
+    except Exception as e:
+        st.error(f"Lỗi khi xử lý tệp: {e}")
+        return
+
+    st.caption(
+        f"Thêm/cập nhật theo id: {counts['insert']:,} dòng, sửa: {counts['update']:,} dòng, "
+        f"xóa: {counts['delete']:,} dòng."
+    )
+    st.subheader("Script cập nhật dữ liệu:")
+    # Chỉ hiển thị phần đầu script khi script quá dài
+    preview_limit = 20_000
+    st.code(script if len(script) <= preview_limit else script[:preview_limit] + "\n-- ...", language="sql")
+    st.download_button(
+        label="Tải xuống file SQL",
+        data=script,
+        file_name=f"{table_name}_upsert.sql",
+        mime="text/sql",
+        key="upsert_download_sql",
+    )
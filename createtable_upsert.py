@@ -0,0 +1,275 @@
+# Sinh script cập nhật dữ liệu từ file mẫu đã điền (action_type, id và các cột đã chuẩn hóa): đọc file theo
+# từng khối, gom các dòng liên tiếp cùng action_type và sinh lệnh nhiều dòng cho mỗi lô thay vì một lệnh cho mỗi
+# dòng
+import numpy as np
+import pandas as pd
+
+from createtable_copy import CoercionError, value_encoder
+from createtable_core import normalize_column_name, normalize_column_names
+from createtable_io import DEFAULT_CHUNK_SIZE, iter_data_chunks, read_data_headers
+from createtable_metrics import measured_stage
+from createtable_profile import profile_data_file
+from createtable_types import decimal_separator_from_votes, decimal_separator_votes
+
+ACTION_COLUMN = "action_type"
+ID_COLUMN = "id"
+DEFAULT_BATCH_SIZE = 1_000
+# Giá trị action_type được chấp nhận (sau chuẩn hóa: bỏ dấu, chữ thường) -> thao tác
+ACTIONS = {
+    "insert": "insert", "upsert": "insert", "them": "insert", "them_moi": "insert",
+    "update": "update", "sua": "update", "cap_nhat": "update",
+    "delete": "delete", "xoa": "delete",
+}
+# Kiểu số: giá trị được ghi không có dấu nháy
+_NUMERIC_TYPES = ("SMALLINT", "INTEGER", "BIGINT", "NUMERIC", "DOUBLE PRECISION", "REAL")
+_ID_ENCODER = value_encoder("INTEGER", None, "text")
+
+
+# Hàm tạo bộ chuyển một giá trị thành hằng SQL theo kiểu dữ liệu, định dạng ngày và dấu thập phân của cột
+def _literal_encoder(data_type, date_format, decimal_separator=None):
+    encode = value_encoder(data_type, date_format, "text", decimal_separator)
+    base_type = data_type.split("(")[0].strip()
+
+    def literal(value):
+        text = encode(value)
+        if base_type == "BOOLEAN":
+            return "TRUE" if text == "t" else "FALSE"
+        if base_type in _NUMERIC_TYPES and text not in ("NaN", "Infinity", "-Infinity"):
+            return text
+        return "'" + text.replace("'", "''") + "'"
+    return literal
+
+
+# Hàm chuyển các giá trị của một cột trong khối thành mảng hằng SQL (ô trống: NULL); mỗi giá trị khác nhau chỉ
+# chuyển một lần. Giá trị không chuyển được kiểu gây ValueError kèm số dòng trong tệp (row_numbers: số dòng của
+# từng giá trị)
+def _literal_column(values, encoder, column_name, row_numbers):
+    codes, uniques = pd.factorize(values)
+    literals = []
+    for index, value in enumerate(uniques):
+        if isinstance(value, str) and not value.strip():
+            literals.append("NULL")
+            continue
+        try:
+            literals.append(encoder(value))
+        except CoercionError as e:
+            row_number = row_numbers[int(np.argmax(codes == index))]
+            raise ValueError(f"Dòng {row_number}, cột {column_name}: {e}") from None
+    literals.append("NULL")
+    return np.array(literals, dtype=object)[codes]
+
+
+# Hàm đọc id của một dòng (None nếu ô trống)
+def _parse_id(value, row_number):
+    if pd.isna(value) or (isinstance(value, str) and not value.strip()):
+        return None
+    try:
+        return int(_ID_ENCODER(value))
+    except CoercionError as e:
+        raise ValueError(f"Dòng {row_number}, cột {ID_COLUMN}: {e}") from None
+
+
+# Hàm tạo lệnh INSERT nhiều dòng; có id thì cập nhật dòng đã tồn tại (ON CONFLICT (id) DO UPDATE). Bảng phân
+# vùng có khóa chính (id, cột phân vùng) nên partition_column được thêm vào ON CONFLICT
+def build_insert_sql(full_table_name, column_names, rows, with_id=True, partition_column=None):
+    target_columns = ([ID_COLUMN] if with_id else []) + column_names
+    values = ",\n".join(f"    ({', '.join(row)})" for row in rows)
+    sql = f"INSERT INTO {full_table_name} ({', '.join(target_columns)}) VALUES\n{values}"
+    conflict_columns = ", ".join([ID_COLUMN] + ([partition_column] if partition_column else []))
+    updated_columns = [column_name for column_name in column_names if column_name != partition_column]
+    if with_id and updated_columns:
+        assignments = ", ".join(f"{column_name} = EXCLUDED.{column_name}" for column_name in updated_columns)
+        sql += f"\nON CONFLICT ({conflict_columns}) DO UPDATE SET {assignments}"
+    elif with_id:
+        sql += f"\nON CONFLICT ({conflict_columns}) DO NOTHING"
+    return sql + ";"
+
+
+# Hàm tạo lệnh đặt lại sequence của cột id theo id lớn nhất của bảng: INSERT có id cụ thể không tăng sequence,
+# nên không đặt lại thì các dòng thêm sau không có id sẽ trùng khóa
+def build_sequence_reset_sql(full_table_name):
+    return (
+        f"SELECT setval(pg_get_serial_sequence('{full_table_name}', '{ID_COLUMN}'), "
+        f"COALESCE(MAX({ID_COLUMN}), 0) + 1, false) FROM {full_table_name};"
+    )
+
+
+# Hàm tạo lệnh UPDATE ... FROM (VALUES ...) cho nhiều dòng; ô trống giữ nguyên giá trị hiện tại, cột trống ở mọi
+# dòng của lô không được cập nhật (None nếu không còn cột nào). Dòng đầu của VALUES ghi rõ kiểu
+# (các dòng sau theo kiểu đó)
+def build_update_sql(full_table_name, columns, rows):
+    kept = [index for index in range(len(columns)) if any(row[index + 1] != "NULL" for row in rows)]
+    if not kept:
+        return None
+    columns = [columns[index] for index in kept]
+    rows = [[row[0]] + [row[index + 1] for index in kept] for row in rows]
+    column_names = [column_name for column_name, _ in columns]
+    first_row = [f"{rows[0][0]}::INTEGER"] + [
+        f"{literal}::{data_type}" for literal, (_, data_type) in zip(rows[0][1:], columns)
+    ]
+    values = ",\n".join(f"    ({', '.join(row)})" for row in [first_row] + rows[1:])
+    assignments = ", ".join(
+        f"{column_name} = COALESCE(v.{column_name}, target.{column_name})" for column_name in column_names
+    )
+    return (
+        f"UPDATE {full_table_name} AS target SET {assignments}\n"
+        f"FROM (VALUES\n{values}\n) AS v ({', '.join([ID_COLUMN] + column_names)})\n"
+        f"WHERE target.{ID_COLUMN} = v.{ID_COLUMN};"
+    )
+
+
+# Hàm tạo lệnh DELETE cho nhiều id
+def build_delete_sql(full_table_name, ids):
+    return f"DELETE FROM {full_table_name} WHERE {ID_COLUMN} = ANY(ARRAY[{', '.join(map(str, ids))}]);"
+
+
+# Hàm xác định dấu thập phân của từng cột (None nếu chưa xác định được) theo các giá trị đã điền
+def _decimal_separators(source, file_name, sheet_name, headers):
+    votes = {header: {".": 0, ",": 0} for header in headers}
+    if hasattr(source, "seek"):
+        source.seek(0)
+    for chunk in iter_data_chunks(source, file_name=file_name, sheet_name=sheet_name, usecols=headers):
+        for header in headers:
+            for separator, count in decimal_separator_votes(chunk[header].dropna()).items():
+                votes[header][separator] += count
+    return [decimal_separator_from_votes(votes[header]) for header in headers]
+
+
+# Hàm lấy (tên cột, tên chuẩn hóa, kiểu dữ liệu, định dạng ngày, dấu thập phân) của các cột dữ liệu trong file
+# mẫu; columns: danh sách (tên cột, kiểu) từ đặc tả, None thì suy luận kiểu từ chính dữ liệu đã điền
+def _template_columns(source, file_name, sheet_name, headers, columns):
+    data_headers = [header for header in headers if normalize_column_name(header) not in (ACTION_COLUMN, ID_COLUMN)]
+    if columns is not None:
+        types = dict(columns)
+        missing = [name for name in normalize_column_names(data_headers) if name not in types]
+        if missing:
+            raise ValueError(f"Các cột không có trong bảng: {', '.join(missing)}")
+        separators = _decimal_separators(source, file_name, sheet_name, data_headers)
+        return [(header, name, types[name], None, separator)
+                for header, name, separator in zip(data_headers, normalize_column_names(data_headers), separators)]
+    profiles = profile_data_file(source, file_name=file_name, sheet_name=sheet_name, usecols=data_headers)
+    return [(profile.column_name, profile.normalized_name, profile.data_type, profile.date_format,
+             profile.decimal_separator) for profile in profiles]
+
+
+# Hàm đánh dấu các ô trống (NaN, None, chuỗi chỉ có khoảng trắng) của một cột
+def _blank_cells(values):
+    return (values.isna() | (values.astype(str).str.strip() == "")).to_numpy()
+
+
+# Hàm ghi script cập nhật dữ liệu (BEGIN; ... COMMIT;) từ file mẫu đã điền vào output (file văn bản), mỗi lệnh
+# tối đa batch_size dòng. Mỗi lô gồm các dòng liên tiếp cùng thao tác: lô được ghi khi đầy hoặc khi gặp dòng có
+# thao tác khác, nên các lệnh chạy đúng thứ tự các dòng trong tệp (xóa rồi thêm lại cùng id cho kết quả như từng
+# dòng). Trong một lô, id trùng được gộp: insert giữ dòng sau, update lấy các ô không trống của dòng sau.
+# Sau các dòng insert có id, sequence của cột id được đặt lại theo id lớn nhất. partition_column: cột phân vùng của
+# bảng phân vùng (khóa chính gồm id và cột này). Trả về số dòng của từng thao tác trong script (sau khi gộp)
+@measured_stage("upsert_script", counts=lambda counts: (sum(counts.values()), None))
+def write_upsert_script(source, output, full_table_name, columns=None, batch_size=DEFAULT_BATCH_SIZE,
+                        file_name=None, sheet_name=None, chunksize=DEFAULT_CHUNK_SIZE, partition_column=None):
+    if batch_size < 1:
+        raise ValueError("Số dòng mỗi lô phải lớn hơn 0.")
+    file_name = file_name or getattr(source, "name", str(source))
+    headers = read_data_headers(source, file_name=file_name, sheet_name=sheet_name)
+    normalized_headers = normalize_column_names(headers)
+    if ACTION_COLUMN not in normalized_headers or ID_COLUMN not in normalized_headers:
+        raise ValueError(f"Tệp phải có cột '{ACTION_COLUMN}' và '{ID_COLUMN}'.")
+    action_header = headers[normalized_headers.index(ACTION_COLUMN)]
+    id_header = headers[normalized_headers.index(ID_COLUMN)]
+
+    # Kiểu các cột được xác định (lập hồ sơ nếu cần) trước khi đọc lại tệp để sinh lệnh
+    template_columns = _template_columns(source, file_name, sheet_name, headers, columns)
+    column_names = [name for _, name, _, _, _ in template_columns]
+    encoders = [_literal_encoder(*column[2:]) for column in template_columns]
+    update_columns = [(name, data_type) for _, name, data_type, _, _ in template_columns]
+    if partition_column is not None and partition_column not in column_names:
+        raise ValueError(f"Tệp không có cột phân vùng '{partition_column}'.")
+    partition_index = None if partition_column is None else column_names.index(partition_column)
+
+    # Lô đang gom: thao tác (insert có id, insert_new không có id, update, delete) và các dòng hằng SQL theo khóa
+    # (id, kèm giá trị cột phân vùng với insert vào bảng phân vùng; số dòng với insert_new)
+    batch_kind, batch = None, {}
+    counts = {"insert": 0, "update": 0, "delete": 0}
+    # Có dòng insert với id cụ thể kể từ lần đặt lại sequence gần nhất
+    sequence_stale = False
+
+    def reset_sequence():
+        nonlocal sequence_stale
+        if sequence_stale:
+            output.write(build_sequence_reset_sql(full_table_name) + "\n\n")
+            sequence_stale = False
+
+    def flush():
+        nonlocal batch_kind, batch, sequence_stale
+        rows = list(batch.values())
+        if batch_kind == "insert":
+            output.write(build_insert_sql(full_table_name, column_names, rows, partition_column=partition_column)
+                         + "\n\n")
+            sequence_stale = True
+            counts["insert"] += len(rows)
+        elif batch_kind == "insert_new":
+            reset_sequence()
+            output.write(build_insert_sql(full_table_name, column_names, rows, with_id=False) + "\n\n")
+            counts["insert"] += len(rows)
+        elif batch_kind == "update":
+            sql = build_update_sql(full_table_name, update_columns, rows)
+            if sql:
+                output.write(sql + "\n\n")
+                counts["update"] += len(rows)
+        elif batch_kind == "delete":
+            output.write(build_delete_sql(full_table_name, rows) + "\n\n")
+            counts["delete"] += len(rows)
+        batch_kind, batch = None, {}
+
+    output.write(f"-- Cập nhật dữ liệu bảng {full_table_name} từ {file_name}\nBEGIN;\n\n")
+    # Dòng 1 của tệp là tiêu đề
+    first_row = 2
+    if hasattr(source, "seek"):
+        source.seek(0)
+    for chunk in iter_data_chunks(source, file_name=file_name, chunksize=chunksize, sheet_name=sheet_name):
+        row_numbers = np.arange(first_row, first_row + len(chunk))
+        first_row += len(chunk)
+        # Dòng trống hoàn toàn được bỏ qua; dòng có dữ liệu nhưng thiếu action_type là lỗi
+        missing_action = _blank_cells(chunk[action_header])
+        if missing_action.any():
+            filled = ~np.logical_and.reduce([_blank_cells(chunk[header]) for header in chunk.columns])
+            invalid = missing_action & filled
+            if invalid.any():
+                raise ValueError(f"Dòng {row_numbers[np.argmax(invalid)]}: thiếu {ACTION_COLUMN}")
+            chunk, row_numbers = chunk[~missing_action], row_numbers[~missing_action]
+        literal_columns = [
+            _literal_column(chunk[header], encoder, name, row_numbers)
+            for (header, name, *_), encoder in zip(template_columns, encoders)
+        ]
+        for offset, (action, row_id) in enumerate(zip(chunk[action_header], chunk[id_header])):
+            row_number = int(row_numbers[offset])
+            kind = ACTIONS.get(normalize_column_name(str(action)))
+            if kind is None:
+                raise ValueError(f"Dòng {row_number}: action_type không hợp lệ: {action!r}")
+            row_id = _parse_id(row_id, row_number)
+            row = [values[offset] for values in literal_columns]
+            if row_id is None:
+                if kind != "insert":
+                    action_name = "xóa" if kind == "delete" else "cập nhật"
+                    raise ValueError(f"Dòng {row_number}: thiếu id để {action_name}")
+                kind = "insert_new"
+            if kind != batch_kind:
+                flush()
+                batch_kind = kind
+            if kind == "insert_new":
+                batch[row_number] = row
+            elif kind == "delete":
+                batch[row_id] = str(row_id)
+            elif kind == "update" and row_id in batch:
+                batch[row_id] = [
+                    new if new != "NULL" else old for old, new in zip(batch[row_id], [str(row_id)] + row)
+                ]
+            else:
+                key = row_id if kind == "update" or partition_index is None else (row_id, row[partition_index])
+                batch[key] = [str(row_id)] + row
+            if len(batch) >= batch_size:
+                flush()
+
+    flush()
+    reset_sequence()
+    output.write("COMMIT;\n")
+    return counts
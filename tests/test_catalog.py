@@ -0,0 +1,50 @@
+# Kiểm thử chế độ danh mục của dòng lệnh: tên bảng trùng, xóa file .sql của file đặc tả đã bỏ, các module sinh
+# Code SQL được tính vào mã băm
+import os
+
+from createtable_catalog import _GENERATOR_MODULES, MANIFEST_FILE
+from createtable_cli import main
+
+SPEC = "Tên cột,Giá trị mẫu\nMã,INT\nGhi chú,abc\n"
+
+
+def write_spec(directory, name):
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as spec_file:
+        spec_file.write(SPEC)
+
+
+def run_catalog(spec_dir, output_dir):
+    return main([str(spec_dir), "-o", str(output_dir), "--catalog", "--workers", "1"])
+
+
+def test_generator_modules_cover_reading_and_diff():
+    assert {"createtable_io.py", "createtable_diff.py"} <= set(_GENERATOR_MODULES)
+    directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert all(os.path.isfile(os.path.join(directory, module)) for module in _GENERATOR_MODULES)
+
+
+def test_colliding_table_names_are_rejected(tmp_path, capsys):
+    spec_dir, output_dir = tmp_path / "specs", tmp_path / "sql"
+    spec_dir.mkdir()
+    write_spec(spec_dir, "Số tiền.csv")
+    write_spec(spec_dir, "so_tien.csv")
+    assert run_catalog(spec_dir, output_dir) == 2
+    assert "cùng sinh bảng so_tien" in capsys.readouterr().err
+    assert not os.path.exists(output_dir / "so_tien.sql")
+
+
+def test_removed_spec_outputs_are_deleted(tmp_path, capsys):
+    spec_dir, output_dir = tmp_path / "specs", tmp_path / "sql"
+    spec_dir.mkdir()
+    write_spec(spec_dir, "khach_hang.csv")
+    write_spec(spec_dir, "so_tien.csv")
+    assert run_catalog(spec_dir, output_dir) == 0
+    assert {"khach_hang.sql", "so_tien.sql", MANIFEST_FILE} <= set(os.listdir(output_dir))
+
+    # Bỏ một file và đổi tên file còn lại (cùng tên bảng): chỉ file .sql của bảng đã bỏ bị xóa
+    os.remove(spec_dir / "khach_hang.csv")
+    os.rename(spec_dir / "so_tien.csv", spec_dir / "Số tiền.csv")
+    assert run_catalog(spec_dir, output_dir) == 0
+    assert "Đã xóa" in capsys.readouterr().out
+    assert not os.path.exists(output_dir / "khach_hang.sql")
+    assert os.path.isfile(output_dir / "so_tien.sql")
@@ -0,0 +1,107 @@
+# Kiểm thử mã hóa dữ liệu sang định dạng COPY của PostgreSQL (binary và text, chia shard)
+import datetime
+import io
+import struct
+from decimal import Decimal
+
+import pytest
+
+from createtable_copy import (
+    BINARY_HEADER, BINARY_TRAILER, CoercionError, POSTGRES_EPOCH, _numeric_binary, iter_converted_rows, value_encoder,
+    write_copy_data,
+)
+from createtable_profile import profile_data_file
+
+CSV_DATA = (
+    "Ma,So tien,Ngay lap,Ghi chu,Co\n"
+    "1,12345.678,01/02/2025,a\tb,true\n"
+    "2,,02/02/2025,,false\n"
+    "3,-0.5,03/02/2025,xin chào,true\n"
+).encode("utf-8")
+
+
+# Đọc file COPY binary: danh sách các dòng, mỗi dòng là danh sách giá trị dạng bytes (None: NULL)
+def read_binary_copy(content):
+    assert content.startswith(BINARY_HEADER) and content.endswith(BINARY_TRAILER)
+    position, end, rows = len(BINARY_HEADER), len(content) - len(BINARY_TRAILER), []
+    while position < end:
+        (field_count,), position = struct.unpack_from("!h", content, position), position + 2
+        row = []
+        for _ in range(field_count):
+            (length,), position = struct.unpack_from("!i", content, position), position + 4
+            row.append(None if length == -1 else content[position:position + length])
+            position += max(length, 0)
+        rows.append(row)
+    assert position == end
+    return rows
+
+
+def write_copy(copy_format, shards=1, narrow=True):
+    profiles = profile_data_file(io.BytesIO(CSV_DATA), file_name="data.csv")
+    outputs = [io.BytesIO() for _ in range(shards)]
+    shard_rows, failures = write_copy_data(
+        io.BytesIO(CSV_DATA), profiles, outputs, copy_format, narrow, file_name="data.csv", chunksize=2
+    )
+    return [output.getvalue() for output in outputs], shard_rows, failures
+
+
+def test_numeric_binary():
+    assert _numeric_binary(Decimal("12345.678")) == struct.pack("!hhHH3H", 3, 1, 0x0000, 3, 1, 2345, 6780)
+    assert _numeric_binary(Decimal("-0.5")) == struct.pack("!hhHH1H", 1, -1, 0x4000, 1, 5000)
+    assert _numeric_binary(Decimal("0")) == struct.pack("!hhHH", 0, 0, 0x0000, 0)
+
+
+def test_binary_encoders():
+    assert value_encoder("SMALLINT", None, "binary")("7") == b"\x00\x07"
+    assert value_encoder("BIGINT", None, "binary")(7.0) == struct.pack("!q", 7)
+    assert value_encoder("DOUBLE PRECISION", None, "binary")("1.5") == struct.pack("!d", 1.5)
+    assert value_encoder("BOOLEAN", None, "binary")("có") == b"\x01"
+    assert value_encoder("DATE", "dd/mm/yyyy", "binary")("01/01/2000") == struct.pack("!i", 0)
+    assert value_encoder("TIMESTAMP", "yyyy-mm-dd", "binary")("2000-01-02") == struct.pack("!q", 86_400_000_000)
+    assert value_encoder("TEXT", None, "binary")(3.0) == b"3"
+    with pytest.raises(CoercionError):
+        value_encoder("SMALLINT", None, "binary")("40000")
+
+
+def test_write_binary_copy():
+    (content,), shard_rows, failures = write_copy("binary")
+    assert shard_rows == [3]
+    assert failures == {"ma": 0, "so_tien": 0, "ngay_lap": 0, "ghi_chu": 0, "co": 0}
+    first_day = (datetime.date(2025, 2, 1) - POSTGRES_EPOCH).days
+    assert read_binary_copy(content) == [
+        [b"\x00\x01", _numeric_binary(Decimal("12345.678")), struct.pack("!i", first_day), b"a\tb", b"\x01"],
+        [b"\x00\x02", None, struct.pack("!i", first_day + 1), None, b"\x00"],
+        [b"\x00\x03", _numeric_binary(Decimal("-0.5")), struct.pack("!i", first_day + 2),
+         "xin chào".encode("utf-8"), b"\x01"],
+    ]
+
+
+def test_write_text_copy_escapes_values():
+    (content,), _, _ = write_copy("text")
+    assert content.decode("utf-8").splitlines() == [
+        "1\t12345.678\t2025-02-01\ta\\tb\tt",
+        "2\t\\N\t2025-02-02\t\\N\tf",
+        "3\t-0.5\t2025-02-03\txin chào\tt",
+    ]
+
+
+def test_shards_split_rows_in_turn():
+    contents, shard_rows, _ = write_copy("binary", shards=2)
+    assert shard_rows == [2, 1]
+    assert [row[0] for row in read_binary_copy(contents[0])] == [b"\x00\x01", b"\x00\x03"]
+    assert [row[0] for row in read_binary_copy(contents[1])] == [b"\x00\x02"]
+
+
+@pytest.mark.parametrize("narrow", [False, True])
+def test_decimal_values_round_trip(narrow):
+    data = 'Ty le,So tien\n0.125,"1.234,5"\n0.250,"2,75"\n0.375,"1.000"\n'.encode("utf-8")
+    profiles = profile_data_file(io.BytesIO(data), file_name="data.csv")
+    output = io.BytesIO()
+    _, failures = write_copy_data(io.BytesIO(data), profiles, [output], "text", narrow, file_name="data.csv")
+    assert failures == {"ty_le": 0, "so_tien": 0}
+    rows = [line.split("\t") for line in output.getvalue().decode("utf-8").splitlines()]
+    assert [[Decimal(value) for value in row] for row in rows] == [
+        [Decimal("0.125"), Decimal("1234.5")], [Decimal("0.25"), Decimal("2.75")], [Decimal("0.375"), Decimal("1000")],
+    ]
+    converted = list(iter_converted_rows(io.BytesIO(data), profiles, narrow, file_name="data.csv"))
+    assert converted == [[0.125, 1234.5], [0.25, 2.75], [0.375, 1000.0]]
@@ -0,0 +1,52 @@
+# Kiểm thử suy luận kiểu dữ liệu (hàm cho cả cột phải cho kết quả giống hệt hàm vô hướng) và chuẩn hóa tên cột
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from createtable_core import infer_data_type, infer_data_types, normalize_column_name, normalize_column_names
+
+SAMPLE_VALUES = [
+    "INT", " int ", "1.250.000", "1,5", "-12", "1e5", "1_000", "inf", "nan", "abc", "", "   ", None, np.nan,
+    pd.NaT, pd.NA, "01/02/2025", "2025-02-01", "01.02.2025", "01-02-2025 10:30", "32/13/2025",
+    datetime.datetime(2025, 2, 1), 12, 3.5, True,
+]
+
+
+@pytest.mark.parametrize("column_name", ["Ghi chú", "Ngay lap"])
+def test_infer_data_types_matches_scalar_mixed_column(column_name):
+    column_names = [column_name] * len(SAMPLE_VALUES)
+    expected = [infer_data_type(value, column_name) for value in SAMPLE_VALUES]
+    assert infer_data_types(SAMPLE_VALUES, column_names).tolist() == expected
+
+
+@pytest.mark.parametrize("values", [
+    ["INT", "1.250.000", "01.02.2025", "", "abc"],
+    [1.0, np.nan, 3.5],
+    [1, 2, 3],
+    [pd.Timestamp("2025-02-01"), pd.NaT],
+])
+def test_infer_data_types_matches_scalar_typed_column(values):
+    column_names = ["Cột"] * len(values)
+    expected = [infer_data_type(value, "Cột") for value in pd.Series(values).astype(object)]
+    assert infer_data_types(pd.Series(values), column_names).tolist() == expected
+
+
+def test_infer_data_type_examples():
+    assert infer_data_type("INT", "Mã") == "INTEGER"
+    assert infer_data_type("01.02.2025", "Hạn") == "DATE"
+    assert infer_data_type("1.250.000", "Số tiền") == "DOUBLE PRECISION"
+    assert infer_data_type("", "Số tiền") == "TEXT"
+    assert infer_data_type(None, "Ngay sinh") == "DATE"
+
+
+def test_normalize_column_name():
+    assert normalize_column_name("  Số tiền (VNĐ) ") == "so_tien_vnd"
+    assert normalize_column_name("Đơn giá") == "don_gia"
+
+
+def test_normalize_column_names_renames_duplicates_and_blanks():
+    names = normalize_column_names(["Số tiền", "so tien", "So_tien_2", "", "Số tiền"])
+    assert names == ["so_tien", "so_tien_3", "so_tien_2", "cot_4", "so_tien_4"]
+    assert len(set(names)) == len(names)
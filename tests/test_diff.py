@@ -0,0 +1,74 @@
+# Kiểm thử so sánh schema cũ với danh sách cột mới và lệnh ALTER TABLE sinh ra
+import pytest
+
+from createtable_diff import (
+    ADD, ALTER_TYPE, DROP, build_alter_table_sql, diff_columns, generate_alter_table_sql, normalize_data_type,
+    read_previous_schema, schema_snapshot, type_change_rewrites,
+)
+
+PREVIOUS_SQL = """-- Bảng cũ
+CREATE TABLE public.khach_hang (
+    id SERIAL PRIMARY KEY,
+    ma_kh INT NOT NULL,
+    "ghi chú" varchar(50),
+    so_tien NUMERIC(10,2) DEFAULT 0,
+    ngay_sinh DATE
+);
+"""
+
+
+def test_parse_previous_sql():
+    assert read_previous_schema(PREVIOUS_SQL) == [
+        ("ma_kh", "INTEGER"), ("ghi_chu", "VARCHAR(50)"), ("so_tien", "NUMERIC(10, 2)"), ("ngay_sinh", "DATE"),
+    ]
+
+
+def test_snapshot_round_trip():
+    columns = [("ma_kh", "INTEGER"), ("so_tien", "DOUBLE PRECISION")]
+    assert read_previous_schema(schema_snapshot(columns, "public.khach_hang")) == columns
+
+
+def test_read_previous_schema_picks_table_from_bundle():
+    bundle = PREVIOUS_SQL + "CREATE TABLE public.don_hang (id SERIAL PRIMARY KEY, ma_dh TEXT);\n"
+    assert read_previous_schema(bundle, "public.don_hang") == [("ma_dh", "TEXT")]
+    assert read_previous_schema(bundle, "kho.don_hang") == [("ma_dh", "TEXT")]
+    with pytest.raises(ValueError):
+        read_previous_schema(bundle, "public.san_pham")
+
+
+@pytest.mark.parametrize("old_type, new_type, rewrites", [
+    ("VARCHAR(50)", "VARCHAR(100)", False),
+    ("VARCHAR(100)", "VARCHAR(50)", True),
+    ("VARCHAR(50)", "TEXT", False),
+    ("TEXT", "VARCHAR(50)", True),
+    ("NUMERIC(10, 2)", "NUMERIC(12, 2)", False),
+    ("NUMERIC(10, 2)", "NUMERIC(12, 3)", True),
+    ("INTEGER", "BIGINT", True),
+    ("int4", "INTEGER", False),
+])
+def test_type_change_rewrites(old_type, new_type, rewrites):
+    assert type_change_rewrites(old_type, new_type) is rewrites
+
+
+def test_diff_columns_order():
+    old_columns = read_previous_schema(PREVIOUS_SQL)
+    new_columns = [("ma_kh", "BIGINT"), ("ghi_chu", "TEXT"), ("so_tien", "NUMERIC(10,2)"), ("email", "TEXT")]
+    assert diff_columns(old_columns, new_columns) == [
+        (ADD, "email", None, "TEXT", False),
+        (ALTER_TYPE, "ma_kh", "INTEGER", "BIGINT", True),
+        (ALTER_TYPE, "ghi_chu", "VARCHAR(50)", "TEXT", False),
+        (DROP, "ngay_sinh", "DATE", None, False),
+    ]
+
+
+def test_alter_table_sql():
+    sql = generate_alter_table_sql(PREVIOUS_SQL, [("ma_kh", "BIGINT"), ("ghi_chu", "TEXT")], "public.khach_hang")
+    assert "-- CẢNH BÁO: 1 cột đổi kiểu buộc ghi lại toàn bộ bảng" in sql
+    assert "    ALTER COLUMN ma_kh TYPE BIGINT USING ma_kh::BIGINT," in sql
+    assert sql.splitlines()[-1].startswith("    DROP COLUMN ngay_sinh;")
+    assert sql.count("ALTER TABLE public.khach_hang") == 1
+
+
+def test_alter_table_sql_without_changes():
+    assert build_alter_table_sql([], "public.khach_hang").startswith("-- Bảng public.khach_hang không có thay đổi")
+    assert normalize_data_type(" double   precision ") == "DOUBLE PRECISION"
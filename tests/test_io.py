@@ -0,0 +1,31 @@
+# Kiểm thử đọc tệp CSV: nhận dạng bảng mã, dấu phân cách và các byte không giải mã được của bảng mã dự phòng
+import io
+
+import pytest
+
+from createtable_core import read_spec_file
+from createtable_io import CSV_FALLBACK_ENCODING, iter_data_chunks, read_data_headers, sniff_csv_format
+from createtable_profile import sample_data_file
+
+# Tệp cp1258 (dấu chấm phẩy) có byte 0x81 và 0x9D không được định nghĩa trong cp1258
+CP1258_DATA = "Tên;Giá\nĐơn giá;INT\n".encode("cp1258") + b"Ghi \x81ch\x9d;abc\n"
+
+
+def test_sniff_cp1258():
+    assert sniff_csv_format(io.BytesIO(CP1258_DATA)) == (CSV_FALLBACK_ENCODING, ";", ["Tên", "Giá"])
+
+
+def test_undefined_cp1258_bytes_are_replaced():
+    spec = read_spec_file(io.BytesIO(CP1258_DATA), file_name="spec.csv")
+    assert spec.values.tolist() == [["Đơn giá", "INT"], ["Ghi �ch�", "abc"]]
+    assert read_data_headers(io.BytesIO(CP1258_DATA), file_name="spec.csv") == ["Tên", "Giá"]
+    chunks = list(iter_data_chunks(io.BytesIO(CP1258_DATA), file_name="spec.csv"))
+    assert chunks[0]["Tên"].tolist() == ["Đơn giá", "Ghi �ch�"]
+    profiles = sample_data_file(io.BytesIO(CP1258_DATA), file_name="spec.csv")
+    assert [profile.column_name for profile in profiles] == ["Tên", "Giá"]
+
+
+def test_invalid_utf8_after_sniffed_head_still_fails():
+    data = b"a,b\n" + b"1,2\n" * 4_000 + b"\xff,3\n"
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_data_chunks(io.BytesIO(data), file_name="data.csv"))
@@ -0,0 +1,30 @@
+# Kiểm thử lập hồ sơ cột theo mẫu phân tầng: độ tin cậy chỉ tính các giá trị không trống
+import io
+
+import pandas as pd
+
+from createtable_profile import ColumnProfile, rows_for_confidence, sample_data_file
+
+
+def test_confidence_ignores_blank_cells():
+    profile = ColumnProfile("So luong")
+    profile.update(pd.Series([""] * 10_000 + [None] * 10_000, dtype=object))
+    assert profile.confidence() == 0.0
+    profile.update(pd.Series(["1"] * (rows_for_confidence() - 1) + [""] * 10_000, dtype=object))
+    assert profile.confidence() < 0.99
+    profile.update(pd.Series(["2"], dtype=object))
+    assert profile.confidence() >= 0.99
+
+
+def test_sparse_column_with_late_values_keeps_sampling():
+    # Cột "So luong" trống ở các tầng đầu, có giá trị ở các tầng cuối (trừ phần cuối tệp)
+    rows = [f"{index},{index % 100 if 30_000 <= index < 38_000 else ''}" for index in range(40_000)]
+    data = ("Ma,So luong\n" + "\n".join(rows) + "\n").encode("utf-8")
+    profiles = sample_data_file(io.BytesIO(data), file_name="data.csv", rows_per_stratum=1_000, strata=8,
+                                tail_rows=1_000)
+    assert {profile.column_name: profile.data_type for profile in profiles} == {
+        "Ma": "DOUBLE PRECISION", "So luong": "DOUBLE PRECISION",
+    }
+    sparse = profiles[1]
+    assert sparse.type_counts["DOUBLE PRECISION"] > 0
+    assert sparse.row_count > profiles[0].row_count
@@ -0,0 +1,181 @@
+# Kiểm thử dịch vụ HTTP trên cổng ngẫu nhiên của máy cục bộ: các đường dẫn, mã lỗi và việc gom yêu cầu
+import http.client
+import json
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from createtable_server import MAX_BODY_BYTES, post_json, start_background_server
+
+DDL_PAYLOAD = {
+    "schema": "Kế toán", "table": "Khách hàng",
+    "columns": [["Mã KH", "INT"], ["Ngay sinh", ""], ["Số tiền", "1.250.000"], ["Ghi chú", "abc"]],
+}
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = start_background_server(workers=1)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def connection(server):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    yield connection
+    connection.close()
+
+
+# Gửi yêu cầu với header Content-Length tùy ý (không gửi nội dung); trả về (mã trạng thái, nội dung)
+def post_raw(connection, path, content_length):
+    connection.putrequest("POST", path)
+    connection.putheader("Content-Length", content_length)
+    connection.endheaders()
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_health(connection):
+    connection.request("GET", "/health")
+    response = connection.getresponse()
+    assert response.status == 200
+    assert json.loads(response.read()) == {"status": "ok"}
+    assert response.getheader("Server-Timing").startswith("app;dur=")
+
+
+def test_ddl(connection):
+    status, body = post_json(connection, "/ddl", DDL_PAYLOAD)
+    assert status == 200
+    assert body["table"] == "ke_toan.khach_hang"
+    assert body["columns"] == [
+        ["ma_kh", "INTEGER"], ["ngay_sinh", "DATE"], ["so_tien", "DOUBLE PRECISION"], ["ghi_chu", "TEXT"],
+    ]
+    assert body["sql"].startswith("CREATE TABLE ke_toan.khach_hang (\n    id SERIAL PRIMARY KEY,")
+
+
+def test_infer_renames_duplicates(connection):
+    status, body = post_json(connection, "/infer", {"columns": [{"name": "Số tiền", "sample": 5}, ["so tien", None]]})
+    assert status == 200
+    assert body["columns"] == [["so_tien", "DOUBLE PRECISION"], ["so_tien_2", "TEXT"]]
+
+
+@pytest.mark.parametrize("path, payload, status", [
+    ("/ddl", {"columns": [["a", "1"]]}, 400),
+    ("/ddl", {"table": "t", "columns": []}, 400),
+    ("/infer", {"columns": [["a", {"x": 1}]]}, 400),
+    ("/khong_co", {}, 404),
+])
+def test_invalid_requests(connection, path, payload, status):
+    assert post_json(connection, path, payload)[0] == status
+
+
+def test_invalid_json(connection):
+    connection.request("POST", "/ddl", b"{not json", {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    assert response.status == 400
+    response.read()
+
+
+@pytest.mark.parametrize("content_length, status", [
+    ("-1", 400),
+    ("abc", 400),
+    ("1e3", 400),
+    (str(MAX_BODY_BYTES + 1), 413),
+])
+def test_invalid_content_length(connection, content_length, status):
+    # Không đọc nội dung: trả lời ngay thay vì chờ người gọi đóng kết nối (hết thời gian chờ 10 giây là lỗi)
+    assert post_raw(connection, "/ddl", content_length)[0] == status
+
+
+def test_upload_spec_file(connection):
+    content = "Tên cột,Giá trị mẫu\nMã KH,INT\nNgày giao dịch,01/01/2025\n".encode("utf-8")
+    connection.request("POST", "/upload?table=giao_dich&file_name=giao_dich.csv", content)
+    response = connection.getresponse()
+    body = json.loads(response.read())
+    assert response.status == 200
+    assert body["columns"] == [["ma_kh", "INTEGER"], ["ngay_giao_dich", "DATE"]]
+
+
+def test_upload_bad_file_is_client_error(connection):
+    connection.request("POST", "/upload?table=t&file_name=t.xlsx", b"not a workbook")
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 400
+
+
+# Nhóm tiến trình giả lập: mọi việc gửi vào đều lỗi như khi tiến trình con bị dừng đột ngột
+class BrokenExecutor:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("tiến trình con bị dừng"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_upload_broken_pool_is_server_error_and_recovers(server, connection):
+    original, broken = server.executor, BrokenExecutor()
+    server.executor = broken
+    try:
+        connection.request("POST", "/upload?table=t&file_name=t.csv", b"a,b\nx,1\n")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 503
+        assert broken.shut_down
+        assert server.executor is not broken
+    finally:
+        server.executor.shutdown()
+        server.executor = original
+    # Nhóm tiến trình mới xử lý được các yêu cầu sau
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    connection.request("POST", "/upload?table=t&file_name=t.csv", b"a,b\nx,1\n")
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    assert response.status == 200
+
+
+def test_concurrent_requests_are_batched():
+    # Chờ 200 ms gom yêu cầu: các yêu cầu gửi cùng lúc được suy luận kiểu chung trong ít lần gọi hơn số yêu cầu
+    server = start_background_server(workers=1, batch_wait_ms=200)
+    try:
+        count = 8
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def send(index):
+            connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+            barrier.wait()
+            payload = {"table": f"bang_{index}", "columns": [[f"Cột {index}", str(index)], ["Ngay", "x"]]}
+            results[index] = post_json(connection, "/ddl", payload)
+            connection.close()
+
+        threads = [threading.Thread(target=send, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for index, (status, body) in enumerate(results):
+            assert status == 200
+            assert body["columns"] == [[f"cot_{index}", "DOUBLE PRECISION"], ["ngay", "DATE"]]
+        assert server.batcher.requests == count
+        assert server.batcher.batches < count
+
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+        connection.request("GET", "/metrics")
+        metrics = json.loads(connection.getresponse().read())
+        connection.close()
+        assert metrics["batching"] == {"batches": server.batcher.batches, "requests": count}
+        assert metrics["latency"]["/ddl"]["requests"] == count
+    finally:
+        server.shutdown()
+        server.server_close()
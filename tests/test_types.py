@@ -0,0 +1,53 @@
+# Kiểm thử đọc số có dấu phân cách và thu hẹp kiểu dữ liệu theo giá trị đã quan sát
+import pandas as pd
+import pytest
+
+from createtable_profile import ColumnProfile
+from createtable_types import decimal_separator_from_votes, decimal_separator_votes, parse_number
+
+
+def narrowed(values):
+    profile = ColumnProfile("Giá trị")
+    profile.update(pd.Series(values, dtype=object))
+    return profile.narrowed
+
+
+@pytest.mark.parametrize("value, decimal_separator, expected", [
+    ("0.125", None, (0.125, 0, 3)),
+    ("0,125", None, (0.125, 0, 3)),
+    ("1.250", None, (1.25, 1, 2)),
+    ("1.250", ",", (1250, 4, 0)),
+    ("1.250", ".", (1.25, 1, 2)),
+    ("0.125", ",", (0.125, 0, 3)),
+    ("1.250.000", None, (1250000, 7, 0)),
+    ("1.234,5", None, (1234.5, 4, 1)),
+    ("-1,234.50", None, (-1234.5, 4, 1)),
+])
+def test_parse_number(value, decimal_separator, expected):
+    assert parse_number(value, decimal_separator) == expected
+
+
+def test_decimal_separator_votes():
+    assert decimal_separator_votes(["1.000", "2.500"]) == {".": 0, ",": 0}
+    assert decimal_separator_votes(["1.000", "2,5", "1.000.000"]) == {".": 0, ",": 2}
+    assert decimal_separator_from_votes({".": 0, ",": 0}) is None
+    assert decimal_separator_from_votes({".": 3, ",": 1}) == "."
+
+
+def test_leading_zero_decimals_are_not_thousands():
+    data_type, reason = narrowed(["0.125", "0.250", "0.375"])
+    assert data_type == "NUMERIC(3, 3)"
+    assert "0 chữ số phần nguyên và 3 chữ số thập phân" in reason
+
+
+def test_thousands_only_with_column_evidence():
+    assert narrowed(["1.000", "2.500", "1.250.000"])[0] == "INTEGER"
+    assert narrowed(["1.000", "2.500", "3,75"])[0] == "NUMERIC(6, 2)"
+    assert narrowed(["1.000", "2.500"])[0] == "NUMERIC(2, 1)"
+
+
+def test_plain_numbers():
+    assert narrowed(["1", "-2", "300"])[0] == "SMALLINT"
+    assert narrowed(["1.5", "22.25"]) == (
+        "NUMERIC(4, 2)", "Số thập phân, tối đa 2 chữ số phần nguyên và 2 chữ số thập phân"
+    )
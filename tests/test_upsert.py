@@ -0,0 +1,88 @@
+# Kiểm thử script cập nhật dữ liệu: thứ tự các lô theo thứ tự dòng, gộp id trùng, đặt lại sequence, bảng phân vùng
+import io
+
+import pytest
+
+from createtable_upsert import build_insert_sql, build_sequence_reset_sql, write_upsert_script
+
+TABLE = "public.khach_hang"
+COLUMNS = [("ten", "TEXT"), ("so_tien", "INTEGER")]
+
+
+def upsert_script(lines, columns=COLUMNS, **options):
+    source = io.BytesIO(("action_type,id,Tên,Số tiền\n" + "\n".join(lines) + "\n").encode("utf-8"))
+    output = io.StringIO()
+    counts = write_upsert_script(source, output, TABLE, columns, file_name="mau.csv", **options)
+    statements = [statement for statement in output.getvalue().split("\n\n") if statement.strip()]
+    return statements[1:-1], counts
+
+
+def test_batches_follow_row_order():
+    statements, counts = upsert_script(["delete,1,,", "insert,1,An,10", "update,1,,20", "delete,2,,"])
+    assert [statement.split()[0] for statement in statements] == ["DELETE", "INSERT", "UPDATE", "DELETE", "SELECT"]
+    assert counts == {"insert": 1, "update": 1, "delete": 2}
+
+
+def test_batch_size_splits_runs():
+    statements, counts = upsert_script([f"insert,{row_id},Tên {row_id},{row_id}" for row_id in range(1, 6)],
+                                       batch_size=2)
+    assert [statement.count("\n    (") for statement in statements[:-1]] == [2, 2, 1]
+    assert counts["insert"] == 5
+
+
+def test_duplicate_ids_in_batch_are_merged():
+    statements, counts = upsert_script(["update,1,An,", "update,1,,20", "insert,2,Bình,1", "insert,2,Bình,2"])
+    update_sql, insert_sql = statements[:2]
+    assert "(1::INTEGER, 'An'::TEXT, 20::INTEGER)" in update_sql
+    assert "    (2, 'Bình', 2)\nON CONFLICT (id)" in insert_sql
+    assert counts == {"insert": 1, "update": 1, "delete": 0}
+
+
+def test_sequence_reset_before_rows_without_id():
+    statements, counts = upsert_script(["insert,5,An,1", "insert,,Bình,2", "insert,,Chi,3", "insert,9,Dũng,4"])
+    reset = build_sequence_reset_sql(TABLE)
+    assert statements == [
+        build_insert_sql(TABLE, ["ten", "so_tien"], [["5", "'An'", "1"]]),
+        reset,
+        build_insert_sql(TABLE, ["ten", "so_tien"], [["'Bình'", "2"], ["'Chi'", "3"]], with_id=False),
+        build_insert_sql(TABLE, ["ten", "so_tien"], [["9", "'Dũng'", "4"]]),
+        reset,
+    ]
+    assert counts["insert"] == 4
+
+
+def test_partition_column_in_conflict_target():
+    statements, _ = upsert_script(["insert,1,An,10", "insert,1,An,20"], partition_column="so_tien")
+    assert "    (1, 'An', 10),\n    (1, 'An', 20)\n" in statements[0]
+    assert statements[0].endswith("ON CONFLICT (id, so_tien) DO UPDATE SET ten = EXCLUDED.ten;")
+
+
+def test_blank_rows_and_missing_action():
+    statements, counts = upsert_script(["insert,1,An,10", ",,,", "delete,1,,"])
+    assert counts == {"insert": 1, "update": 0, "delete": 1}
+    with pytest.raises(ValueError, match="Dòng 3: thiếu action_type"):
+        upsert_script(["insert,1,An,10", ",2,Bình,"])
+
+
+@pytest.mark.parametrize("line, message", [
+    ("sửa,,An,1", "Dòng 2: thiếu id để cập nhật"),
+    ("thêm,1,An,abc", "Dòng 2, cột so_tien"),
+    ("merge,1,An,1", "Dòng 2: action_type không hợp lệ"),
+])
+def test_invalid_rows(line, message):
+    with pytest.raises(ValueError, match=message):
+        upsert_script([line])
+
+
+
+@pytest.mark.parametrize("columns", [None, [("ten", "TEXT"), ("so_tien", "NUMERIC(10, 3)")]])
+@pytest.mark.parametrize("values, literals", [
+    (["0.125", "2.5", "1.000"], ["0.125", "2.5", "1"]),
+    (['"0,125"', '"1.234,5"', '"1.000"'], ["0.125", "1234.5", "1000"]),
+])
+def test_decimal_literals(columns, values, literals):
+    statements, _ = upsert_script(
+        [f"insert,1,An,{values[0]}", f"insert,2,Bình,{values[1]}", f"update,3,Chi,{values[2]}"], columns
+    )
+    assert f"    (1, 'An', {literals[0]}),\n    (2, 'Bình', {literals[1]})\n" in statements[0]
+    assert float(statements[1].split("'Chi'::TEXT, ")[1].split("::")[0]) == float(literals[2])